@@ -17,15 +17,23 @@ export default function ScrapePage() {
     });
 
     const endOfLogsRef = useRef(null);
+    const lastSeq = useRef(0);
+    const finished = useRef(false);
 
     useEffect(() => {
         let interval;
         if (running) {
             interval = setInterval(async () => {
                 try {
-                    const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/scrape/status`);
-                    setLogs(res.data.logs || []);
-                    if (res.data.status === 'idle' && res.data.logs.some(l => l.includes('Done!'))) {
+                    // Only ask for lines newer than the last sequence number we have
+                    const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/scrape/status`, {
+                        params: { since: lastSeq.current }
+                    });
+                    const newLogs = res.data.logs || [];
+                    lastSeq.current = res.data.seq;
+                    if (newLogs.length) setLogs(prev => [...prev, ...newLogs]);
+                    if (newLogs.some(l => l.includes('Done!'))) finished.current = true;
+                    if (res.data.status === 'idle' && finished.current) {
                         setRunning(false);
                     }
                 } catch (e) {
@@ -58,6 +66,7 @@ export default function ScrapePage() {
         const fetchStatus = async () => {
             try {
                 const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/scrape/status`);
+                lastSeq.current = res.data.seq || 0;
                 if (res.data.status === 'running') {
                     setRunning(true);
                     setLogs(res.data.logs || []);
@@ -71,6 +80,7 @@ export default function ScrapePage() {
 
     const handleStart = async () => {
         try {
+            finished.current = false;
             setRunning(true);
             setLogs(['Starting scraper service...']);
             await axios.post(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/scrape/start`, config);
@@ -13,15 +13,23 @@ export default function WhatsAppPage() {
     });
 
     const endOfLogsRef = useRef(null);
+    const lastSeq = useRef(0);
+    const finished = useRef(false);
 
     useEffect(() => {
         let interval;
         if (running) {
             interval = setInterval(async () => {
                 try {
-                    const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/whatsapp/status`);
-                    setLogs(res.data.logs || []);
-                    if (res.data.status === 'idle' && res.data.logs.some(l => l.includes('Complete') || l.includes('❌'))) {
+                    // Only ask for lines newer than the last sequence number we have
+                    const res = await axios.get(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/whatsapp/status`, {
+                        params: { since: lastSeq.current }
+                    });
+                    const newLogs = res.data.logs || [];
+                    lastSeq.current = res.data.seq;
+                    if (newLogs.length) setLogs(prev => [...prev, ...newLogs]);
+                    if (newLogs.some(l => l.includes('Complete') || l.includes('❌'))) finished.current = true;
+                    if (res.data.status === 'idle' && finished.current) {
                         setRunning(false);
                     }
                 } catch (e) {
@@ -38,6 +46,7 @@ export default function WhatsAppPage() {
 
     const handleStart = async () => {
         try {
+            finished.current = false;
             setRunning(true);
             setLogs(['Initializing WhatsApp Web Playwright Session...']);
             await axios.post(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/api/whatsapp/start`, config);
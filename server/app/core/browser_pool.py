@@ -0,0 +1,265 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from app.core.metrics import registry
+
+# One warm browser per concurrent scrape job by default
+POOL_SIZE = int(os.getenv("LEADNEST_BROWSER_POOL_SIZE", os.getenv("LEADNEST_MAX_JOBS", "2")))
+# Chromium's memory only grows over a long session, so a browser is relaunched after this many pages
+MAX_PAGES = int(os.getenv("LEADNEST_BROWSER_MAX_PAGES", "500"))
+HEALTH_CHECK_INTERVAL = 60
+HEALTH_CHECK_TIMEOUT = 10
+
+LAUNCHES = registry.counter("leadnest_browser_launches_total", "Pooled Chromium launches by reason.", labels=("reason",))
+LEASE_WAIT = registry.histogram("leadnest_browser_lease_wait_seconds", "Time a job waited for a pooled browser.")
+
+class PooledBrowser:
+    """A warm Chromium process; jobs only ever see fresh contexts in it.
+
+    Once MAX_PAGES pages were opened, the next new_context swaps in a freshly
+    launched browser, even in the middle of a lease. The old one is retired
+    and closed once its last context is gone. Jobs holding long-lived
+    contexts move them over with outdated().
+    """
+    def __init__(self, browser, slot: int, relaunch=None):
+        self.browser = browser
+        self.slot = slot
+        self.relaunch = relaunch # Coroutine function returning a new Chromium browser
+        self.retired = []
+        self.generation = 0
+        self.pages_opened = 0
+        self.leases = 0
+        self.launched_at = time.time()
+        self.lock = asyncio.Lock()
+
+    async def new_context(self, **kwargs):
+        async with self.lock:
+            if self.worn_out and self.relaunch:
+                await self._replace()
+            await self._close_retired()
+            context = await self.browser.new_context(**kwargs)
+        context.on("page", self._count_page)
+        return context
+
+    async def _replace(self):
+        try:
+            browser = await self.relaunch()
+        except Exception as e:
+            # Better an old browser than none; try again after another MAX_PAGES pages
+            print(f"Browser pool: recycling slot {self.slot} failed ({str(e).splitlines()[0] if str(e) else e})")
+            self.pages_opened = 0
+            return
+        print(f"Browser pool: recycling slot {self.slot} mid-lease after {self.pages_opened} pages.")
+        self.retired.append(self.browser)
+        self.browser = browser
+        self.generation += 1
+        self.pages_opened = 0
+        self.launched_at = time.time()
+
+    async def _close_retired(self, force: bool = False):
+        for browser in list(self.retired):
+            if force or not browser.contexts:
+                self.retired.remove(browser)
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+
+    def outdated(self, context) -> bool:
+        """True when the context lives in a retired browser or in one past its page limit."""
+        return context.browser is not self.browser or self.worn_out
+
+    def _count_page(self, page):
+        if page.context.browser is self.browser:
+            self.pages_opened += 1
+
+    @property
+    def worn_out(self) -> bool:
+        return self.pages_opened >= MAX_PAGES
+
+    def is_connected(self) -> bool:
+        return self.browser.is_connected()
+
+    async def probe(self) -> bool:
+        # A hung renderer still reports connected, opening a context proves the process answers
+        try:
+            context = await asyncio.wait_for(self.browser.new_context(), HEALTH_CHECK_TIMEOUT)
+            await context.close()
+            return True
+        except Exception:
+            return False
+
+    async def close_contexts(self):
+        # Whatever a job left open, e.g. after it crashed mid-run
+        for context in list(self.browser.contexts):
+            try:
+                await context.close()
+            except Exception:
+                pass
+        await self._close_retired(force=True)
+
+    async def close(self):
+        await self._close_retired(force=True)
+        try:
+            await self.browser.close()
+        except Exception:
+            pass
+
+    def to_dict(self) -> dict:
+        return {
+            "slot": self.slot,
+            "pagesOpened": self.pages_opened,
+            "leases": self.leases,
+            "generation": self.generation,
+            "retired": len(self.retired),
+            "connected": self.is_connected(),
+            "launchedAt": self.launched_at,
+        }
+
+class BrowserPool:
+    """Warm headless Chromium processes shared by the scrape jobs of this process.
+
+    Started and stopped by the app lifespan. lease() hands a job a browser for
+    the whole run; the job opens its own contexts in it and they are closed
+    when the lease ends. With every browser leased, the next job waits, which
+    caps how many Chromium processes run at once. Browsers are relaunched
+    when they stop answering, and after MAX_PAGES pages, mid-lease if need be.
+    """
+    def __init__(self, size: int = POOL_SIZE, headless: bool = True):
+        self.size = max(1, size)
+        self.headless = headless
+        self.playwright = None
+        # slot -> PooledBrowser, None until launched or after a failed launch
+        self.browsers = [None] * self.size
+        self.idle = None # Queue of free slots
+        self.leased = set()
+        self.health_task = None
+        self.start_lock = None
+        self.recycled = 0
+
+    @property
+    def started(self) -> bool:
+        return self.playwright is not None
+
+    async def start(self, warm: bool = True):
+        if self.start_lock is None:
+            self.start_lock = asyncio.Lock()
+        async with self.start_lock:
+            if self.started:
+                return
+            self.playwright = await async_playwright().start()
+            self.idle = asyncio.Queue()
+            for slot in range(self.size):
+                if warm:
+                    self.browsers[slot] = await self._launch(slot, "warm")
+                self.idle.put_nowait(slot)
+            self.health_task = asyncio.get_running_loop().create_task(self._health_loop())
+            warmed = sum(1 for pooled in self.browsers if pooled)
+            print(f"Browser pool ready: {warmed}/{self.size} browsers warm, recycled after {MAX_PAGES} pages.")
+
+    async def stop(self):
+        if not self.started:
+            return
+        if self.health_task:
+            self.health_task.cancel()
+            await asyncio.gather(self.health_task, return_exceptions=True)
+            self.health_task = None
+        for slot, pooled in enumerate(self.browsers):
+            if pooled:
+                await pooled.close()
+            self.browsers[slot] = None
+        self.leased.clear()
+        await self.playwright.stop()
+        self.playwright = None
+        print("Browser pool stopped.")
+
+    async def _launch(self, slot: int, reason: str):
+        try:
+            browser = await self.playwright.chromium.launch(headless=self.headless)
+        except Exception as e:
+            print(f"Browser pool: launch failed for slot {slot} ({str(e).splitlines()[0] if str(e) else e})")
+            return None
+        LAUNCHES.inc(reason=reason)
+        return PooledBrowser(browser, slot, relaunch=self._relaunch)
+
+    async def _relaunch(self):
+        # Mid-lease recycle of a worn-out browser
+        browser = await self.playwright.chromium.launch(headless=self.headless)
+        LAUNCHES.inc(reason="recycle")
+        self.recycled += 1
+        return browser
+
+    async def _ready(self, slot: int):
+        """Returns a usable browser for the slot, relaunching a dead or worn-out one."""
+        pooled = self.browsers[slot]
+        if pooled and pooled.is_connected() and not pooled.worn_out:
+            return pooled
+        if pooled:
+            reason = "recycle" if pooled.is_connected() else "unhealthy"
+            print(f"Browser pool: relaunching slot {slot} ({reason}, {pooled.pages_opened} pages).")
+            self.recycled += 1
+            await pooled.close()
+        else:
+            reason = "lazy"
+        self.browsers[slot] = await self._launch(slot, reason)
+        return self.browsers[slot]
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yields a PooledBrowser for one job; its contexts are closed when the job is done."""
+        if not self.started:
+            await self.start(warm=False)
+        started = time.perf_counter()
+        slot = await self.idle.get()
+        LEASE_WAIT.observe(time.perf_counter() - started)
+        try:
+            pooled = await self._ready(slot)
+            if pooled is None:
+                raise RuntimeError("No browser available, Chromium failed to launch.")
+        except BaseException:
+            self.idle.put_nowait(slot)
+            raise
+        pooled.leases += 1
+        self.leased.add(slot)
+        try:
+            yield pooled
+        finally:
+            self.leased.discard(slot)
+            await pooled.close_contexts()
+            if pooled.worn_out:
+                await self._ready(slot)
+            self.idle.put_nowait(slot)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            # Only free slots are checked, leased browsers belong to a running job
+            for _ in range(self.idle.qsize()):
+                slot = self.idle.get_nowait()
+                try:
+                    pooled = self.browsers[slot]
+                    if pooled and pooled.is_connected() and not await pooled.probe():
+                        await pooled.close()
+                    if pooled:
+                        await self._ready(slot)
+                finally:
+                    self.idle.put_nowait(slot)
+
+    def snapshot(self) -> dict:
+        return {
+            "started": self.started,
+            "size": self.size,
+            "maxPages": MAX_PAGES,
+            "free": self.idle.qsize() if self.idle else self.size,
+            "browsers": [
+                dict(pooled.to_dict(), leased=slot in self.leased) if pooled else {"slot": slot, "cold": True}
+                for slot, pooled in enumerate(self.browsers)
+            ],
+            "recycled": self.recycled,
+        }
+
+browser_pool = BrowserPool()
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+from collections import deque
+
+class LogBuffer:
+    """Bounded, thread-safe log ring buffer with monotonically increasing sequence numbers.
+
+    Pollers pass the last sequence they saw to since() and only get newer
+    lines. stream() is an async generator that yields lines as they are
+    appended, for Server-Sent Events.
+    """
+    def __init__(self, maxlen: int = 2000):
+        self.entries = deque(maxlen=maxlen)
+        self.last_seq = 0
+        self.lock = threading.Lock()
+        # (loop, asyncio.Event) per open stream, woken from whatever thread logs
+        self.listeners = set()
+
+    def append(self, line: str) -> int:
+        with self.lock:
+            self.last_seq += 1
+            self.entries.append((self.last_seq, line))
+            listeners = list(self.listeners)
+        for loop, event in listeners:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass # Loop already closed
+        return self.last_seq
+
+    def clear(self):
+        # Sequence numbers keep counting so cursors held by clients stay valid
+        with self.lock:
+            self.entries.clear()
+
+    def since(self, seq: int = 0) -> list:
+        """(seq, line) pairs newer than seq, oldest first."""
+        with self.lock:
+            if seq >= self.last_seq:
+                return []
+            return [entry for entry in self.entries if entry[0] > seq]
+
+    def lines(self) -> list:
+        with self.lock:
+            return [line for _, line in self.entries]
+
+    def last(self):
+        with self.lock:
+            return self.entries[-1][1] if self.entries else None
+
+    def first_seq(self) -> int:
+        with self.lock:
+            return self.entries[0][0] if self.entries else self.last_seq + 1
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    async def stream(self, since: int = 0, keepalive: float = 15.0):
+        """Yields (seq, line) pairs after since, then new ones as they arrive.
+
+        Yields None when nothing was logged for keepalive seconds.
+        """
+        event = asyncio.Event()
+        listener = (asyncio.get_running_loop(), event)
+        with self.lock:
+            self.listeners.add(listener)
+        try:
+            while True:
+                event.clear()
+                entries = self.since(since)
+                for entry in entries:
+                    yield entry
+                if entries:
+                    since = entries[-1][0]
+                    continue
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self.lock:
+                self.listeners.discard(listener)
+
+def log_payload(buffer: LogBuffer, since: int = None) -> dict:
+    """Shared body of the /status endpoints: every line, or only lines after since."""
+    if since is None:
+        return {"logs": buffer.lines(), "seq": buffer.last_seq}
+    if since > buffer.last_seq:
+        # Cursor from before a server restart, start over
+        since = 0
+    entries = buffer.since(since)
+    return {
+        "logs": [line for _, line in entries],
+        "seq": entries[-1][0] if entries else buffer.last_seq,
+        # Lines between since and the oldest kept line were evicted from the ring
+        "truncated": since + 1 < buffer.first_seq(),
+    }
+
+async def sse_events(buffer: LogBuffer, since: int = 0):
+    async for entry in buffer.stream(since):
+        if entry is None:
+            yield ": keepalive\n\n"
+            continue
+        seq, line = entry
+        data = "\n".join(f"data: {part}" for part in line.split("\n"))
+        yield f"id: {seq}\n{data}\n\n"
@@ -0,0 +1,146 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Seconds; covers sub-millisecond regex work up to slow page loads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names, values, le=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if le is not None:
+        pairs.append(f'le="{le}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts, sum, count]
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels, key, bound)} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, '+Inf')} {count}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = cls(name, help, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name: str, help: str, labels=()) -> Counter:
+        return self._get(Counter, name, help, labels=labels)
+
+    def histogram(self, name: str, help: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels=labels, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+class StageTimer:
+    """Times pipeline stages into a shared histogram and keeps per-run totals.
+
+    The histogram feeds /api/metrics across all runs; the totals give the
+    summary logged at the end of one run.
+    """
+    def __init__(self, histogram: Histogram, label: str = "stage"):
+        self.histogram = histogram
+        self.label = label
+        # stage -> [count, total seconds, max seconds]
+        self.totals = {}
+
+    def observe(self, stage: str, seconds: float):
+        self.histogram.observe(seconds, **{self.label: stage})
+        totals = self.totals.setdefault(stage, [0, 0.0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+    @contextmanager
+    def time(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def to_dict(self) -> dict:
+        return {
+            stage: {"count": count, "totalMs": int(total * 1000), "avgMs": int(total * 1000 / count), "maxMs": int(peak * 1000)}
+            for stage, (count, total, peak) in self.totals.items()
+        }
+
+    def summary(self) -> str:
+        # Slowest stages first, by total time spent
+        ranked = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)
+        return ", ".join(f"{stage} {total:.1f}s/{count} (avg {total * 1000 / count:.0f} ms)"
+                         for stage, (count, total, _) in ranked)
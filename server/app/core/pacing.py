@@ -0,0 +1,196 @@
+import time
+import random
+import asyncio
+import threading
+import urllib.parse
+
+class StopSignal:
+    """Stop flag that can be set from any thread.
+
+    Coroutines sleeping in sleep() wake up as soon as it is set, so a stop
+    never waits out a delay.
+    """
+    def __init__(self):
+        self.event = threading.Event()
+        self.lock = threading.Lock()
+        # (loop, asyncio.Event) per sleeping coroutine, woken from whatever thread sets the signal
+        self.waiters = set()
+
+    def set(self):
+        self.event.set()
+        with self.lock:
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass # Loop already closed
+
+    def is_set(self) -> bool:
+        return self.event.is_set()
+
+    async def sleep(self, seconds: float) -> bool:
+        """Sleeps up to seconds; returns True if the signal was set."""
+        if self.event.is_set():
+            return True
+        if seconds <= 0:
+            return False
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self.lock:
+            self.waiters.add(waiter)
+        try:
+            # Set between the first check and registering the waiter
+            if self.event.is_set():
+                return True
+            await asyncio.wait_for(event.wait(), timeout=seconds)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+
+    def wait(self, seconds: float) -> bool:
+        """Blocking sleep() for worker threads."""
+        return self.event.wait(seconds)
+
+class HostPolicy:
+    def __init__(self, rate: float, burst: int, min_rate: float, max_rate: float, jitter=(0.0, 0.0)):
+        # rate is requests per second; jitter is extra random delay so requests don't land on a fixed beat
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.jitter = jitter
+
+# Google sees every query, place page and scroll from us; business websites see a handful of pages each
+GOOGLE_POLICY = HostPolicy(rate=1.0, burst=1, min_rate=0.05, max_rate=2.0, jitter=(0.3, 1.0))
+SITE_POLICY = HostPolicy(rate=2.0, burst=2, min_rate=0.1, max_rate=5.0, jitter=(0.0, 0.3))
+
+# Clean responses needed at one rate before it is raised again
+SPEEDUP_AFTER = 5
+
+def host_key(url: str) -> str:
+    host = (urllib.parse.urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    # maps.google.com, google.co.in and www.google.com/maps share one budget
+    if host.split(".")[0] == "google" or host.startswith("maps.google."):
+        return "google"
+    return host
+
+class TokenBucket:
+    """Per-host token bucket whose rate adapts to how the host responds.
+
+    Halves the rate on a captcha, 429 or error and raises it by 10% after a
+    run of clean responses. Runs on one event loop, so no locking.
+    """
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.rate = policy.rate
+        self.tokens = float(policy.burst)
+        self.updated = time.monotonic()
+        self.clean_streak = 0
+        self.backoffs = 0
+        self.requests = 0
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.policy.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        self.requests += 1
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return wait + random.uniform(*self.policy.jitter)
+
+    def success(self):
+        self.clean_streak += 1
+        if self.clean_streak >= SPEEDUP_AFTER:
+            self.clean_streak = 0
+            self.rate = min(self.policy.max_rate, self.rate * 1.1)
+
+    def backoff(self):
+        self.clean_streak = 0
+        self.backoffs += 1
+        self.rate = max(self.policy.min_rate, self.rate / 2)
+        # Drop saved-up burst so the slower rate applies to the very next request
+        self.tokens = min(self.tokens, 0.0)
+
+class HostPacer:
+    """Rate limits requests per host, interruptible by a StopSignal."""
+    def __init__(self, stop: StopSignal, enabled: bool = True):
+        self.stop = stop
+        # Disabled only for offline benchmarks against the local fixture server
+        self.enabled = enabled
+        self.buckets = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        key = host_key(url)
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(GOOGLE_POLICY if key == "google" else SITE_POLICY)
+        return self.buckets[key]
+
+    def spacing(self, url: str) -> tuple:
+        """(min, max) seconds between requests to url's host at its current rate, for loops paced inside the page."""
+        if not self.enabled:
+            return (0.0, 0.0)
+        bucket = self.bucket(url)
+        low, high = bucket.policy.jitter
+        return (1 / bucket.rate + low, 1 / bucket.rate + high)
+
+    async def wait(self, url: str) -> bool:
+        """Waits for this host's next slot; returns False if stopped meanwhile."""
+        if not self.enabled:
+            return not self.stop.is_set()
+        return not await self.stop.sleep(self.bucket(url).reserve())
+
+    def report(self, url: str, ok: bool):
+        bucket = self.bucket(url)
+        if ok:
+            bucket.success()
+        else:
+            bucket.backoff()
+
+    @property
+    def backoffs(self) -> int:
+        return sum(bucket.backoffs for bucket in self.buckets.values())
+
+    def summary(self) -> str:
+        google = self.buckets.get("google")
+        if not self.enabled:
+            return "Pacing: disabled."
+        sites = [bucket for key, bucket in self.buckets.items() if key != "google"]
+        parts = []
+        if google:
+            parts.append(f"Google {google.requests} requests at {google.rate:.2f}/s ({google.backoffs} backoffs)")
+        if sites:
+            parts.append(f"{len(sites)} other hosts, {sum(b.requests for b in sites)} requests "
+                         f"({sum(b.backoffs for b in sites)} backoffs)")
+        return "Pacing: " + ("; ".join(parts) or "no requests") + "."
+
+class ThroughputPolicy:
+    """Spaces out actions to an average rate per minute, with random jitter.
+
+    Time spent doing the action counts towards the gap, so slow page loads
+    don't add to the pause. wait() blocks and is meant for worker threads.
+    """
+    def __init__(self, per_minute: float, jitter: float = 0.3):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self.jitter = min(max(jitter, 0.0), 0.9)
+        self.last_start = None
+
+    def wait(self, stop: StopSignal = None) -> bool:
+        """Blocks until the next action may start; returns False if stopped meanwhile."""
+        if self.last_start is not None and self.interval:
+            gap = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            remaining = self.last_start + gap - time.monotonic()
+            if remaining > 0:
+                if stop is not None:
+                    if stop.wait(remaining):
+                        return False
+                else:
+                    time.sleep(remaining)
+        self.last_start = time.monotonic()
+        return stop is None or not stop.is_set()
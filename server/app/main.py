@@ -1,8 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import scrape, whatsapp, auth
+from app.routes import scrape, whatsapp, auth, metrics, leads
+from app.core.browser_pool import browser_pool
+from app.services.scraper.checkpoints import checkpoint_store
 
-app = FastAPI(title="GMB Scraper & WhatsApp Automation API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing is running yet, so runs still marked running were cut off by the last shutdown
+    interrupted = checkpoint_store.mark_interrupted()
+    pruned = checkpoint_store.prune()
+    if interrupted or pruned:
+        print(f"Checkpoints: {interrupted} interrupted runs can be resumed, {pruned} old completed runs pruned.")
+    # Warm Chromium processes for scrape jobs, so a job doesn't pay for the browser launch
+    await browser_pool.start()
+    yield
+    await browser_pool.stop()
+
+app = FastAPI(title="GMB Scraper & WhatsApp Automation API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -17,6 +32,8 @@ app.add_middleware(
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(scrape.router, prefix="/api/scrape", tags=["Scraping"])
 app.include_router(whatsapp.router, prefix="/api/whatsapp", tags=["WhatsApp"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
+app.include_router(leads.router, prefix="/api/leads", tags=["Leads"])
 
 @app.get("/")
 def read_root():
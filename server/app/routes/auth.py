@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from app.services.google_sheets import sheets_service
+from app.services.google_sheets.gateway import sheets_gateway
 
 router = APIRouter()
 
@@ -20,6 +21,11 @@ def get_auth_status():
 def get_lead_count():
     return {"count": sheets_service.get_lead_count()}
 
+@router.get("/status/quota")
+def get_sheets_quota():
+    # Tokens left in the shared Sheets quota and per-call counters
+    return sheets_gateway.snapshot()
+
 from fastapi.responses import RedirectResponse
 import urllib.parse
 
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.services.google_sheets import sheets_service
+from app.services.lead_export import FORMATS, export_leads, pyarrow
+
+router = APIRouter()
+
+def parse_date(value: Optional[str], name: str):
+    # ISO date or datetime, e.g. 2026-10-01 or 2026-10-01T18:30:00+05:30; UTC when no offset is given
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date, got {value!r}.")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+@router.get("/export")
+def export(format: str = "csv", query: Optional[str] = None, status: Optional[str] = None,
+           since: Optional[str] = None, until: Optional[str] = None, sheetId: Optional[str] = None):
+    # Streams straight from the local lead store, no Sheets API calls however many rows there are.
+    # query matches part of the search query, status takes a comma-separated list,
+    # since/until bound the time each lead was first scraped.
+    fmt = format.lower()
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}.")
+    if fmt == "parquet" and pyarrow is None:
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow on the server (pip install pyarrow).")
+    sheet_id = sheetId or sheets_service.sheet_id
+    if not sheet_id:
+        raise HTTPException(status_code=400, detail="No sheet connected yet, pass sheetId.")
+    statuses = [s for s in (status or "").split(",") if s.strip()]
+    chunks = export_leads(
+        sheet_id, fmt, query=query, statuses=statuses, since=parse_date(since, "since"), until=parse_date(until, "until")
+    )
+    media_type, extension = FORMATS[fmt]
+    filename = f"leads-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
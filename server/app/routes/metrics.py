@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.metrics import registry
+
+router = APIRouter()
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    # Prometheus text exposition format, scrape it or read it by hand
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
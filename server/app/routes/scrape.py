@@ -1,9 +1,16 @@
-from fastapi import APIRouter, BackgroundTasks
+import asyncio
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import Optional
 
-from app.services.scraper import GMBScraper, scrape_logs
 from app.services import scraper as scraper_module
+from app.services.jobs import job_manager, shard_coordinator
+from app.services.google_sheets import sheets_service
+from app.services.scraper.shards import shard_queue
+from app.services.scraper.checkpoints import checkpoint_store
+from app.core.log_buffer import log_payload, sse_events
+from app.core.browser_pool import browser_pool
 
 router = APIRouter()
 
@@ -13,39 +20,151 @@ class ScrapeRequest(BaseModel):
     city: str
     country: str
     limit: int
+    deepScrapeConcurrency: int = 3
+    queryConcurrency: int = 2
+    websiteCacheTtlHours: float = 168
+    leanMode: bool = False
+    httpFirst: bool = True
+    feedHarvest: bool = False
+    # Continue the latest unfinished run with the same keywords, location and relevance keywords
+    resume: bool = False
 
-def run_scraper_task(request: ScrapeRequest):
-    scraper = GMBScraper(
-        keywords_str=request.keywords,
-        relevance_keywords_str=request.relevanceKeywords,
-        city=request.city,
-        country=request.country,
-        limit=request.limit
-    )
-    scraper_module.current_scraper = scraper
-    scraper.run()
-    scraper_module.current_scraper = None
+class DistributedScrapeRequest(ScrapeRequest):
+    shardSize: int = 4 # Queries per shard
+    localWorkers: int = 2 # Worker processes on this host; 0 leaves the shards to remote workers
+
+class ShardClaim(BaseModel):
+    runId: str
+    worker: str
+
+class ShardWorker(BaseModel):
+    worker: str
+
+class ShardLead(BaseModel):
+    lead: dict
+
+class ShardComplete(BaseModel):
+    worker: str
+    error: str = ""
 
 @router.post("/start")
-def start_scraping(request: ScrapeRequest, background_tasks: BackgroundTasks):
-    scraper_module.scrape_logs.clear()
-    
-    background_tasks.add_task(run_scraper_task, request)
-    return {"status": "started", "message": "Scraping process initiated in the background."}
+async def start_scraping(request: ScrapeRequest):
+    # Async so the job manager's workers live on the server's event loop
+    if not job_manager.active():
+        scraper_module.scrape_logs.clear()
+        
+    job = job_manager.submit(request.dict())
+    return {"status": job.status, "jobId": job.id, "message": "Scraping job queued, it starts as soon as a worker is free."}
 
 @router.post("/stop")
 def stop_scraping():
-    if scraper_module.current_scraper:
-        scraper_module.current_scraper.should_stop = True
-        return {"status": "stopping", "message": "Stop signal sent to scraper."}
+    # Stops every queued and running job; use /jobs/{job_id}/cancel for a single one
+    stopped = [job.id for job in job_manager.active() if job_manager.cancel(job.id)]
+    if stopped:
+        return {"status": "stopping", "message": "Stop signal sent to scraper.", "jobIds": stopped}
     return {"status": "idle", "message": "No active scraper running."}
 
+@router.get("/jobs")
+def list_jobs():
+    return {"jobs": [job.to_dict() for job in job_manager.list()]}
+
+@router.get("/runs")
+def list_runs():
+    # Checkpointed runs, including ones from before a restart
+    return {"runs": checkpoint_store.list_runs()}
+
+@router.get("/browsers")
+def browser_pool_status():
+    return browser_pool.snapshot()
+
+@router.post("/distributed")
+async def start_distributed(request: DistributedScrapeRequest):
+    # Async so the coordinator's monitor lives on the server's event loop
+    if not sheets_service.client:
+        raise HTTPException(status_code=400, detail="Google Sheets not connected.")
+    try:
+        await asyncio.to_thread(sheets_service.create_or_get_sheet)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to initialize Google Sheet: {e}")
+    params = request.dict(exclude={"shardSize", "localWorkers"})
+    return shard_coordinator.start(params, request.shardSize, max(0, request.localWorkers))
+
+@router.get("/distributed")
+def list_distributed_runs():
+    return {"runs": shard_queue.list_runs()}
+
+@router.get("/distributed/{run_id}")
+def get_distributed_run(run_id: str):
+    run = shard_queue.run_status(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found.")
+    return run
+
+@router.post("/distributed/{run_id}/stop")
+def stop_distributed_run(run_id: str):
+    if not shard_coordinator.stop(run_id):
+        raise HTTPException(status_code=404, detail="No running distributed run with this id.")
+    return {"status": "stopping", "runId": run_id}
+
+# Used by shard workers on other hosts, see app/services/scraper/shard_worker.py
+@router.post("/shards/claim")
+def claim_shard(request: ShardClaim):
+    return {"shard": shard_queue.claim(request.runId, request.worker)}
+
+@router.post("/shards/{shard_id}/heartbeat")
+def shard_heartbeat(shard_id: int, request: ShardWorker):
+    return {"status": shard_queue.heartbeat(shard_id, request.worker)}
+
+@router.post("/shards/{shard_id}/leads")
+def add_shard_lead(shard_id: int, request: ShardLead):
+    return {"result": shard_queue.add_lead(shard_id, request.lead)}
+
+@router.post("/shards/{shard_id}/complete")
+def complete_shard(shard_id: int, request: ShardComplete):
+    shard_queue.complete(shard_id, request.worker, request.error)
+    return {"status": "ok"}
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, since: Optional[int] = None):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {**job.to_dict(), **log_payload(job.logs, since)}
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if not job_manager.cancel(job_id):
+        raise HTTPException(status_code=400, detail=f"Job is already {job.status}.")
+    return job.to_dict()
+
+@router.get("/jobs/{job_id}/stream")
+def stream_job_logs(job_id: str, since: int = 0, last_event_id: Optional[int] = Header(None)):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return StreamingResponse(
+        sse_events(job.logs, last_event_id or since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @router.get("/status")
-def get_scrape_status():
-    # In a full production app, Websockets or Server-Sent Events (SSE) are better.
-    # For this MVP, we use simple polling to fetch logs.
-    current_logs = scraper_module.scrape_logs
+def get_scrape_status(since: Optional[int] = None):
+    # Pass the last seen "seq" as since to only receive newer lines
+    # Combined feed of every job, each line tagged with its job id
     return {
-        "status": "running" if current_logs and "Done!" not in current_logs[-1] else "idle",
-        "logs": current_logs
+        "status": "running" if job_manager.active() else "idle",
+        **log_payload(scraper_module.scrape_logs, since)
     }
+
+@router.get("/stream")
+def stream_scrape_logs(since: int = 0, last_event_id: Optional[int] = Header(None)):
+    # Server-Sent Events: pushes every log line as it is written
+    return StreamingResponse(
+        sse_events(scraper_module.scrape_logs, last_event_id or since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
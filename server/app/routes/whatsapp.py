@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import Optional
 
 from app.services.whatsapp import WhatsAppService, whatsapp_logs
+from app.core.log_buffer import log_payload, sse_events
 
 router = APIRouter()
 
@@ -11,6 +14,8 @@ current_wa_service = None
 class WhatsAppRequest(BaseModel):
     message_template: str
     limit: int = 50 # Default safe limit
+    messages_per_minute: float = 4
+    default_region: Optional[str] = None # ISO country code, e.g. "IN"; server default when empty
 
 @router.post("/start")
 def start_whatsapp(request: WhatsAppRequest):
@@ -23,15 +28,27 @@ def start_whatsapp(request: WhatsAppRequest):
     
     current_wa_service = WhatsAppService(
         message_template=request.message_template,
-        limit=request.limit
+        limit=request.limit,
+        messages_per_minute=request.messages_per_minute,
+        default_region=request.default_region
     )
     current_wa_service.start_in_background()
     
     return {"status": "started", "message": "WhatsApp automation started. Please check server logs/browser for QR code setup."}
 
 @router.get("/status")
-def get_whatsapp_status():
+def get_whatsapp_status(since: Optional[int] = None):
+    # Pass the last seen "seq" as since to only receive newer lines
     return {
         "status": "running" if current_wa_service and current_wa_service.is_running else "idle",
-        "logs": whatsapp_logs
+        **log_payload(whatsapp_logs, since)
     }
+
+@router.get("/stream")
+def stream_whatsapp_logs(since: int = 0, last_event_id: Optional[int] = Header(None)):
+    # Server-Sent Events: pushes every log line as it is written
+    return StreamingResponse(
+        sse_events(whatsapp_logs, last_event_id or since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
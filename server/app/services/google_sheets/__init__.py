@@ -1,22 +1,166 @@
 import os
+import re
+import hashlib
+import time
+import threading
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from google.auth.transport.requests import Request
 
+from app.services.lead_store import lead_store, LEAD_FIELDS, SCRAPED_AT, format_timestamp
+from app.services.google_sheets.gateway import sheets_gateway, INTERACTIVE, BULK
+
 # Define the scopes
 SCOPES = [
     "https://www.googleapis.com/auth/spreadsheets",
     "https://www.googleapis.com/auth/drive.file"
 ]
 
+# How often the lead count is checked against the sheet for rows added by someone else
+COUNT_RECONCILE_INTERVAL = 60
+
+HEADERS = ['Name', 'Phone', 'Profession', 'Status', 'Email', 'Website', 'Address', 'Query', 'Rating', 'Scraped At']
+
+def row_fingerprint(values: list, status_col: int = 4) -> str:
+    # Status is left out because we rewrite it ourselves without touching the rest of the row
+    cells = [str(v).strip() for i, v in enumerate(values, start=1) if i != status_col]
+    while cells and not cells[-1]:
+        cells.pop()
+    return hashlib.sha1("\x1f".join(cells).encode("utf-8")).hexdigest()
+
+def column_map(headers: list) -> dict:
+    # Map lead fields to sheet column indexes, tolerating hand-made sheets
+    headers = [h.strip().lower().replace(" ", "_") for h in headers]
+    columns = {field: next((i for i, h in enumerate(headers) if h == field), None) for field in LEAD_FIELDS + [SCRAPED_AT]}
+    if columns["phone"] is None:
+        columns["phone"] = next((i for i, h in enumerate(headers) if "phone" in h or "contact" in h), None)
+    if columns["status"] is None:
+        columns["status"] = next((i for i, h in enumerate(headers) if "status" in h), None)
+    return columns
+
+def leads_from_values(values: list, columns: dict, first_row: int) -> list:
+    leads = []
+    for sheet_row, row in enumerate(values, start=first_row):
+        if not any(str(v).strip() for v in row):
+            continue
+        lead = {field: row[i] if i is not None and i < len(row) else "" for field, i in columns.items()}
+        leads.append((sheet_row, lead))
+    return leads
+
+class LeadSyncer:
+    """Pushes leads changed in the local lead store to the sheet in batches.
+
+    New leads go out in one append_rows call, status changes in one
+    batch_update. A sync runs once max_rows changes are pending, once the
+    oldest change has waited max_wait seconds, or when flush() is called.
+    """
+    def __init__(self, service, max_rows=25, max_wait=10.0):
+        self.service = service
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.oldest_change_at = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock() # Keeps concurrent flushes in order
+        self.timer = None
+
+    def notify(self):
+        # Called after every local change that still has to reach the sheet
+        with self.lock:
+            if self.oldest_change_at is None:
+                self.oldest_change_at = time.time()
+            if not self.timer or not self.timer.is_alive():
+                self.timer = threading.Thread(target=self._flush_when_due, daemon=True)
+                self.timer.start()
+        if self.pending() >= self.max_rows:
+            self.flush()
+
+    def pending(self) -> int:
+        if not self.service.sheet_id:
+            return 0
+        return lead_store.pending_count(self.service.sheet_id)
+
+    def flush(self) -> int:
+        """Sync every pending change; returns how many leads were written."""
+        sheet_id = self.service.sheet_id
+        if not sheet_id or not self.service.client:
+            return 0
+        with self.flush_lock:
+            with self.lock:
+                self.oldest_change_at = None
+            written = 0
+            if not lead_store.pending_count(sheet_id):
+                return 0
+            try:
+                worksheet = self.service.get_worksheet()
+                new_leads = lead_store.unappended_leads(sheet_id)
+                if new_leads:
+                    rows = [[lead[field] for field in LEAD_FIELDS] + [format_timestamp(lead[SCRAPED_AT])] for lead in new_leads]
+                    response = sheets_gateway.call("append_rows", worksheet.append_rows, rows)
+                    first_row = self._first_appended_row(response)
+                    lead_store.mark_appended(new_leads, first_row)
+                    # Remember the new tail so the next run only reads rows appended after it.
+                    # An unknown position forces a full rebuild instead.
+                    last_row = first_row + len(rows) - 1 if first_row else 0
+                    lead_store.record_sheet_tail(sheet_id, last_row, row_fingerprint(rows[-1], lead_store.status_column(sheet_id)))
+                    written += len(new_leads)
+
+                changed = lead_store.changed_statuses(sheet_id)
+                if any(lead["sheet_row"] == 0 for lead in changed):
+                    # Appended at a row we never learned, find it before writing its status
+                    self.service.import_sheet(sheet_id, worksheet)
+                    changed = lead_store.changed_statuses(sheet_id)
+                # Leads still without a row stay dirty rather than losing their status
+                placed = [lead for lead in changed if lead["sheet_row"] > 0]
+                if placed:
+                    status_col = lead_store.status_column(sheet_id)
+                    updates = [
+                        {"range": rowcol_to_a1(lead["sheet_row"], status_col), "values": [[lead["status"]]]}
+                        for lead in placed
+                    ]
+                    sheets_gateway.call("batch_update", worksheet.batch_update, updates)
+                    lead_store.mark_synced(placed)
+                    written += len(updates)
+                # Our own writes move Drive's modified time too, taken once right after them
+                lead_store.record_sheet_modified(sheet_id, self.service.modified_time(worksheet))
+            except Exception as e:
+                print(f"Error syncing leads to sheet: {e}")
+                # Leave the changes dirty so the next flush retries them
+                with self.lock:
+                    self.oldest_change_at = time.time()
+            return written
+
+    def _first_appended_row(self, response) -> int:
+        # e.g. {"updates": {"updatedRange": "Sheet1!A5:I7"}} -> 5
+        updated_range = ((response or {}).get("updates") or {}).get("updatedRange", "")
+        match = re.search(r"![A-Z]+(\d+)", updated_range)
+        return int(match.group(1)) if match else 0
+
+    def _flush_when_due(self):
+        while True:
+            time.sleep(1)
+            with self.lock:
+                if self.oldest_change_at is None:
+                    self.timer = None
+                    return
+                due = time.time() - self.oldest_change_at >= self.max_wait
+            if due:
+                self.flush()
+
 class GoogleSheetsService:
     def __init__(self):
         self.creds = None
         self.client = None
         self.sheet_id = None
-        self.existing_phones = set()
-        self.existing_names = set()
+        self.worksheet = None
+        self.lead_syncer = LeadSyncer(self)
+        self.sheet_lock = threading.Lock()
+        # Served by /status/leads; bumped on every append, reconciled against the sheet in the background
+        self.lead_count = None
+        self.count_lock = threading.Lock()
+        self.count_checked_at = 0
+        self.count_thread = None
         
         if os.path.exists("token.json"):
             try:
@@ -67,88 +211,190 @@ class GoogleSheetsService:
          return True
 
     def create_or_get_sheet(self, sheet_name="GMB Scraper Results"):
+        # Concurrent scrape jobs share the sheet, only one of them opens and reconciles it
+        with self.sheet_lock:
+            return self._create_or_get_sheet(sheet_name)
+
+    def _create_or_get_sheet(self, sheet_name):
         if not self.client:
             raise Exception("User not authenticated with Google")
             
         try:
              # Try to find existing
-             sh = self.client.open(sheet_name)
-             worksheet = sh.sheet1
-             # Cache existing records for deduplication
-             records = worksheet.get_all_records()
-             self.existing_phones = {str(r.get('Phone', '')).strip() for r in records if str(r.get('Phone', '')).strip()}
-             self.existing_names = {str(r.get('Name', '')).strip().lower() for r in records if str(r.get('Name', '')).strip()}
+             sh = sheets_gateway.call("open", self.client.open, sheet_name, priority=INTERACTIVE)
+             worksheet = sheets_gateway.call("sheet1", lambda: sh.sheet1, priority=INTERACTIVE)
+             if self.sheet_id != sh.id:
+                 # Don't let changes pending for the previous sheet wait on a switch
+                 self.lead_syncer.flush()
+             self.sheet_id = sh.id
+             self.worksheet = worksheet
+             # Take edits made in the sheet first, a flush records its modified time as ours
+             if not self.sync_new_rows(sh.id, worksheet):
+                 self.import_sheet(sh.id, worksheet)
+             # Then push what a previous run left unsynced
+             self.lead_syncer.flush()
         except gspread.exceptions.SpreadsheetNotFound:
              # Create new
-             sh = self.client.create(sheet_name)
+             sh = sheets_gateway.call("create", self.client.create, sheet_name, priority=INTERACTIVE)
              # Basic headers
-             worksheet = sh.sheet1
-             worksheet.update('A1:I1', [['Name', 'Phone', 'Profession', 'Status', 'Email', 'Website', 'Address', 'Query', 'Rating']])
-             self.existing_phones = set()
-             self.existing_names = set()
+             worksheet = sheets_gateway.call("sheet1", lambda: sh.sheet1, priority=INTERACTIVE)
+             sheets_gateway.call("update", worksheet.update, 'A1:J1', [HEADERS], priority=INTERACTIVE)
+             lead_store.import_sheet(sh.id, [], headers=HEADERS, row_count=1, tail_hash=row_fingerprint(HEADERS),
+                                     modified_time=self.modified_time(worksheet, INTERACTIVE))
              
         self.sheet_id = sh.id
+        self.worksheet = worksheet
+        # Counted against the newly opened sheet on the next read
+        with self.count_lock:
+            self.lead_count = None
+            self.count_checked_at = 0
         return sh.url
 
+    def import_sheet(self, sheet_id, worksheet):
+        # Full read of the sheet, only needed the first time or when the sheet changed under us.
+        # The modified time is taken first so an edit made during the read shows up next time.
+        modified_time = self.modified_time(worksheet)
+        all_values = sheets_gateway.call("get_all_values", worksheet.get_all_values, priority=BULK)
+        headers = all_values[0] if all_values else []
+        if headers == HEADERS[:-1]:
+            # Sheets made before the scrape time was written get its header, rows appended from now on fill it
+            sheets_gateway.call("update", worksheet.update, 'J1', [HEADERS[-1:]])
+            headers = all_values[0] = HEADERS
+        columns = column_map(headers)
+        status_col = columns["status"] + 1 if columns["status"] is not None else 4
+        tail_hash = row_fingerprint(all_values[-1], status_col) if all_values else ""
+        lead_store.import_sheet(
+            sheet_id, leads_from_values(all_values[1:], columns, 2), status_col, # +1 for 0-index, +1 for header
+            headers=headers, row_count=len(all_values), tail_hash=tail_hash, modified_time=modified_time
+        )
+        print(f"Imported {len(all_values) - 1 if all_values else 0} rows from sheet {sheet_id}")
+
+    def modified_time(self, worksheet, priority=BULK) -> str:
+        """Drive's modifiedTime of the spreadsheet, '' when Drive can't tell us."""
+        try:
+            return sheets_gateway.call("modified_time", worksheet.spreadsheet.get_lastUpdateTime, priority=priority)
+        except Exception as e:
+            print(f"Could not read the sheet's modified time: {e}")
+            return ""
+
+    def sync_new_rows(self, sheet_id, worksheet, priority=INTERACTIVE) -> bool:
+        """Bring the local store up to date without reading the whole sheet.
+
+        Nothing is read when Drive's modified time is the one we recorded
+        after our own last write. Otherwise, or when Drive can't tell, rows
+        appended after the last row we saw and the status column are read;
+        False means that row no longer matches and the sheet has to be
+        imported in full.
+        """
+        state = lead_store.sheet_state(sheet_id)
+        if not state or state["row_count"] < 1 or not state["headers"]:
+            return False
+        modified_time = self.modified_time(worksheet, priority)
+        if modified_time and modified_time == state["modified_time"]:
+            return True
+        last_row = state["row_count"]
+        values = sheets_gateway.call("get", worksheet.get, f"A{last_row}:{rowcol_to_a1(1, worksheet.col_count)[:-1]}", priority=priority)
+        if not values or row_fingerprint(values[0], state["status_col"]) != state["tail_hash"]:
+            print(f"Sheet {sheet_id} changed since the last run, rebuilding the local copy")
+            return False
+        new_values = values[1:]
+        if new_values:
+            columns = column_map(state["headers"])
+            lead_store.append_sheet_rows(
+                sheet_id, leads_from_values(new_values, columns, last_row + 1),
+                last_row + len(new_values), row_fingerprint(new_values[-1], state["status_col"])
+            )
+            print(f"Loaded {len(new_values)} new rows from sheet {sheet_id}")
+        # Statuses are edited by hand too (e.g. do-not-contact), and the tail check can't see them
+        statuses = sheets_gateway.call("col_values", worksheet.col_values, state["status_col"], priority=priority)
+        # Trailing empty cells are left out of the response
+        statuses += [""] * (last_row + len(new_values) - len(statuses))
+        refreshed = lead_store.refresh_statuses(sheet_id, {row: status for row, status in enumerate(statuses[1:], start=2)})
+        if refreshed:
+            print(f"Took {refreshed} status changes from sheet {sheet_id}")
+        if modified_time:
+            # Taken before the reads, so an edit made meanwhile is looked at next time
+            lead_store.record_sheet_modified(sheet_id, modified_time)
+        return True
+
+    def get_worksheet(self):
+        # Cached handle so syncs don't cost an extra open_by_key round-trip
+        if self.worksheet is None or self.worksheet.spreadsheet.id != self.sheet_id:
+            self.worksheet = sheets_gateway.call("open_by_key", lambda: self.client.open_by_key(self.sheet_id).sheet1)
+        return self.worksheet
+
     def append_lead(self, lead_data: dict):
         if not self.client or not self.sheet_id:
             raise Exception("Sheet not connected")
             
-        phone = lead_data.get("phone", "").strip()
-        name = lead_data.get("name", "").strip()
-        
-        if phone and phone in self.existing_phones:
+        # Dedup and insert are one atomic statement on the local store's indexes
+        if not lead_store.add_lead(self.sheet_id, {**lead_data, "status": "New"}):
             return False
-        if name and name.lower() in self.existing_names:
-            return False
-            
-        sh = self.client.open_by_key(self.sheet_id)
-        worksheet = sh.sheet1
-        
-        row = [
-            name,
-            phone,
-            lead_data.get("profession", ""),
-            "New",
-            lead_data.get("email", ""),
-            lead_data.get("website", ""),
-            lead_data.get("address", ""),
-            lead_data.get("query", ""),
-            lead_data.get("rating", "")
-        ]
-        
-        # Simple append
-        worksheet.append_row(row)
-        
-        if phone: self.existing_phones.add(phone)
-        if name: self.existing_names.add(name.lower())
+        with self.count_lock:
+            if self.lead_count is not None:
+                self.lead_count += 1
+        self.lead_syncer.notify()
         return True
 
+    def update_status(self, lead_id: int, status: str):
+        lead_store.update_status(lead_id, status)
+        self.lead_syncer.notify()
+
+    def update_statuses(self, lead_ids: list, status: str):
+        if lead_ids:
+            lead_store.update_statuses(lead_ids, status)
+            self.lead_syncer.notify()
+
+    def flush_leads(self) -> int:
+        return self.lead_syncer.flush()
+
     def get_lead_count(self, sheet_name="GMB Scraper Results") -> int:
-        import time
+        """In-memory lead count, seeded from the local store; the Sheets API is only asked from a background thread."""
         if not self.client:
             return 0
-            
-        current_time = time.time()
-        # Cache the count for 10 seconds to avoid 429 quota errors
-        if hasattr(self, 'cached_lead_count') and hasattr(self, 'last_count_refresh'):
-            if current_time - self.last_count_refresh < 10:
-                return self.cached_lead_count
-                
+        with self.count_lock:
+            if self.lead_count is None and self.sheet_id:
+                self.lead_count = lead_store.count_leads(self.sheet_id)
+        if time.time() - self.count_checked_at >= COUNT_RECONCILE_INTERVAL:
+            self.reconcile_lead_count(sheet_name)
+        return self.lead_count or 0
+
+    def reconcile_lead_count(self, sheet_name="GMB Scraper Results"):
+        with self.count_lock:
+            if self.count_thread and self.count_thread.is_alive():
+                return
+            self.count_checked_at = time.time()
+            self.count_thread = threading.Thread(target=self._reconcile_lead_count, args=(sheet_name,), daemon=True)
+            self.count_thread.start()
+
+    def _reconcile_lead_count(self, sheet_name, priority=BULK):
+        # Count only: rows in the sheet plus leads still waiting to be appended. The local copy is
+        # only brought up to date when the sheet is opened, never from here.
         try:
-             sh = self.client.open(sheet_name)
-             worksheet = sh.sheet1
-             records = worksheet.get_all_values()
-             count = max(0, len(records) - 1)
-             
-             self.cached_lead_count = count
-             self.last_count_refresh = current_time
-             return count
+            with self.sheet_lock:
+                sheet_id = self.sheet_id
+            if sheet_id:
+                worksheet = self.get_worksheet()
+            else:
+                # Not opened yet: count the sheet without adopting it, that needs an import first
+                sh = sheets_gateway.call("open", self.client.open, sheet_name, priority=priority)
+                sheet_id = sh.id
+                worksheet = sheets_gateway.call("sheet1", lambda: sh.sheet1, priority=priority)
+            state = lead_store.sheet_state(sheet_id)
+            name_col = column_map(state["headers"])["name"] if state else None
+            # A flush in progress would otherwise count its leads twice, or not at all
+            with self.lead_syncer.flush_lock:
+                names = sheets_gateway.call("col_values", worksheet.col_values, (name_col or 0) + 1, priority=priority)
+                count = sum(1 for name in names[1:] if str(name).strip()) + lead_store.unappended_count(sheet_id)
+            with self.count_lock:
+                # A different sheet opened meanwhile is counted on its own next time
+                if self.sheet_id in (None, sheet_id):
+                    self.lead_count = count
+        except gspread.exceptions.SpreadsheetNotFound:
+            with self.count_lock:
+                self.lead_count = 0
         except Exception as e:
-             if "429" in str(e):
-                 # If rate limited, return the cached count if we have one
-                 return getattr(self, 'cached_lead_count', 0)
-             return 0
+            print(f"Error reconciling lead count: {e}")
 
 # Instantiate a singleton for this MVP (note: this only supports 1 user at a time)
 sheets_service = GoogleSheetsService()
@@ -0,0 +1,149 @@
+import os
+import time
+import random
+import threading
+from collections import defaultdict
+
+import gspread
+import requests
+
+from app.core.metrics import registry
+
+# Sheets API default quota: 60 requests per minute per user
+REQUESTS_PER_MINUTE = int(os.getenv("LEADNEST_SHEETS_PER_MINUTE", "60"))
+# Share of the bucket only interactive calls may use, so bulk syncs never drain it completely
+INTERACTIVE_RESERVE = 0.2
+
+CALL_SECONDS = registry.histogram("leadnest_sheets_call_seconds", "Sheets API call latency, retries included.", labels=("call",))
+CALL_ERRORS = registry.counter("leadnest_sheets_errors_total", "Failed Sheets API attempts by call and kind.", labels=("call", "kind"))
+
+INTERACTIVE = 0
+BULK = 1
+
+MAX_BACKOFF = 32.0
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, gspread.exceptions.APIError):
+        status = getattr(error.response, "status_code", None) or error.code
+        return status == 429 or (isinstance(status, int) and status >= 500)
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+def is_rate_limited(error: Exception) -> bool:
+    if not isinstance(error, gspread.exceptions.APIError):
+        return False
+    return (getattr(error.response, "status_code", None) or error.code) == 429
+
+class CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.total_ms = 0
+        self.wait_ms = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rateLimited": self.rate_limited,
+            "avgMs": self.total_ms // self.calls if self.calls else 0,
+            "waitMs": self.wait_ms,
+        }
+
+class SheetsGateway:
+    """Single path for every Sheets API call, shared by all threads.
+
+    A token bucket sized to the per-minute quota spaces calls out. Interactive
+    calls (UI reads) go before bulk ones (syncs, imports) and have a reserve
+    of tokens bulk calls can't touch. 429 and 5xx responses are retried with
+    exponential backoff, and a 429 empties the bucket for everyone.
+    """
+    def __init__(self, per_minute: int = REQUESTS_PER_MINUTE, max_retries: int = 5):
+        self.capacity = max(1, per_minute)
+        self.rate = self.capacity / 60.0
+        self.max_retries = max_retries
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.waiting = [0, 0] # Threads waiting per priority
+        self.cond = threading.Condition()
+        self.stats = defaultdict(CallStats)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _acquire(self, priority: int):
+        with self.cond:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    self._refill()
+                    if priority == INTERACTIVE:
+                        floor = 0
+                    elif self.waiting[INTERACTIVE]:
+                        floor = self.capacity # Step aside while interactive calls wait
+                    else:
+                        floor = self.capacity * INTERACTIVE_RESERVE
+                    if self.tokens >= 1 + floor:
+                        self.tokens -= 1
+                        return
+                    needed = 1 + min(floor, self.capacity - 1) - self.tokens
+                    self.cond.wait(timeout=max(0.05, needed / self.rate))
+            finally:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
+
+    def _throttled(self):
+        # The quota is per user, so every caller backs off, not just the one that was told
+        with self.cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+    def call(self, name: str, fn, *args, priority: int = BULK, retries: int = None, **kwargs):
+        """Runs fn(*args, **kwargs) under the quota; name groups calls in the metrics."""
+        stats = self.stats[name]
+        retries = self.max_retries if retries is None else retries
+        attempt = 0
+        first_started = time.monotonic()
+        while True:
+            started = time.monotonic()
+            self._acquire(priority)
+            acquired = time.monotonic()
+            stats.wait_ms += int((acquired - started) * 1000)
+            stats.calls += 1
+            try:
+                result = fn(*args, **kwargs)
+                stats.total_ms += int((time.monotonic() - acquired) * 1000)
+                CALL_SECONDS.observe(time.monotonic() - first_started, call=name)
+                return result
+            except Exception as e:
+                stats.total_ms += int((time.monotonic() - acquired) * 1000)
+                if is_rate_limited(e):
+                    stats.rate_limited += 1
+                    self._throttled()
+                CALL_ERRORS.inc(call=name, kind="rate_limited" if is_rate_limited(e) else type(e).__name__)
+                if attempt >= retries or not is_retryable(e):
+                    stats.errors += 1
+                    CALL_SECONDS.observe(time.monotonic() - first_started, call=name)
+                    raise
+                stats.retries += 1
+                delay = min(MAX_BACKOFF, 2 ** attempt) + random.uniform(0, 1)
+                attempt += 1
+                print(f"Sheets {name} failed ({e}), retry {attempt}/{retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def snapshot(self) -> dict:
+        with self.cond:
+            self._refill()
+            tokens = self.tokens
+        return {
+            "perMinute": self.capacity,
+            "tokens": round(tokens, 1),
+            "calls": {name: stats.to_dict() for name, stats in sorted(self.stats.items())},
+        }
+
+# One gateway per process, the quota belongs to the signed-in user
+sheets_gateway = SheetsGateway()
@@ -0,0 +1,213 @@
+import os
+import time
+import uuid
+import random
+import socket
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from app.core.log_buffer import LogBuffer
+from app.core.browser_pool import browser_pool
+from app.services.scraper import GMBScraper, scrape_logs
+from app.services.scraper.shards import shard_queue
+from app.services.scraper.shard_worker import local_worker
+from app.services.google_sheets import sheets_service
+
+MAX_CONCURRENT_JOBS = int(os.getenv("LEADNEST_MAX_JOBS", "2"))
+# Finished jobs kept around for inspection
+MAX_FINISHED_JOBS = 50
+# How often a distributed run's leads are pushed to the sheet
+SHARD_SYNC_INTERVAL = 10
+
+ACTIVE_STATES = ("queued", "running", "stopping")
+
+class ScrapeJob:
+    def __init__(self, params: dict):
+        self.id = uuid.uuid4().hex[:8]
+        self.params = params
+        self.status = "queued"
+        self.logs = LogBuffer()
+        self.scraper = None
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def log(self, msg: str):
+        # Per-job log plus the shared feed, tagged so interleaved jobs stay readable
+        print(f"[{self.id}] {msg}")
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        self.logs.append(f"[{timestamp}] {msg}")
+        scrape_logs.append(f"[{timestamp}] [{self.id}] {msg}")
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "params": self.params,
+            "progress": dict(self.scraper.stats, leads=self.scraper.budget.used, limit=self.scraper.limit) if self.scraper else None,
+            "stages": self.scraper.timings.to_dict() if self.scraper else None,
+            "runId": self.scraper.run_id if self.scraper else None,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+class JobManager:
+    """Queue of scrape jobs run by a fixed number of asyncio workers.
+
+    Workers are started on the running event loop the first time a job
+    is submitted.
+    """
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_JOBS):
+        self.max_concurrent = max(1, max_concurrent)
+        self.jobs = OrderedDict()
+        self.queue = None
+        self.workers = []
+
+    def submit(self, params: dict) -> ScrapeJob:
+        self._ensure_workers()
+        job = ScrapeJob(params)
+        self.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        job.log(f"Queued ({self.queued_count()} waiting, {self.running_count()} running).")
+        self._prune()
+        return job
+
+    def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        return list(reversed(self.jobs.values()))
+
+    def active(self) -> list:
+        return [job for job in self.jobs.values() if job.is_active]
+
+    def running_count(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status in ("running", "stopping"))
+
+    def queued_count(self) -> int:
+        return sum(1 for job in self.jobs.values() if job.status == "queued")
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if not job or not job.is_active:
+            return False
+        if job.status == "queued":
+            # The worker skips it when it comes off the queue
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            job.log("🛑 Cancelled before it started.")
+        else:
+            job.status = "stopping"
+            if job.scraper:
+                job.scraper.stop()
+            job.log("🛑 Stop signal sent to scraper.")
+        return True
+
+    def _ensure_workers(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        self.workers = [worker for worker in self.workers if not worker.done()]
+        while len(self.workers) < self.max_concurrent:
+            self.workers.append(asyncio.get_running_loop().create_task(self._worker()))
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            if job.status != "queued":
+                continue
+            await self._run(job)
+
+    async def _run(self, job: ScrapeJob):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            # Inside the try so bad params fail the job instead of killing the worker task
+            job.scraper = GMBScraper.from_params(job.params, browser_pool=browser_pool, log=job.log)
+            job.result = await job.scraper.run_async()
+            if job.scraper.should_stop:
+                job.status = "cancelled"
+            elif job.result is None:
+                # run_async logs the reason and returns early, e.g. the sheet is not connected
+                job.status = "failed"
+                job.error = "Run aborted before scraping, see the job log."
+            else:
+                job.status = "completed"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            job.log(f"❌ Job failed: {e}")
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job for job in self.jobs.values() if not job.is_active]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job.id]
+
+job_manager = JobManager()
+
+class ShardCoordinator:
+    """Starts distributed runs and keeps their leads flowing to the sheet.
+
+    The run's queries are split into shards in the shard queue. Local
+    workers run in a process pool on this host, remote ones pull shards
+    through the API. Workers write leads to the local store (directly or
+    through the API), so the sheet sync for the run happens here.
+    """
+    def __init__(self):
+        self.monitors = {}
+
+    def start(self, params: dict, shard_size: int, local_workers: int) -> dict:
+        queries = GMBScraper.from_params(params).all_queries()
+        random.shuffle(queries)
+        run_id = shard_queue.create_run(params, sheets_service.sheet_id, queries, shard_size)
+        executor = None
+        futures = []
+        if local_workers > 0:
+            # Spawned, not forked: the server process has threads and a running event loop
+            executor = ProcessPoolExecutor(max_workers=local_workers, mp_context=multiprocessing.get_context("spawn"))
+            futures = [
+                asyncio.wrap_future(executor.submit(local_worker, run_id, f"{socket.gethostname()}-{i + 1}"))
+                for i in range(local_workers)
+            ]
+        self.monitors[run_id] = asyncio.get_running_loop().create_task(self._monitor(run_id, futures, executor))
+        print(f"Distributed run {run_id}: {len(queries)} queries in shards of {shard_size}, {local_workers} local workers.")
+        return shard_queue.run_status(run_id)
+
+    def stop(self, run_id: str) -> bool:
+        # Workers notice on their next heartbeat or lead
+        return shard_queue.stop_run(run_id)
+
+    async def _monitor(self, run_id: str, futures: list, executor):
+        try:
+            while True:
+                await asyncio.sleep(SHARD_SYNC_INTERVAL)
+                if sheets_service.lead_syncer.pending():
+                    await asyncio.to_thread(sheets_service.lead_syncer.notify)
+                for future in [future for future in futures if future.done()]:
+                    futures.remove(future)
+                    if future.exception():
+                        print(f"Distributed run {run_id}: local worker failed: {future.exception()}")
+                if not futures and shard_queue.run_status(run_id)["status"] != "running":
+                    break
+            await asyncio.to_thread(sheets_service.flush_leads)
+            if sheets_service.client:
+                sheets_service.reconcile_lead_count()
+            print(f"Distributed run {run_id} finished: {shard_queue.run_status(run_id)['leadsAdded']} leads added.")
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+            self.monitors.pop(run_id, None)
+
+shard_coordinator = ShardCoordinator()
@@ -0,0 +1,96 @@
+import io
+import csv
+import json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError: # Optional: only needed for Parquet exports
+    pyarrow = None
+
+from app.services.lead_store import lead_store, LEAD_FIELDS, SCRAPED_AT, format_timestamp
+
+# The store's row ids change when a sheet is imported into a fresh store, so they stay internal
+EXPORT_FIELDS = LEAD_FIELDS + [SCRAPED_AT]
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+# Rows read from the store per batch; also one Parquet row group
+BATCH_SIZE = 2000
+
+def lead_record(row) -> dict:
+    record = {field: row[field] for field in EXPORT_FIELDS}
+    record[SCRAPED_AT] = format_timestamp(row[SCRAPED_AT])
+    return record
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in batches:
+        for row in rows:
+            record = lead_record(row)
+            writer.writerow([record[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def jsonl_chunks(batches):
+    for rows in batches:
+        yield "".join(json.dumps(lead_record(row), ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain."""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def parquet_chunks(batches):
+    # One row group per batch; the footer with the row group index comes last
+    schema = pyarrow.schema([(field, pyarrow.string()) for field in EXPORT_FIELDS])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in batches:
+            records = [lead_record(row) for row in rows]
+            columns = {field: [record[field] for record in records] for field in EXPORT_FIELDS}
+            writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def export_leads(sheet_id: str, fmt: str, query: str = None, statuses: list = None,
+                 since: float = None, until: float = None):
+    """Encoded chunks of the matching leads; memory stays at one batch whatever the size of the store."""
+    batches = lead_store.iter_leads(sheet_id, query=query, statuses=statuses, since=since, until=until,
+                                    batch_size=BATCH_SIZE)
+    if fmt == "csv":
+        return csv_chunks(batches)
+    if fmt == "jsonl":
+        return jsonl_chunks(batches)
+    if fmt == "parquet":
+        if pyarrow is None:
+            raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+        return parquet_chunks(batches)
+    raise ValueError(f"Unknown export format: {fmt}")
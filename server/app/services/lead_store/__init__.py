@@ -0,0 +1,401 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import urllib.parse
+from datetime import datetime, timezone
+
+from app.services.phones import phone_key
+
+DB_PATH = os.getenv("LEADNEST_DB", "leads.db")
+# Shard worker processes write to the same SQLite files as the server, every connection waits this long for the lock
+BUSY_TIMEOUT = 30
+
+# Columns in the order the app writes them to the sheet
+LEAD_FIELDS = ["name", "phone", "profession", "status", "email", "website", "address", "query", "rating"]
+# Written to the sheet after LEAD_FIELDS, so the original scrape time survives a re-import or a new store
+SCRAPED_AT = "scraped_at"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet_id TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    name_key TEXT NOT NULL DEFAULT '',
+    phone TEXT NOT NULL DEFAULT '',
+    profession TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'New',
+    email TEXT NOT NULL DEFAULT '',
+    website TEXT NOT NULL DEFAULT '',
+    website_key TEXT NOT NULL DEFAULT '',
+    address TEXT NOT NULL DEFAULT '',
+    query TEXT NOT NULL DEFAULT '',
+    rating TEXT NOT NULL DEFAULT '',
+    sheet_row INTEGER,
+    version INTEGER NOT NULL DEFAULT 1,
+    synced_version INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+-- Partial unique indexes make dedup and insert a single atomic statement
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_phone ON leads(sheet_id, phone) WHERE phone != '';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_leads_name ON leads(sheet_id, name_key) WHERE name_key != '';
+CREATE INDEX IF NOT EXISTS idx_leads_website ON leads(sheet_id, website_key);
+CREATE INDEX IF NOT EXISTS idx_leads_status ON leads(sheet_id, status);
+CREATE INDEX IF NOT EXISTS idx_leads_unsynced ON leads(sheet_id, synced_version, version);
+
+CREATE TABLE IF NOT EXISTS sheets (
+    sheet_id TEXT PRIMARY KEY,
+    status_col INTEGER NOT NULL DEFAULT 4,
+    imported_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, created on older databases at startup
+MIGRATIONS = {
+    "leads": [
+        ("phone_key", "TEXT NOT NULL DEFAULT ''"),
+        ("scraped_at", "REAL"),
+    ],
+    "sheets": [
+        ("headers", "TEXT NOT NULL DEFAULT '[]'"),
+        ("row_count", "INTEGER NOT NULL DEFAULT 0"),
+        ("tail_hash", "TEXT NOT NULL DEFAULT ''"),
+        ("modified_time", "TEXT NOT NULL DEFAULT ''"),
+    ],
+}
+
+# Indexes on migrated columns, created once the columns exist
+POST_MIGRATION = """
+CREATE INDEX IF NOT EXISTS idx_leads_phone_key ON leads(sheet_id, phone_key);
+"""
+
+def format_timestamp(timestamp) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="seconds") if timestamp else ""
+
+def parse_timestamp(value):
+    # ISO datetime as written by format_timestamp; None when the cell is empty or unreadable
+    try:
+        parsed = datetime.fromisoformat(str(value or "").strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def normalize_name(name: str) -> str:
+    return (name or "").strip().lower()
+
+def normalize_website(url: str) -> str:
+    url = (url or "").strip().lower()
+    if not url:
+        return ""
+    parsed = urllib.parse.urlparse(url if "://" in url else "http://" + url)
+    host = parsed.netloc
+    if host.startswith("www."):
+        host = host[4:]
+    return host + parsed.path.rstrip("/")
+
+class LeadStore:
+    """Local SQLite system of record for leads; the Google Sheet is a sync target.
+
+    A lead is dirty while version > synced_version. Rows without a sheet_row
+    still have to be appended, the rest only need their status pushed.
+    """
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        with self.lock, self.conn:
+            for table, columns in MIGRATIONS.items():
+                existing = {row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for name, definition in columns:
+                    if name not in existing:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+                        if (table, name) == ("leads", "phone_key"):
+                            rows = self.conn.execute("SELECT id, phone FROM leads WHERE phone != ''").fetchall()
+                            self.conn.executemany(
+                                "UPDATE leads SET phone_key = ? WHERE id = ?", [(phone_key(row["phone"]), row["id"]) for row in rows]
+                            )
+                        if (table, name) == ("leads", "scraped_at"):
+                            self.conn.execute("UPDATE leads SET scraped_at = created_at")
+            self.conn.executescript(POST_MIGRATION)
+
+    def has_sheet(self, sheet_id: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM sheets WHERE sheet_id = ?", (sheet_id,)).fetchone() is not None
+
+    def status_column(self, sheet_id: str) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT status_col FROM sheets WHERE sheet_id = ?", (sheet_id,)).fetchone()
+            return row["status_col"] if row else 4
+
+    def sheet_state(self, sheet_id: str):
+        """Returns what we last saw of the sheet: headers, row_count, tail_hash and Drive's modified_time."""
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM sheets WHERE sheet_id = ?", (sheet_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "status_col": row["status_col"],
+            "headers": json.loads(row["headers"]),
+            "row_count": row["row_count"],
+            "tail_hash": row["tail_hash"],
+            "modified_time": row["modified_time"],
+        }
+
+    def import_sheet(self, sheet_id: str, rows: list, status_col: int = 4, headers: list = None,
+                     row_count: int = 1, tail_hash: str = "", modified_time: str = ""):
+        """Bring the local copy of a sheet in line with rows as they are in the sheet.
+
+        rows is a list of (sheet_row, lead dict) pairs. Leads are matched on
+        their phone, or their name, and keep their id. Local changes that have
+        not reached the sheet yet win over the sheet's copy, but take its row
+        number. Leads that were in the sheet and are gone from it are deleted;
+        leads still waiting to be appended are kept.
+        """
+        now = time.time()
+        with self.lock, self.conn:
+            seen = self._upsert_sheet_rows(sheet_id, rows, now)
+            gone = [
+                (row["id"],) for row in self.conn.execute(
+                    "SELECT id FROM leads WHERE sheet_id = ? AND sheet_row IS NOT NULL", (sheet_id,)
+                ) if row["id"] not in seen
+            ]
+            self.conn.executemany("DELETE FROM leads WHERE id = ?", gone)
+            self.conn.execute(
+                """INSERT OR REPLACE INTO sheets (sheet_id, status_col, imported_at, headers, row_count, tail_hash, modified_time)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (sheet_id, status_col, now, json.dumps(headers or []), row_count, tail_hash, modified_time)
+            )
+
+    def append_sheet_rows(self, sheet_id: str, rows: list, row_count: int, tail_hash: str):
+        """Add rows that were appended to the sheet since we last saw it."""
+        with self.lock, self.conn:
+            self._upsert_sheet_rows(sheet_id, rows, time.time())
+            self.record_sheet_tail(sheet_id, row_count, tail_hash)
+
+    def record_sheet_tail(self, sheet_id: str, row_count: int, tail_hash: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE sheets SET row_count = ?, tail_hash = ? WHERE sheet_id = ?", (row_count, tail_hash, sheet_id)
+            )
+
+    def record_sheet_modified(self, sheet_id: str, modified_time: str):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE sheets SET modified_time = ? WHERE sheet_id = ?", (modified_time, sheet_id))
+
+    def refresh_statuses(self, sheet_id: str, statuses: dict) -> int:
+        """Take statuses edited in the sheet, keyed by sheet row; unsynced local changes keep theirs."""
+        now = time.time()
+        with self.lock, self.conn:
+            cur = self.conn.executemany(
+                """UPDATE leads SET status = ?, updated_at = ?
+                   WHERE sheet_id = ? AND sheet_row = ? AND version = synced_version AND status != ?""",
+                [(status, now, sheet_id, sheet_row, status) for sheet_row, status in statuses.items()]
+            )
+        return cur.rowcount
+
+    def _upsert_sheet_rows(self, sheet_id: str, rows: list, now: float) -> set:
+        """Insert or refresh sheet rows in place; returns the ids of the leads they matched."""
+        seen = set()
+        for sheet_row, lead in rows:
+            values = self._values(sheet_id, lead)
+            name_key, key = values[2], values[4]
+            scraped_at = parse_timestamp(lead.get(SCRAPED_AT))
+            match = self.conn.execute(
+                """SELECT id, version, synced_version FROM leads
+                   WHERE sheet_id = ?1 AND ((?2 != '' AND phone_key = ?2) OR (?3 != '' AND name_key = ?3))
+                   ORDER BY phone_key = ?2 DESC, id LIMIT 1""",
+                (sheet_id, key, name_key)
+            ).fetchone()
+            if match is None:
+                cur = self.conn.execute(
+                    """INSERT OR IGNORE INTO leads (sheet_id, name, name_key, phone, phone_key, profession, status, email,
+                           website, website_key, address, query, rating, sheet_row, version, synced_version, scraped_at,
+                           created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, 1, ?, ?, ?)""",
+                    values + (sheet_row, scraped_at or now, now, now)
+                )
+                if cur.rowcount == 1:
+                    seen.add(cur.lastrowid)
+                continue
+            if match["id"] in seen:
+                continue # The same lead twice in the sheet, the first row wins
+            seen.add(match["id"])
+            if match["version"] == match["synced_version"]:
+                self.conn.execute(
+                    """UPDATE OR IGNORE leads SET name = ?, name_key = ?, phone = ?, phone_key = ?, profession = ?, status = ?,
+                           email = ?, website = ?, website_key = ?, address = ?, query = ?, rating = ?, sheet_row = ?,
+                           scraped_at = COALESCE(?, scraped_at), updated_at = ?
+                       WHERE id = ?""",
+                    values[1:] + (sheet_row, scraped_at, now, match["id"])
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE leads SET sheet_row = ?, scraped_at = COALESCE(?, scraped_at) WHERE id = ?",
+                    (sheet_row, scraped_at, match["id"])
+                )
+        return seen
+
+    def add_lead(self, sheet_id: str, lead: dict) -> bool:
+        """Insert a new lead unless its phone or name is already known; returns True if inserted.
+
+        Phones match on their normalized form, so +91 98765 43210 and 098765-43210 are one lead.
+        """
+        now = time.time()
+        values = self._values(sheet_id, lead)
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                """INSERT OR IGNORE INTO leads (sheet_id, name, name_key, phone, phone_key, profession, status, email,
+                       website, website_key, address, query, rating, scraped_at, created_at, updated_at)
+                   SELECT ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+                   WHERE ?5 = '' OR NOT EXISTS (SELECT 1 FROM leads WHERE sheet_id = ?1 AND phone_key = ?5)""",
+                values + (parse_timestamp(lead.get(SCRAPED_AT)) or now, now, now)
+            )
+            return cur.rowcount == 1
+
+    def _values(self, sheet_id: str, lead: dict) -> tuple:
+        name = str(lead.get("name", "")).strip()
+        phone = str(lead.get("phone", "")).strip()
+        website = str(lead.get("website", "")).strip()
+        return (
+            sheet_id, name, normalize_name(name), phone, phone_key(phone) if phone else "",
+            str(lead.get("profession", "")), str(lead.get("status", "") or "New"), str(lead.get("email", "")),
+            website, normalize_website(website), str(lead.get("address", "")), str(lead.get("query", "")),
+            str(lead.get("rating", ""))
+        )
+
+    def has_phone(self, sheet_id: str, phone: str) -> bool:
+        key = phone_key(phone)
+        if not key:
+            return False
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM leads WHERE sheet_id = ? AND phone_key = ?", (sheet_id, key)
+            ).fetchone() is not None
+
+    def has_name(self, sheet_id: str, name: str) -> bool:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM leads WHERE sheet_id = ? AND name_key = ?", (sheet_id, normalize_name(name))
+            ).fetchone() is not None
+
+    def has_website(self, sheet_id: str, url: str) -> bool:
+        key = normalize_website(url)
+        if not key:
+            return False
+        with self.lock:
+            return self.conn.execute(
+                "SELECT 1 FROM leads WHERE sheet_id = ? AND website_key = ?", (sheet_id, key)
+            ).fetchone() is not None
+
+    def count_leads(self, sheet_id: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM leads WHERE sheet_id = ?", (sheet_id,)).fetchone()[0]
+
+    def leads_with_status(self, sheet_id: str, statuses: list) -> list:
+        placeholders = ", ".join("?" for _ in statuses)
+        with self.lock:
+            return self.conn.execute(
+                f"""SELECT * FROM leads WHERE sheet_id = ? AND lower(trim(status)) IN ({placeholders})
+                    ORDER BY sheet_row IS NULL, sheet_row, id""",
+                (sheet_id, *[s.lower() for s in statuses])
+            ).fetchall()
+
+    def iter_leads(self, sheet_id: str, query: str = None, statuses: list = None, since: float = None,
+                   until: float = None, batch_size: int = 1000):
+        """Yields matching leads in id order, batch_size rows at a time.
+
+        Pages by id instead of holding one cursor open, so the store is only
+        locked while a batch is read and memory stays at one batch.
+        """
+        conditions = ["sheet_id = ?", "id > ?"]
+        params = [sheet_id]
+        if query:
+            conditions.append("query LIKE ? ESCAPE '\\'")
+            params.append("%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        if statuses:
+            conditions.append(f"lower(trim(status)) IN ({', '.join('?' for _ in statuses)})")
+            params.extend(status.strip().lower() for status in statuses)
+        if since is not None:
+            conditions.append("scraped_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("scraped_at < ?")
+            params.append(until)
+        sql = f"SELECT * FROM leads WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.conn.execute(sql, (params[0], last_id, *params[1:], batch_size)).fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1]["id"]
+
+    def update_status(self, lead_id: int, status: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE leads SET status = ?, version = version + 1, updated_at = ? WHERE id = ?",
+                (status, time.time(), lead_id)
+            )
+
+    def update_statuses(self, lead_ids: list, status: str):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE leads SET status = ?, version = version + 1, updated_at = ? WHERE id = ?",
+                [(status, time.time(), lead_id) for lead_id in lead_ids]
+            )
+
+    def pending_count(self, sheet_id: str) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM leads WHERE sheet_id = ? AND version > synced_version", (sheet_id,)
+            ).fetchone()[0]
+
+    def unappended_count(self, sheet_id: str) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM leads WHERE sheet_id = ? AND sheet_row IS NULL", (sheet_id,)
+            ).fetchone()[0]
+
+    def unappended_leads(self, sheet_id: str) -> list:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT * FROM leads WHERE sheet_id = ? AND sheet_row IS NULL ORDER BY id", (sheet_id,)
+            ).fetchall()
+
+    def mark_appended(self, leads: list, first_row: int):
+        # Leads are appended in id order, so their rows are consecutive from first_row.
+        # Row 0 means appended but the row number is unknown.
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE leads SET sheet_row = ?, synced_version = ? WHERE id = ?",
+                [(first_row + offset if first_row else 0, lead["version"], lead["id"]) for offset, lead in enumerate(leads)]
+            )
+
+    def changed_statuses(self, sheet_id: str) -> list:
+        with self.lock:
+            return self.conn.execute(
+                """SELECT id, sheet_row, status, version FROM leads
+                   WHERE sheet_id = ? AND sheet_row IS NOT NULL AND version > synced_version ORDER BY sheet_row""",
+                (sheet_id,)
+            ).fetchall()
+
+    def mark_synced(self, leads: list):
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE leads SET synced_version = ? WHERE id = ? AND synced_version < ?",
+                [(lead["version"], lead["id"], lead["version"]) for lead in leads]
+            )
+
+# Singleton shared by the scraper, the WhatsApp sender and the sheet syncer
+lead_store = LeadStore()
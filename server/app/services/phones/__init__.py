@@ -0,0 +1,79 @@
+import os
+
+try:
+    import phonenumbers
+except ImportError: # Optional: without it a built-in table covers the common regions
+    phonenumbers = None
+
+DEFAULT_REGION = os.getenv("LEADNEST_DEFAULT_REGION", "IN").upper()
+
+# Calling code and national number length (None = variable) for the fallback normalizer
+REGIONS = {
+    "IN": ("91", 10), "US": ("1", 10), "CA": ("1", 10), "GB": ("44", 10), "AU": ("61", 9),
+    "AE": ("971", 9), "SG": ("65", 8), "DE": ("49", None), "FR": ("33", 9), "NZ": ("64", None),
+    "ZA": ("27", 9), "PK": ("92", 10), "BD": ("880", 10), "NP": ("977", 10), "LK": ("94", 9),
+}
+
+def normalize_phone(raw: str, region: str = DEFAULT_REGION) -> str:
+    """E.164 form of raw (e.g. +919876543210), or "" when it is not a valid number."""
+    raw = str(raw or "").strip()
+    if not raw:
+        return ""
+    region = (region or DEFAULT_REGION).upper()
+    if phonenumbers is not None:
+        try:
+            number = phonenumbers.parse(raw, region)
+        except phonenumbers.NumberParseException:
+            return ""
+        if not phonenumbers.is_valid_number(number):
+            return ""
+        return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+    return _fallback_normalize(raw, region)
+
+def _fallback_normalize(raw: str, region: str) -> str:
+    digits = "".join(ch for ch in raw if ch.isdigit())
+    international = raw.startswith("+") or digits.startswith("00")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if not international:
+        code, length = REGIONS.get(region, (None, None))
+        if code is None:
+            return ""
+        national = digits.lstrip("0")
+        # Numbers written with the calling code but no plus, e.g. 919876543210
+        if length and len(national) == len(code) + length and national.startswith(code):
+            national = national[len(code):]
+        if length and len(national) != length:
+            return ""
+        digits = code + national
+    if not 8 <= len(digits) <= 15 or digits.startswith("0"):
+        return ""
+    return "+" + digits
+
+def phone_key(raw: str, region: str = DEFAULT_REGION) -> str:
+    # Dedup key: the E.164 form, or the bare digits for numbers we can't validate
+    return normalize_phone(raw, region) or "".join(ch for ch in str(raw or "") if ch.isdigit())
+
+def prepare_send_list(leads: list, region: str = DEFAULT_REGION, contacted: set = ()):
+    """Splits leads into (lead, e164) pairs to message, invalid leads and duplicates.
+
+    Each distinct raw number is normalized once. The first lead with a number
+    keeps it; later leads with the same number, or a number in contacted,
+    count as duplicates.
+    """
+    normalized = {}
+    send, invalid, duplicates = [], [], []
+    seen = set(contacted)
+    for lead in leads:
+        raw = str(lead["phone"] or "").strip()
+        if raw not in normalized:
+            normalized[raw] = normalize_phone(raw, region)
+        e164 = normalized[raw]
+        if not e164:
+            invalid.append(lead)
+        elif e164 in seen:
+            duplicates.append(lead)
+        else:
+            seen.add(e164)
+            send.append((lead, e164))
+    return send, invalid, duplicates
@@ -1,23 +1,22 @@
-import os
 import re
 import time
 import random
+import asyncio
 import urllib.parse
-from playwright.sync_api import sync_playwright
+from collections import deque
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
 from datetime import datetime
-import json
 
+from app.core.log_buffer import LogBuffer
+from app.core.pacing import StopSignal, HostPacer
+from app.core.metrics import registry, StageTimer
 from app.services.google_sheets import sheets_service
-
-def human_delay(a=1.0, b=2.0):
-    total_sleep = random.uniform(a, b)
-    intervals = int(total_sleep / 0.2)
-    for _ in range(intervals):
-        from app.services import scraper as scraper_module
-        if scraper_module.current_scraper and scraper_module.current_scraper.should_stop:
-            return
-        time.sleep(0.2)
-    time.sleep(total_sleep % 0.2)
+from app.services.scraper.website_cache import website_cache
+from app.services.scraper.text_analysis import TextAnalyzer
+from app.services.scraper.resource_blocker import ResourceBlocker
+from app.services.scraper.http_fetcher import HttpFetcher
+from app.services.scraper.checkpoints import checkpoint_store, place_key
 
 def clean_text(text):
     return (text or "").strip()
@@ -28,271 +27,856 @@ def extract_emails(text):
 def extract_phones(text):
     return list(set(re.findall(r"\+?\d[\d -]{8,12}\d", text or "")))
 
-# In-memory logging queue for SSE/WebSockets to consume
-scrape_logs = []
-current_scraper = None
+# Bounded in-memory log for status polling and the SSE stream to consume
+scrape_logs = LogBuffer()
 
 def log_msg(msg: str):
     print(msg)
     timestamp = datetime.now().strftime("%H:%M:%S")
     scrape_logs.append(f"[{timestamp}] {msg}")
 
+MAPS_BASE_URL = "https://www.google.com/maps"
+
+# Overriding locale, timezone, and geolocation so Google Maps doesn't bias to the host's actual IP location
+MAPS_CONTEXT_OPTIONS = {
+    "locale": "en-US",
+    "timezone_id": "America/New_York",
+    "geolocation": {"longitude": -74.006, "latitude": 40.7128},
+    "permissions": ["geolocation"],
+}
+
+# Reads every result card of the Maps results feed in one evaluate call
+HARVEST_FEED_JS = '''() => {
+    const phonePattern = /(\\+?\\d[\\d\\s().-]{7,}\\d)/;
+    const seen = new Set();
+    const cards = [];
+    for (const anchor of document.querySelectorAll('a[href*="google.com/maps/place"]')) {
+        const href = anchor.getAttribute('href');
+        if (!href || seen.has(href)) continue;
+        seen.add(href);
+        const card = anchor.closest('[role="article"]') || anchor.parentElement;
+        let rating = "";
+        for (const el of card.querySelectorAll('[role="img"][aria-label]')) {
+            const label = el.getAttribute('aria-label');
+            if (/[0-9.]+\\s*stars/i.test(label)) { rating = label.trim(); break; }
+        }
+        let website = "";
+        const websiteEl = card.querySelector('a[data-value="Website"], a[aria-label*="website" i]');
+        if (websiteEl) website = websiteEl.getAttribute('href') || "";
+        let phone = "";
+        for (const span of card.querySelectorAll('span')) {
+            const match = (span.textContent || "").match(phonePattern);
+            if (match && span.children.length === 0) { phone = match[1].trim(); break; }
+        }
+        cards.push({href, name: anchor.getAttribute('aria-label') || "", phone, website, rating});
+    }
+    return cards;
+}'''
+
+# Scrolls the results feed inside the page until it has target places, the list ends or nothing new
+# loads; a MutationObserver reacts to each batch of cards instead of polling from Python.
+# Returns the deduplicated place URLs and why it stopped.
+SCROLL_FEED_JS = '''async ({target, gapMs, idleMs, maxNudges, maxMs}) => {
+    const selector = 'a[href*="google.com/maps/place"]';
+    const feed = document.querySelector('div[role="feed"]');
+    const seen = new Set();
+    const collect = (root) => {
+        for (const anchor of root.querySelectorAll(selector)) {
+            const href = anchor.getAttribute('href');
+            if (href) seen.add(href);
+        }
+    };
+    collect(document);
+    if (!feed) return {hrefs: [...seen], reason: 'no feed', scrolls: 0};
+    const endReached = () => {
+        if (feed.querySelector('span.HlvSq')) return true;
+        const tail = feed.lastElementChild;
+        return !!tail && /end of the list/i.test(tail.textContent || '');
+    };
+    return await new Promise((resolve) => {
+        let nudges = 0, scrolls = 0, idleTimer = null, scrollTimer = null, done = false;
+        const finish = (reason) => {
+            if (done) return;
+            done = true;
+            observer.disconnect();
+            clearTimeout(idleTimer); clearTimeout(scrollTimer); clearTimeout(deadline);
+            resolve({hrefs: [...seen], reason, scrolls});
+        };
+        const settled = () => {
+            if (seen.size >= target) { finish('target'); return true; }
+            if (endReached()) { finish('end'); return true; }
+            return false;
+        };
+        // The next scroll waits a paced gap, the idle timer gives up when no cards arrive
+        const scroll = () => {
+            clearTimeout(scrollTimer);
+            clearTimeout(idleTimer);
+            const [low, high] = gapMs;
+            scrollTimer = setTimeout(() => {
+                feed.scrollTop = feed.scrollHeight;
+                scrolls++;
+                clearTimeout(idleTimer);
+                idleTimer = setTimeout(nudge, idleMs);
+            }, low + Math.random() * (high - low));
+        };
+        // Google sometimes ignores a scroll that lands at the bottom already; back off a little and retry
+        const nudge = () => {
+            if (++nudges > maxNudges) { finish('idle'); return; }
+            feed.scrollBy(0, -300);
+            scroll();
+        };
+        const observer = new MutationObserver((mutations) => {
+            const before = seen.size;
+            for (const mutation of mutations) {
+                for (const node of mutation.addedNodes) {
+                    if (node.nodeType !== 1) continue;
+                    if (node.matches(selector)) seen.add(node.getAttribute('href'));
+                    collect(node);
+                }
+            }
+            seen.delete(null);
+            if (settled()) return;
+            if (seen.size > before) { nudges = 0; scroll(); }
+        });
+        observer.observe(feed, {childList: true, subtree: true});
+        const deadline = setTimeout(() => finish('timeout'), maxMs);
+        if (!settled()) scroll();
+    });
+}'''
+# Scrolls with no new cards before the feed counts as exhausted, and how long each one waits
+SCROLL_MAX_NUDGES = 4
+SCROLL_IDLE_MS = 2500
+SCROLL_MAX_SECONDS = 300
+
+STAGE_SECONDS = registry.histogram(
+    "leadnest_scrape_stage_seconds", "Time spent in each scraper pipeline stage.", labels=("stage",)
+)
+FEED_SCROLLS = registry.histogram(
+    "leadnest_scrape_feed_scrolls", "Scroll steps it took to load one results feed.", buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+)
+PLACE_RESULTS = registry.counter("leadnest_scrape_places_total", "Places that reached the save step, by outcome.", labels=("result",))
+
+class LeadBudget:
+    """Lead limit shared by every concurrent query of a run.
+
+    A slot is reserved before a lead is written and released afterwards, so
+    queries awaiting a sheet write can't push the run past its limit.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.reserved = 0
+
+    @property
+    def exhausted(self) -> bool:
+        return self.used >= self.limit
+
+    def try_reserve(self) -> bool:
+        if self.used + self.reserved >= self.limit:
+            return False
+        self.reserved += 1
+        return True
+
+    def release(self, used: bool):
+        self.reserved -= 1
+        if used:
+            self.used += 1
+
+def browser_outdated(browser, context) -> bool:
+    # Pooled browsers are recycled mid-run once they pass their page limit, contexts move over between tasks
+    return hasattr(browser, "outdated") and browser.outdated(context)
+
+class DeepScrapePool:
+    """Bounded pool of deep-scrape workers fed from a queue of websites.
+
+    Every worker gets its own context in the shared browser. Results come
+    back as futures.
+    """
+    def __init__(self, scraper, concurrency: int = 3):
+        self.scraper = scraper
+        self.concurrency = max(1, concurrency)
+        self.tasks = asyncio.Queue()
+        self.workers = []
+
+    async def start(self, browser):
+        for _ in range(self.concurrency):
+            context = await self._new_context(browser)
+            self.workers.append(asyncio.create_task(self._worker(browser, context)))
+
+    async def _new_context(self, browser):
+        context = await browser.new_context(locale="en-US")
+        if self.scraper.resource_blocker:
+            await self.scraper.resource_blocker.attach(context)
+        return context
+
+    def submit(self, url: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.tasks.put_nowait((url, future))
+        return future
+
+    async def _worker(self, browser, context):
+        try:
+            while True:
+                url, future = await self.tasks.get()
+                if url is None:
+                    return
+                if future.done():
+                    continue
+                if self.scraper.should_stop:
+                    future.set_result(self.scraper.empty_deep_scrape_result())
+                    continue
+                try:
+                    if browser_outdated(browser, context):
+                        await context.close()
+                        context = await self._new_context(browser)
+                    result = await self.scraper.deep_scrape_website(context, url)
+                    if not future.done():
+                        future.set_result(result)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+        finally:
+            await context.close()
+
+    async def shutdown(self):
+        # Drop work that has not started yet, then let every worker exit
+        while not self.tasks.empty():
+            _, future = self.tasks.get_nowait()
+            if future:
+                future.cancel()
+        for _ in self.workers:
+            self.tasks.put_nowait((None, None))
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
 class GMBScraper:
-    def __init__(self, keywords_str: str, relevance_keywords_str: str, city: str, country: str, limit: int):
+    def __init__(self, keywords_str: str, relevance_keywords_str: str, city: str, country: str, limit: int,
+                 deep_scrape_concurrency: int = 3, query_concurrency: int = 2, website_cache_ttl_hours: float = 168,
+                 lean_mode: bool = False, http_first: bool = True, feed_harvest: bool = False, log=None,
+                 maps_base_url: str = MAPS_BASE_URL, pacing: bool = True, resume: bool = False,
+                 browser_pool=None, queries=None, lead_sink=None, checkpoints: bool = True):
         # Parse inputs
         self.keywords = [k.strip() for k in keywords_str.split(",") if k.strip()]
-        
+
         loc_parts = []
         if city: loc_parts.append(city.strip())
         if country: loc_parts.append(country.strip())
         self.locations = [", ".join(loc_parts)] if loc_parts else [""]
-        
+
         self.limit = limit
+        self.log = log or log_msg
         self.headless = True # Enforce headless for backend
-        self.should_stop = False
-        
+        # Warm browsers shared by the server's jobs; without one the run launches its own Chromium
+        self.browser_pool = browser_pool
+        # Distributed workers get their shard's queries and hand leads to the coordinator's dedup
+        self.queries = list(queries) if queries else None
+        self.lead_sink = lead_sink
+        # Set from the API thread or the job manager; every wait in the scraper wakes on it
+        self.stop_signal = StopSignal()
+        # Per-host request pacing: Google gets human-like spacing, business sites much less
+        self.pacer = HostPacer(self.stop_signal, enabled=pacing)
+        # Overridden by the offline benchmarks to point at the local fixture server
+        self.maps_base_url = maps_base_url.rstrip("/")
+        # Per-stage timings for /api/metrics and the end-of-run summary
+        self.timings = StageTimer(STAGE_SECONDS)
+        # Checkpointed progress; with resume, an unfinished run with the same settings is continued.
+        # Shard workers go without, the shard queue already tracks their progress.
+        self.checkpoints = checkpoints
+        self.resume = resume and checkpoints
+        self.run_id = None
+        self.seen_places = {}
+        self.deep_scrape_concurrency = max(1, deep_scrape_concurrency)
+        self.query_concurrency = max(1, query_concurrency)
+        self.budget = LeadBudget(limit)
+        # Deep-scrape results are reused across runs for this long; 0 disables the cache
+        self.website_cache_ttl = max(0, website_cache_ttl_hours) * 3600
+        # Progress counters, reported by the job manager while the run is going
+        self.stats = {
+            "queries_total": 0,
+            "queries_done": 0,
+            "places_found": 0,
+            "feed_scrolls": 0,
+            "places_inspected": 0,
+            "leads_added": 0,
+            "duplicates": 0,
+            "low_relevance": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "places_harvested": 0,
+            "places_resumed": 0,
+            "place_loads": 0,
+            "place_load_ms": 0,
+            "website_loads": 0,
+            "website_load_ms": 0,
+            "http_scrapes": 0,
+            "http_fallbacks": 0,
+            "browser_scrapes": 0,
+            "backoffs": 0,
+        }
+        # Lean mode aborts images, media, fonts, stylesheets and trackers on place pages and websites
+        self.resource_blocker = ResourceBlocker() if lean_mode else None
+        # Static websites are fetched over plain HTTP first, the browser is the fallback
+        self.http_first = http_first and HttpFetcher.available()
+        self.http_fetcher = None
+        # Take name, phone, website and rating from the result cards and skip place pages that show them all
+        self.feed_harvest = feed_harvest
+
         # Relevance - can be customized later
         self.relevance_keywords = [k.strip() for k in relevance_keywords_str.split(",") if k.strip()]
         self.decision_makers = ["Advisor", "Coordinator", "Lead", "President", "Secretary", "Head", "Director", "Principal"]
+        self.text_analyzer = TextAnalyzer(self.relevance_keywords, self.decision_makers)
+
+    @property
+    def should_stop(self) -> bool:
+        return self.stop_signal.is_set()
+
+    def stop(self):
+        self.stop_signal.set()
+
+    @classmethod
+    def from_params(cls, params: dict, **kwargs):
+        """Builds a scraper from a start request's fields, as stored with jobs and shard runs."""
+        options = dict(
+            keywords_str=params["keywords"],
+            relevance_keywords_str=params["relevanceKeywords"],
+            city=params["city"],
+            country=params["country"],
+            limit=params["limit"],
+            deep_scrape_concurrency=params.get("deepScrapeConcurrency", 3),
+            query_concurrency=params.get("queryConcurrency", 2),
+            website_cache_ttl_hours=params.get("websiteCacheTtlHours", 168),
+            lean_mode=params.get("leanMode", False),
+            http_first=params.get("httpFirst", True),
+            feed_harvest=params.get("feedHarvest", False),
+            resume=params.get("resume", False),
+        )
+        options.update(kwargs)
+        return cls(**options)
+
+    def all_queries(self) -> list:
+        if self.queries:
+            return list(self.queries)
+        return [f"{keyword} in {loc}" if loc else keyword for keyword in self.keywords for loc in self.locations]
+
+    def report(self, url, ok):
+        self.pacer.report(url, ok)
+        if not ok:
+            self.stats["backoffs"] += 1
+
+    async def paced_goto(self, page, url, **kwargs):
+        """Navigates once the host's rate limit allows; returns None if stopped while waiting."""
+        if not await self.pacer.wait(url):
+            return None
+        try:
+            response = await page.goto(url, **kwargs)
+        except Exception:
+            self.report(url, False)
+            raise
+        # Google serves its captcha from /sorry/, sites signal throttling with 429/503
+        blocked = "/sorry/" in page.url or (response is not None and response.status in (403, 429, 503))
+        self.report(url, not blocked)
+        return response
+
+    async def timed_goto(self, page, url, kind, **kwargs):
+        # kind is "place" or "website"; feeds the average load times reported at the end of the run
+        started = time.monotonic()
+        try:
+            return await self.paced_goto(page, url, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            self.stats[f"{kind}_loads"] += 1
+            self.stats[f"{kind}_load_ms"] += int(elapsed * 1000)
+            self.timings.observe(f"{kind}_load", elapsed)
+
+    async def fetch_paced(self, url):
+        if not await self.pacer.wait(url):
+            return None
+        try:
+            fetched = await self.http_fetcher.fetch(url)
+        except Exception:
+            self.report(url, False)
+            raise
+        self.report(url, fetched.status not in (403, 429, 503) and fetched.browser_reason() != "bot check")
+        return fetched
+
+    def checkpoint_params(self) -> dict:
+        return {
+            "keywords": sorted(self.keywords),
+            "locations": self.locations,
+            "relevance_keywords": sorted(k.lower() for k in self.relevance_keywords),
+            **({"queries": sorted(self.queries)} if self.queries else {}),
+        }
+
+    async def record_place(self, lead_data, outcome):
+        maps_url = lead_data.get("maps_url")
+        if self.run_id and maps_url:
+            self.seen_places[place_key(maps_url)] = outcome
+            await asyncio.to_thread(checkpoint_store.record_place, self.run_id, maps_url, outcome, self.budget.used)
 
     def is_relevant(self, text):
-        if not self.relevance_keywords:
-            return True
-        text_lower = text.lower()
-        for k in self.relevance_keywords:
-            pattern = r'\b' + re.escape(k.lower()) + r'\b'
-            if re.search(pattern, text_lower):
-                return True
-        return False
+        return self.text_analyzer.is_relevant(text)
 
     def find_decision_makers(self, text):
-        found = []
-        lines = text.split('\n')
-        for line in lines:
-            for title in self.decision_makers:
-                if title.lower() in line.lower() and len(line.strip()) < 100:
-                    found.append(line.strip())
-        return list(set(found))
-
-    def deep_scrape_website(self, context, url):
-        log_msg(f"   → Deep scraping: {url}")
-        meta = {
-            "emails": [], 
-            "phones": [], 
-            "decision_makers": [], 
-            "relevant": len(self.relevance_keywords) == 0
+        return list(self.text_analyzer.find_decision_makers(text))
+
+    def empty_deep_scrape_result(self):
+        return {
+            "emails": [],
+            "phones": [],
+            "decision_makers": [],
+            "relevant": len(self.relevance_keywords) == 0 # Only default True if no keywords exist
         }
-        
-        try:
-            page = context.new_page()
-            page.goto(url, timeout=15000)
-            human_delay(2, 3)
-            
-            content = page.content()
-            text = page.inner_text("body")
-            
-            if self.is_relevant(text):
-                meta["relevant"] = True
-                
-            meta["emails"].extend(extract_emails(content))
-            meta["phones"].extend(extract_phones(text))
-            
-            # Sub-pages logic simplified for Speed in MVP
-            links = page.query_selector_all("a")
-            sub_pages = set()
-            keywords = ["about", "contact", "team"]
-            for link in links:
-                href = link.get_attribute("href")
-                if href and any(k in href.lower() for k in keywords):
-                    full_url = urllib.parse.urljoin(url, href)
-                    if url in full_url:
-                        sub_pages.add(full_url)
-            
-            for sub_url in list(sub_pages)[:2]:
-                if self.should_stop: break
-                try:
-                    page.goto(sub_url, timeout=10000)
-                    human_delay(1, 2)
-                    sub_text = page.inner_text("body")
-                    meta["emails"].extend(extract_emails(page.content()))
-                    meta["phones"].extend(extract_phones(sub_text))
-                except Exception:
+
+    def scan_page(self, html, text):
+        return self.is_relevant(text), extract_emails(html), extract_phones(text)
+
+    async def add_page(self, meta, texts, html, text):
+        texts.append(text)
+        # Keyword and regex scans over whole pages are CPU work, they run in a thread like the parsing
+        with self.timings.time("relevance"):
+            relevant, emails, phones = await asyncio.to_thread(self.scan_page, html, text)
+        if relevant:
+            meta["relevant"] = True
+        meta["emails"].extend(emails)
+        meta["phones"].extend(phones)
+
+    def sub_page_urls(self, url, hrefs):
+        # Sub-pages logic simplified for Speed in MVP
+        sub_pages = set()
+        keywords = ["about", "contact", "team"]
+        for href in hrefs:
+            if href and any(k in href.lower() for k in keywords):
+                full_url = urllib.parse.urljoin(url, href)
+                if url in full_url:
+                    sub_pages.add(full_url)
+        return list(sub_pages)[:2]
+
+    async def deep_scrape_http(self, url, meta, texts):
+        """Static fetch of the homepage and sub-pages; returns why a browser is needed, or None."""
+        with self.timings.time("deep_scrape_home"):
+            try:
+                home = await self.fetch_paced(url)
+            except Exception as e:
+                return f"HTTP error: {type(e).__name__}"
+            if home is None:
+                return None # Stopped
+            reason = home.browser_reason()
+            if reason:
+                return reason
+            await self.add_page(meta, texts, home.html, home.text)
+
+        sub_urls = self.sub_page_urls(url, home.links)
+        if self.should_stop or not sub_urls:
+            return None
+        with self.timings.time("deep_scrape_subpages"):
+            results = await asyncio.gather(*[self.fetch_paced(sub_url) for sub_url in sub_urls], return_exceptions=True)
+            for sub_page in results:
+                if sub_page is None or isinstance(sub_page, Exception) or sub_page.browser_reason():
                     continue
-            page.close()
+                await self.add_page(meta, texts, sub_page.html, sub_page.text)
+        return None
+
+    async def deep_scrape_browser(self, context, url, meta, texts):
+        try:
+            page = await context.new_page()
+            with self.timings.time("deep_scrape_home"):
+                # goto already waits for the load event, the pacer spaces out requests to the same site
+                await self.timed_goto(page, url, "website", timeout=15000)
+                if self.should_stop:
+                    await page.close()
+                    return
+
+                await self.add_page(meta, texts, await page.content(), await page.inner_text("body"))
+                hrefs = await page.eval_on_selector_all("a", "els => els.map(el => el.getAttribute('href'))")
+
+            with self.timings.time("deep_scrape_subpages"):
+                for sub_url in self.sub_page_urls(url, hrefs):
+                    if self.should_stop: break
+                    try:
+                        await self.timed_goto(page, sub_url, "website", timeout=10000)
+                        if self.should_stop: break
+                        await self.add_page(meta, texts, await page.content(), await page.inner_text("body"))
+                    except Exception:
+                        continue
+            await page.close()
         except Exception as e:
-            log_msg(f"   ⚠ Error deep scraping {url}: {e}")
-            
+            self.log(f"   ⚠ Error deep scraping {url}: {e}")
+
+    async def deep_scrape_website(self, context, url):
+        meta = self.empty_deep_scrape_result()
+
+        # SQLite lookups and writes go through a thread so a busy database never stalls the loop
+        checkpointed = await asyncio.to_thread(checkpoint_store.site_result, self.run_id, url) if self.run_id else None
+        if checkpointed:
+            self.log(f"   → Deep scrape from checkpoint: {url}")
+            return checkpointed
+
+        cached = await asyncio.to_thread(website_cache.get, url, self.website_cache_ttl) if self.website_cache_ttl else None
+        if cached:
+            self.stats["cache_hits"] += 1
+            self.log(f"   → Cached deep scrape: {url}")
+            meta["emails"] = cached["emails"]
+            meta["phones"] = cached["phones"]
+            meta["decision_makers"] = cached["decision_makers"]
+            with self.timings.time("relevance"):
+                if await asyncio.to_thread(self.is_relevant, cached["text"]):
+                    meta["relevant"] = True
+            return meta
+
+        self.stats["cache_misses"] += 1
+        # Text of every page visited, kept so cached results can be re-checked against other keywords
+        texts = []
+
+        if self.http_fetcher:
+            reason = await self.deep_scrape_http(url, meta, texts)
+            if reason is None:
+                self.stats["http_scrapes"] += 1
+                self.log(f"   → Deep scraped over HTTP: {url}")
+            else:
+                self.stats["http_fallbacks"] += 1
+                self.log(f"   → Falling back to browser ({reason}): {url}")
+                meta = self.empty_deep_scrape_result()
+                texts = []
+        if not self.http_fetcher or reason:
+            self.stats["browser_scrapes"] += 1
+            self.log(f"   → Deep scraping in browser: {url}")
+            await self.deep_scrape_browser(context, url, meta, texts)
+
         meta["emails"] = list(set(meta["emails"]))
         meta["phones"] = list(set(meta["phones"]))
+        if self.should_stop:
+            # Possibly cut short, so neither cached nor checkpointed; a resumed run scrapes the site again
+            return meta
+        if texts:
+            full_text = "\n".join(texts)
+            meta["decision_makers"] = await asyncio.to_thread(self.find_decision_makers, full_text)
+            if self.website_cache_ttl:
+                await asyncio.to_thread(website_cache.put, url, meta, full_text)
+            if self.run_id:
+                await asyncio.to_thread(checkpoint_store.record_site, self.run_id, url, meta)
         return meta
 
-    def run(self):
-        log_msg("🚀 Starting Scraper Task...")
-        
-        if not sheets_service.client:
-            log_msg("❌ Google Sheets not connected. Run aborted.")
-            return
+    async def save_lead(self, lead_data, extra_data) -> bool:
+        # Merge deep-scrape results into the lead and write it to the sheet
+        if self.should_stop:
+            # Deep scrapes cut short by the stop look irrelevant; leave the place unsettled for a resume
+            self.log("   🛑 Scraping manually stopped before saving.")
+            return False
+        if not extra_data["relevant"]:
+            self.log(f"   → Skipping {lead_data['name']}: Low relevance")
+            self.stats["low_relevance"] += 1
+            PLACE_RESULTS.inc(result="low_relevance")
+            await self.record_place(lead_data, "low_relevance")
+            return False
 
+        if not lead_data["email"] and extra_data["emails"]:
+            lead_data["email"] = extra_data["emails"][0]
+        if not lead_data["phone"] and extra_data["phones"]:
+            lead_data["phone"] = extra_data["phones"][0]
+
+        if not self.budget.try_reserve():
+            return False
+
+        is_new = False
         try:
-            sheets_service.create_or_get_sheet()
-        except Exception as e:
-            log_msg(f"❌ Failed to initialize Google Sheet: {e}")
-            return
+            # Sheet writes are blocking gspread calls, keep them off the event loop
+            with self.timings.time("sheet_append"):
+                is_new = await asyncio.to_thread(self.lead_sink or sheets_service.append_lead, lead_data)
+        finally:
+            self.budget.release(is_new)
+        if is_new:
+            self.log(f"   ✅ Added to Sheet: {lead_data['name']}")
+            self.stats["leads_added"] += 1
+            PLACE_RESULTS.inc(result="added")
+            await self.record_place(lead_data, "added")
+        else:
+            self.log(f"   ⏭️ Skipped {lead_data['name']}: Duplicate lead already in sheet")
+            self.stats["duplicates"] += 1
+            PLACE_RESULTS.inc(result="duplicate")
+            await self.record_place(lead_data, "duplicate")
+        return is_new
 
-        all_combinations = []
-        for keyword in self.keywords:
-            for loc in self.locations:
-                query = f"{keyword} in {loc}" if loc else keyword
-                all_combinations.append(query)
-                
-        random.shuffle(all_combinations)
+    async def collect_deep_scrapes(self, pending, block=False):
+        """Write every lead whose deep scrape has finished.
+
+        With block=True, waits for at least one pending scrape to complete first.
+        """
+        if block and pending:
+            await asyncio.wait([future for _, future in pending], timeout=1.0, return_when=asyncio.FIRST_COMPLETED)
+
+        for item in [item for item in pending if item[1].done()]:
+            pending.remove(item)
+            lead_data, future = item
+            if future.cancelled() or self.budget.exhausted:
+                continue
+            try:
+                extra_data = future.result()
+            except Exception as e:
+                self.log(f"   ⚠ Error deep scraping {lead_data['website']}: {e}")
+                extra_data = self.empty_deep_scrape_result()
+            try:
+                await self.save_lead(lead_data, extra_data)
+            except Exception as e:
+                self.log(f"Error saving {lead_data['name']}: {e}")
+
+    async def scroll_feed(self, page, search_url):
+        """Loads the results feed up to the lead limit in one in-page call; returns the place URLs, None if stopped."""
+        low, high = self.pacer.spacing(search_url)
+        scroller = asyncio.ensure_future(page.evaluate(SCROLL_FEED_JS, {
+            "target": self.limit,
+            "gapMs": [low * 1000, high * 1000],
+            "idleMs": SCROLL_IDLE_MS,
+            "maxNudges": SCROLL_MAX_NUDGES,
+            "maxMs": SCROLL_MAX_SECONDS * 1000,
+        }))
+        stopped = asyncio.ensure_future(self.stop_signal.sleep(SCROLL_MAX_SECONDS + 30))
+        await asyncio.wait([scroller, stopped], return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if not scroller.done():
+            scroller.cancel()
+            await asyncio.gather(scroller, return_exceptions=True)
+            return None
+        result = scroller.result()
+        self.stats["feed_scrolls"] += result["scrolls"]
+        FEED_SCROLLS.observe(result["scrolls"])
+        self.log(f"Feed scrolled: {len(result['hrefs'])} places in {result['scrolls']} scrolls ({result['reason']}).")
+        return result["hrefs"]
+
+    async def scrape_query(self, context, query, pool):
+        self.log(f"\n═══ Processing: {query} ═══")
+        # Leads waiting on their website to be deep scraped: (lead_data, future)
+        pending = []
+        page = await context.new_page()
+        try:
+            search_url = self.maps_base_url + "/search/?q=" + urllib.parse.quote_plus(query) + "&hl=en"
+            with self.timings.time("search_load"):
+                await self.paced_goto(page, search_url)
+                if self.should_stop: return
+                try:
+                    await page.wait_for_selector('div[role="feed"], h1', timeout=5000)
+                except Exception:
+                    pass # Single-result searches and consent pages have no feed
+
+            try:
+                if await page.query_selector('button[aria-label="Accept all"]'):
+                    await page.click('button[aria-label="Accept all"]', timeout=2000)
+            except: pass
+
+            with self.timings.time("scroll"):
+                hrefs = await self.scroll_feed(page, search_url)
+            if self.should_stop or hrefs is None: return
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            # Overriding locale, timezone, and geolocation so Google Maps doesn't bias to the host's actual IP location
-            context = browser.new_context(
-                locale="en-US",
-                timezone_id="America/New_York",
-                geolocation={"longitude": -74.006, "latitude": 40.7128},
-                permissions=["geolocation"]
-            )
-            
-            processed_count = 0
-            
-            for query in all_combinations:
-                if processed_count >= self.limit or self.should_stop:
+            if self.feed_harvest:
+                # Card-level fields straight from the results list, keyed by place URL
+                with self.timings.time("feed_harvest"):
+                    cards = await page.evaluate(HARVEST_FEED_JS)
+            else:
+                cards = [{"href": href} for href in hrefs]
+            self.log(f"Found {len(cards)} results initially for {query}.")
+            self.stats["places_found"] += len(cards)
+            if self.resource_blocker:
+                # The results feed needs its styles to scroll, only the place pages go lean
+                await self.resource_blocker.attach(page)
+
+            for card in cards:
+                await self.collect_deep_scrapes(pending)
+                # Keep the queue bounded so we don't run far past the lead limit
+                while len(pending) >= pool.concurrency * 2 and not self.should_stop:
+                    await self.collect_deep_scrapes(pending, block=True)
+
+                if self.budget.exhausted or self.should_stop:
                     break
-                    
-                log_msg(f"\n═══ Processing: {query} ═══")
+                if place_key(card["href"]) in self.seen_places:
+                    # Settled by an earlier attempt of this run
+                    self.stats["places_resumed"] += 1
+                    continue
+
                 try:
-                    page = context.new_page()
-                    search_url = "https://www.google.com/maps/search/?q=" + urllib.parse.quote_plus(query) + "&hl=en"
-                    page.goto(search_url)
-                    human_delay(2, 3)
-                    
-                    try:
-                        if page.query_selector('button[aria-label="Accept all"]'):
-                            page.click('button[aria-label="Accept all"]', timeout=2000)
-                    except: pass
-                    
-                    # Dynamic Scrolling Logic
-                    previous_count = 0
-                    scroll_attempts_without_new = 0
-                    
-                    while True:
-                        if self.should_stop: break
-                        
-                        # Find current anchors
-                        anchors = page.query_selector_all('a[href*="google.com/maps/place"]')
-                        current_count = len(anchors)
-                        
-                        if current_count >= self.limit:
-                            break # We have enough
-                            
-                        if current_count == previous_count:
-                            scroll_attempts_without_new += 1
-                        else:
-                            scroll_attempts_without_new = 0 # Reset if we found new ones
-                            
-                        if scroll_attempts_without_new >= 5: # Give up after 5 scrolls with no new results
-                            break
-                            
-                        previous_count = current_count
-                        
-                        # Try to find the scrollable container and scroll it, or just scroll window
-                        page.evaluate('''() => {
-                            let scrollableDiv = document.querySelector('div[role="feed"]');
-                            if (scrollableDiv) {
-                                scrollableDiv.scrollBy(0, 5000);
-                            } else {
-                                window.scrollBy(0, 5000);
-                            }
-                        }''')
-                        human_delay(1, 2)
+                    place = {field: clean_text(card.get(field)) for field in ("name", "phone", "website", "rating")}
+                    if place["name"] and place["phone"] and place["website"]:
+                        self.stats["places_harvested"] += 1
+                    else:
+                        # Open the place page only for what the card didn't show
+                        details = await self.scrape_place_page(page, card["href"])
+                        place = {field: place[field] or details[field] for field in place}
+                    name, phone, website, rating = place["name"], place["phone"], place["website"], place["rating"]
+
+                    self.log(f"Inspecting: {name} | {phone} | {rating}")
+                    self.stats["places_inspected"] += 1
+
+                    lead_data = {
+                        "name": name,
+                        "phone": phone,
+                        "profession": query,
+                        "email": "",
+                        "website": website,
+                        "query": query,
+                        "address": "", # To implement later based on selector
+                        "rating": rating,
+                        "maps_url": card["href"]
+                    }
+
+                    if website:
+                        # Hand the website to the worker pool and move on to the next place
+                        pending.append((lead_data, pool.submit(website)))
+                    else:
+                        await self.save_lead(lead_data, self.empty_deep_scrape_result())
 
-                    if self.should_stop: break
-                    
-                    anchors = page.query_selector_all('a[href*="google.com/maps/place"]')
-                    hrefs = list(set([a.get_attribute("href") for a in anchors if a.get_attribute("href")]))
-                    log_msg(f"Found {len(hrefs)} results initially.")
-                    
-                    for maps_url in hrefs:
-                        if processed_count >= self.limit or self.should_stop:
-                            break
-                            
-                        try:
-                            page.goto(maps_url)
-                            human_delay(1, 2)
-                            
-                            name = clean_text(page.inner_text('h1') if page.query_selector('h1') else "")
-                            phone_el = page.query_selector('button[data-item-id^="phone:tel:"]')
-                            phone = clean_text(phone_el.get_attribute("aria-label").replace("Phone:", "") if phone_el else "")
-                            website_el = page.query_selector('a[data-item-id="authority"]')
-                            website = website_el.get_attribute("href") if website_el else ""
-                            
-                            # Extract rating using a robust JS evaluation to ensure it contains a number
-                            rating = page.evaluate('''() => {
-                                let els = document.querySelectorAll('[aria-label*="stars"], [aria-label*="Stars"]');
-                                for (let el of els) {
-                                    let label = el.getAttribute('aria-label');
-                                    if (label && label.match(/[0-9.]+\s*stars/i)) {
-                                        return label.trim();
-                                    }
-                                }
-                                return "";
-                            }''')
-                            rating = clean_text(rating)
-                            
-                            log_msg(f"Inspecting: {name} | {phone} | {rating}")
-                            
-                            extra_data = {
-                                "emails": [], 
-                                "relevant": len(self.relevance_keywords) == 0, # Only default True if no keywords exist
-                                "phones": []
-                            }
-                            if website:
-                                extra_data = self.deep_scrape_website(context, website)
-
-                            if not extra_data["relevant"]:
-                                log_msg("   → Skipping: Low relevance")
-                                continue
-                                
-                            final_email = extra_data["emails"][0] if extra_data["emails"] else ""
-                            final_phone = phone or (extra_data["phones"][0] if extra_data["phones"] else "")
-                            
-                            lead_data = {
-                                "name": name,
-                                "phone": final_phone,
-                                "profession": query,
-                                "email": final_email,
-                                "website": website,
-                                "query": query,
-                                "address": "", # To implement later based on selector
-                                "rating": rating
-                            }
-                            
-                            if self.should_stop:
-                                log_msg("   🛑 Scraping manually stopped before saving.")
-                                break
-                                
-                            is_new = sheets_service.append_lead(lead_data)
-                            if is_new:
-                                log_msg("   ✅ Added to Sheet!")
-                                processed_count += 1
-                            else:
-                                log_msg("   ⏭️ Skipped: Duplicate lead already in sheet")
-                            
-                        except Exception as e:
-                            log_msg(f"Error on card: {e}")
-                            
-                    if self.should_stop:
-                        page.close()
-                        break
-                        
-                    page.close()
                 except Exception as e:
-                    log_msg(f"Query error: {e}")
-            
-            browser.close()
-        log_msg(f"🎉 Done! Total scraped: {processed_count}")
-        return processed_count
+                    self.log(f"Error on card: {e}")
+
+            # Merge whatever the workers are still scraping for this query
+            while pending and not self.should_stop and not self.budget.exhausted:
+                await self.collect_deep_scrapes(pending, block=True)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            await page.close()
+
+    async def scrape_place_page(self, page, maps_url):
+        await self.timed_goto(page, maps_url, "place")
+        try:
+            await page.wait_for_selector('h1', timeout=5000)
+        except Exception:
+            pass
+
+        with self.timings.time("extract"):
+            name = clean_text(await page.inner_text('h1') if await page.query_selector('h1') else "")
+            phone_el = await page.query_selector('button[data-item-id^="phone:tel:"]')
+            phone = clean_text((await phone_el.get_attribute("aria-label")).replace("Phone:", "") if phone_el else "")
+            website_el = await page.query_selector('a[data-item-id="authority"]')
+            website = await website_el.get_attribute("href") if website_el else ""
+
+            # Extract rating using a robust JS evaluation to ensure it contains a number
+            rating = await page.evaluate('''() => {
+                let els = document.querySelectorAll('[aria-label*="stars"], [aria-label*="Stars"]');
+                for (let el of els) {
+                    let label = el.getAttribute('aria-label');
+                    if (label && label.match(/[0-9.]+\\s*stars/i)) {
+                        return label.trim();
+                    }
+                }
+                return "";
+            }''')
+        return {"name": name, "phone": phone, "website": website or "", "rating": clean_text(rating)}
+
+    async def query_worker(self, browser, queries, pool):
+        # Each concurrent query runs in its own context of the shared browser
+        context = await browser.new_context(**MAPS_CONTEXT_OPTIONS)
+        try:
+            while queries and not self.budget.exhausted and not self.should_stop:
+                query = queries.popleft()
+                try:
+                    if browser_outdated(browser, context):
+                        await context.close()
+                        context = await browser.new_context(**MAPS_CONTEXT_OPTIONS)
+                    await self.scrape_query(context, query, pool)
+                    if self.run_id and not self.should_stop and not self.budget.exhausted:
+                        await asyncio.to_thread(checkpoint_store.record_query, self.run_id, query)
+                except Exception as e:
+                    self.log(f"Query error: {e}")
+                self.stats["queries_done"] += 1
+        finally:
+            await context.close()
+
+    @asynccontextmanager
+    async def browser_session(self):
+        if self.browser_pool:
+            async with self.browser_pool.lease() as browser:
+                yield browser
+            return
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=self.headless)
+            try:
+                yield browser
+            finally:
+                await browser.close()
+
+    async def run_async(self):
+        self.log("🚀 Starting Scraper Task...")
+
+        if self.lead_sink is None:
+            if not sheets_service.client:
+                self.log("❌ Google Sheets not connected. Run aborted.")
+                return
+
+            try:
+                await asyncio.to_thread(sheets_service.create_or_get_sheet)
+            except Exception as e:
+                self.log(f"❌ Failed to initialize Google Sheet: {e}")
+                return
+
+        all_combinations = self.all_queries()
+
+        random.shuffle(all_combinations)
+        queries = deque(all_combinations)
+        self.stats["queries_total"] = len(queries)
+
+        run = await asyncio.to_thread(checkpoint_store.claim_resumable, self.checkpoint_params()) if self.resume else None
+        if run:
+            # Same query order as before, minus the finished ones; settled places are skipped as they come up
+            self.run_id = run["runId"]
+            done = set(run["queriesDone"])
+            queries = deque(query for query in run["queries"] if query not in done)
+            self.stats["queries_done"] = len(done)
+            self.budget.used = run["leadsUsed"]
+            self.seen_places = await asyncio.to_thread(checkpoint_store.place_outcomes, self.run_id)
+            self.log(f"♻️ Resuming run {self.run_id}: {len(done)}/{len(run['queries'])} queries done, "
+                     f"{len(self.seen_places)} places settled, {self.budget.used} leads so far.")
+        elif self.checkpoints:
+            self.run_id = await asyncio.to_thread(checkpoint_store.start_run, self.checkpoint_params(), all_combinations)
+        if not queries or self.budget.exhausted:
+            self.log("Nothing left to do for this run.")
+            if self.run_id:
+                await asyncio.to_thread(checkpoint_store.finish_run, self.run_id, "completed")
+            return self.budget.used
+
+        async with self.browser_session() as browser:
+            pool = DeepScrapePool(self, self.deep_scrape_concurrency)
+            if self.http_first:
+                self.http_fetcher = HttpFetcher(max_connections=max(10, self.deep_scrape_concurrency * 4))
+            try:
+                await pool.start(browser)
+                workers = min(self.query_concurrency, len(queries)) or 1
+                self.log(f"Running {workers} queries at once, deep scraping with {pool.concurrency} workers.")
+                await asyncio.gather(*[self.query_worker(browser, queries, pool) for _ in range(workers)])
+            finally:
+                await pool.shutdown()
+                if self.http_fetcher:
+                    await self.http_fetcher.close()
+                    self.http_fetcher = None
+
+        # Write out any rows still buffered for the sheet; with a lead sink the coordinator does that
+        pending_rows = await asyncio.to_thread(sheets_service.lead_syncer.pending) if self.lead_sink is None else 0
+        if pending_rows and await asyncio.to_thread(sheets_service.flush_leads) < pending_rows:
+            self.log(f"⚠ Could not write {pending_rows} buffered leads to the sheet, they will be retried.")
+        if self.website_cache_ttl:
+            self.log(f"Website cache: {self.stats['cache_hits']} hits, {self.stats['cache_misses']} misses.")
+        if self.http_first:
+            self.log(f"Deep scrape paths: {self.stats['http_scrapes']} over HTTP, {self.stats['browser_scrapes']} in browser "
+                     f"({self.stats['http_fallbacks']} HTTP fallbacks).")
+        if self.stats["places_resumed"]:
+            self.log(f"Checkpoint: skipped {self.stats['places_resumed']} places settled before the resume.")
+        if self.feed_harvest:
+            self.log(f"Feed harvest: {self.stats['places_harvested']} of {self.stats['places_inspected']} places "
+                     f"needed no place page visit.")
+        for kind, label in (("place", "place pages"), ("website", "websites")):
+            loads = self.stats[f"{kind}_loads"]
+            if loads:
+                self.log(f"Average load time for {label}: {self.stats[f'{kind}_load_ms'] // loads} ms over {loads} loads.")
+        self.log(self.pacer.summary())
+        if self.timings.totals:
+            self.log(f"Stage timings: {self.timings.summary()}")
+        if self.stats["feed_scrolls"]:
+            self.log(f"Feed scrolls: {self.stats['feed_scrolls']} over {self.stats['queries_done']} queries.")
+        if self.resource_blocker:
+            self.stats["blocked_requests"] = self.resource_blocker.blocked_total
+            self.stats["bytes_saved"] = self.resource_blocker.bytes_saved
+            self.log(self.resource_blocker.summary())
+        if self.run_id:
+            await asyncio.to_thread(checkpoint_store.finish_run, self.run_id, "stopped" if self.should_stop else "completed")
+        self.log(f"🎉 Done! Total scraped: {self.budget.used}")
+        return self.budget.used
+
+    def run(self):
+        return asyncio.run(self.run_async())
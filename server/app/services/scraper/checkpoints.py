@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+
+from app.services.lead_store import BUSY_TIMEOUT
+
+CHECKPOINT_PATH = os.getenv("LEADNEST_CHECKPOINT_DB", "checkpoints.db")
+# Completed runs are only kept around for the /runs listing
+RETENTION_DAYS = float(os.getenv("LEADNEST_CHECKPOINT_RETENTION_DAYS", "7"))
+# Runs that can be picked up again; 'interrupted' ones were still running when the server went down
+RESUMABLE = ("stopped", "interrupted")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    run_key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    queries TEXT NOT NULL,
+    leads_used INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_key ON runs(run_key, status, updated_at);
+
+CREATE TABLE IF NOT EXISTS run_queries (
+    run_id TEXT NOT NULL,
+    query TEXT NOT NULL,
+    done_at REAL NOT NULL,
+    PRIMARY KEY (run_id, query)
+);
+
+CREATE TABLE IF NOT EXISTS run_places (
+    run_id TEXT NOT NULL,
+    place_url TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, place_url)
+);
+
+CREATE TABLE IF NOT EXISTS run_sites (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    meta TEXT NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+"""
+
+def run_key(params: dict) -> str:
+    # Runs with the same search and relevance settings can pick up each other's work
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def place_key(maps_url: str) -> str:
+    # Maps appends tracking parameters that change between loads
+    return (maps_url or "").split("?")[0]
+
+class CheckpointStore:
+    """Durable progress of scrape runs: finished queries, place outcomes, deep scrapes and leads used."""
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def start_run(self, params: dict, queries: list) -> str:
+        run_id = uuid.uuid4().hex[:8]
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO runs (run_id, run_key, params, queries, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (run_id, run_key(params), json.dumps(params), json.dumps(queries), now, now)
+            )
+        return run_id
+
+    def claim_resumable(self, params: dict):
+        """Latest stopped or interrupted run with the same settings, marked running again; None if there is none.
+
+        The status is flipped with a conditional update, so two jobs started at
+        once never resume the same run, and a run still going is never picked.
+        """
+        with self.lock:
+            candidates = self.conn.execute(
+                f"""SELECT run_id FROM runs WHERE run_key = ? AND status IN ({", ".join("?" for _ in RESUMABLE)})
+                    ORDER BY updated_at DESC""",
+                (run_key(params), *RESUMABLE)
+            ).fetchall()
+            claimed = None
+            for row in candidates:
+                with self.conn:
+                    cur = self.conn.execute(
+                        f"""UPDATE runs SET status = 'running', updated_at = ?
+                            WHERE run_id = ? AND status IN ({", ".join("?" for _ in RESUMABLE)})""",
+                        (time.time(), row["run_id"], *RESUMABLE)
+                    )
+                if cur.rowcount == 1:
+                    claimed = row["run_id"]
+                    break
+        return self.get_run(claimed) if claimed else None
+
+    def mark_interrupted(self) -> int:
+        """At startup, runs still marked running were cut off by the last shutdown."""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE runs SET status = 'interrupted', updated_at = ? WHERE status = 'running'", (time.time(),)
+            )
+        return cur.rowcount
+
+    def prune(self, retention_days: float = RETENTION_DAYS) -> int:
+        """Drops completed runs, with their queries, places and sites, after retention_days."""
+        cutoff = time.time() - retention_days * 86400
+        with self.lock, self.conn:
+            run_ids = [(row["run_id"],) for row in self.conn.execute(
+                "SELECT run_id FROM runs WHERE status = 'completed' AND updated_at < ?", (cutoff,)
+            )]
+            for table in ("run_queries", "run_places", "run_sites", "runs"):
+                self.conn.executemany(f"DELETE FROM {table} WHERE run_id = ?", run_ids)
+        return len(run_ids)
+
+    def get_run(self, run_id: str):
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._run(row) if row else None
+
+    def list_runs(self, limit: int = 50) -> list:
+        with self.lock:
+            rows = self.conn.execute("SELECT * FROM runs ORDER BY updated_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._run(row) for row in rows]
+
+    def _run(self, row) -> dict:
+        run_id = row["run_id"]
+        with self.lock:
+            done = [r["query"] for r in self.conn.execute("SELECT query FROM run_queries WHERE run_id = ?", (run_id,))]
+            places = self.conn.execute("SELECT COUNT(*) FROM run_places WHERE run_id = ?", (run_id,)).fetchone()[0]
+        return {
+            "runId": run_id,
+            "params": json.loads(row["params"]),
+            "queries": json.loads(row["queries"]),
+            "queriesDone": done,
+            "placesSeen": places,
+            "leadsUsed": row["leads_used"],
+            "status": row["status"],
+            "createdAt": row["created_at"],
+            "updatedAt": row["updated_at"],
+        }
+
+    def finish_run(self, run_id: str, status: str):
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?", (status, time.time(), run_id))
+
+    def record_query(self, run_id: str, query: str):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO run_queries (run_id, query, done_at) VALUES (?, ?, ?)", (run_id, query, now))
+            self.conn.execute("UPDATE runs SET updated_at = ? WHERE run_id = ?", (now, run_id))
+
+    def place_outcomes(self, run_id: str) -> dict:
+        with self.lock:
+            rows = self.conn.execute("SELECT place_url, outcome FROM run_places WHERE run_id = ?", (run_id,)).fetchall()
+        return {row["place_url"]: row["outcome"] for row in rows}
+
+    def record_place(self, run_id: str, maps_url: str, outcome: str, leads_used: int):
+        # Outcome and budget in one transaction, so a resumed run never double counts a lead
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO run_places (run_id, place_url, outcome, updated_at) VALUES (?, ?, ?, ?)",
+                (run_id, place_key(maps_url), outcome, now)
+            )
+            self.conn.execute("UPDATE runs SET leads_used = ?, updated_at = ? WHERE run_id = ?", (leads_used, now, run_id))
+
+    def site_result(self, run_id: str, url: str):
+        with self.lock:
+            row = self.conn.execute("SELECT meta FROM run_sites WHERE run_id = ? AND url = ?", (run_id, url)).fetchone()
+        return json.loads(row["meta"]) if row else None
+
+    def record_site(self, run_id: str, url: str, meta: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO run_sites (run_id, url, meta) VALUES (?, ?, ?)", (run_id, url, json.dumps(meta))
+            )
+
+checkpoint_store = CheckpointStore()
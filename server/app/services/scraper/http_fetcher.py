@@ -0,0 +1,134 @@
+import re
+import asyncio
+import urllib.parse
+from html.parser import HTMLParser
+
+try:
+    import httpx
+except ImportError: # Optional: without it deep scraping always uses the browser
+    httpx = None
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+MAX_BODY_BYTES = 3_000_000
+# Pages with less visible text than this but with scripts are most likely rendered client-side
+MIN_STATIC_TEXT = 200
+
+BLOCK_MARKERS = ("captcha", "cf-browser-verification", "just a moment...", "attention required! | cloudflare", "access denied")
+JS_APP_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>|enable javascript|requires javascript',
+    re.IGNORECASE
+)
+
+class PageParser(HTMLParser):
+    """Collects visible text and link hrefs from an HTML document."""
+    SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article", "header", "footer", "td"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.links = []
+        self.scripts = 0
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self.skip_depth += 1
+            if tag == "script":
+                self.scripts += 1
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    @property
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+class FetchedPage:
+    def __init__(self, url: str, status: int, html: str = "", content_type: str = ""):
+        self.url = url
+        self.status = status
+        self.html = html
+        self.content_type = content_type
+        parser = PageParser()
+        try:
+            parser.feed(html)
+            parser.close()
+        except Exception:
+            pass # Broken markup still yields whatever was parsed
+        self.text = parser.text
+        self.links = parser.links
+        self.scripts = parser.scripts
+
+    def browser_reason(self):
+        """Why this page needs a real browser, or None if the static HTML is usable."""
+        if self.status >= 400:
+            # Covers 403/429/503 bot walls as well as plain errors
+            return f"HTTP {self.status}"
+        if "html" not in self.content_type:
+            return f"content type {self.content_type or 'unknown'}"
+        # Only short pages count, plenty of real sites embed a reCAPTCHA contact form
+        head = self.html[:20_000].lower()
+        if len(self.text) < 1500 and any(marker in head for marker in BLOCK_MARKERS):
+            return "bot check"
+        if len(self.text) < MIN_STATIC_TEXT and (self.scripts or JS_APP_MARKERS.search(self.html)):
+            return "rendered by JavaScript"
+        return None
+
+class HttpFetcher:
+    """Connection-pooled async HTTP client for static business websites.
+
+    httpx keeps connections alive across requests. Per-host semaphores cap
+    how many requests hit one site at the same time.
+    """
+    def __init__(self, max_connections: int = 20, per_host: int = 2, timeout: float = 10.0):
+        self.per_host = per_host
+        self.host_slots = {}
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5"},
+        )
+
+    @staticmethod
+    def available() -> bool:
+        return httpx is not None
+
+    async def fetch(self, url: str) -> FetchedPage:
+        host = urllib.parse.urlparse(url).hostname or ""
+        slots = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        async with slots:
+            async with self.client.stream("GET", url) as response:
+                content_type = response.headers.get("content-type", "").lower()
+                if "html" not in content_type:
+                    return FetchedPage(str(response.url), response.status_code, "", content_type)
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > MAX_BODY_BYTES:
+                        break
+                encoding = response.encoding or "utf-8"
+                html = bytes(body).decode(encoding, errors="replace")
+        # Parsing a large page would block the event loop for every other request
+        return await asyncio.to_thread(FetchedPage, str(response.url), response.status_code, html, content_type)
+
+    async def close(self):
+        await self.client.aclose()
@@ -0,0 +1,56 @@
+import urllib.parse
+from collections import Counter
+
+# Resource types we never read: we only use text, a few attributes and page.content()
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "googleadservices.com",
+    "doubleclick.net", "adservice.google.com", "connect.facebook.net", "facebook.net", "hotjar.com",
+    "clarity.ms", "segment.io", "segment.com", "mixpanel.com", "bat.bing.com", "analytics.tiktok.com",
+    "static.ads-twitter.com", "snap.licdn.com", "cdn.heapanalytics.com", "js.hs-analytics.net",
+)
+
+# Aborted requests never report a size, so savings are estimated from typical transfer sizes
+TYPICAL_BYTES = {"image": 40_000, "media": 400_000, "font": 35_000, "stylesheet": 25_000, "tracker": 30_000}
+
+def is_tracker(url: str) -> bool:
+    host = urllib.parse.urlparse(url).hostname or ""
+    return any(host == domain or host.endswith("." + domain) for domain in TRACKER_DOMAINS)
+
+class ResourceBlocker:
+    """Playwright route handler that aborts heavy assets and analytics requests.
+
+    Attach it to a page or a context. The counters are shared by everything
+    it is attached to, so one blocker gives per-run totals.
+    """
+    def __init__(self):
+        self.blocked = Counter()
+        self.bytes_saved = 0
+        self.allowed = 0
+
+    async def attach(self, target):
+        await target.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        if is_tracker(request.url):
+            kind = "tracker"
+        elif request.resource_type in BLOCKED_RESOURCE_TYPES:
+            kind = request.resource_type
+        else:
+            self.allowed += 1
+            await route.continue_()
+            return
+        self.blocked[kind] += 1
+        self.bytes_saved += TYPICAL_BYTES[kind]
+        await route.abort("blockedbyclient")
+
+    @property
+    def blocked_total(self) -> int:
+        return sum(self.blocked.values())
+
+    def summary(self) -> str:
+        kinds = ", ".join(f"{kind} {count}" for kind, count in self.blocked.most_common())
+        return (f"Lean mode: blocked {self.blocked_total} of {self.blocked_total + self.allowed} requests"
+                f" ({kinds or 'none'}), ~{self.bytes_saved / 1_000_000:.1f} MB saved.")
@@ -0,0 +1,126 @@
+"""Worker for distributed scrape runs.
+
+Claims shards of a run from the coordinator, scrapes their queries and hands
+every lead to the coordinator's dedup before it counts. Workers on the
+coordinator's host are started by it in a process pool and use the shard
+queue directly. On other hosts, point them at the API:
+
+    python -m app.services.scraper.shard_worker --coordinator http://10.0.0.5:8000 --run 1a2b3c4d --processes 4
+"""
+import os
+import socket
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.core.browser_pool import BrowserPool
+from app.services.scraper import GMBScraper
+from app.services.scraper.shards import shard_queue, LEASE_SECONDS
+
+HEARTBEAT_INTERVAL = LEASE_SECONDS / 5
+
+class HttpCoordinator:
+    """The shard queue of a coordinator on another host, same methods as ShardQueue."""
+    def __init__(self, base_url: str):
+        # Only remote workers need httpx, the server imports this module without it
+        import httpx
+        self.client = httpx.Client(
+            base_url=base_url.rstrip("/") + "/api/scrape/shards", timeout=30, transport=httpx.HTTPTransport(retries=3)
+        )
+
+    def _post(self, path: str, payload: dict) -> dict:
+        response = self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def claim(self, run_id: str, worker: str):
+        return self._post("/claim", {"runId": run_id, "worker": worker})["shard"]
+
+    def heartbeat(self, shard_id: int, worker: str) -> str:
+        return self._post(f"/{shard_id}/heartbeat", {"worker": worker})["status"]
+
+    def add_lead(self, shard_id: int, lead: dict) -> str:
+        return self._post(f"/{shard_id}/leads", {"lead": lead})["result"]
+
+    def complete(self, shard_id: int, worker: str, error: str = ""):
+        self._post(f"/{shard_id}/complete", {"worker": worker, "error": error})
+
+async def keep_alive(coordinator, shard_id, worker_id, scraper, log):
+    # Renews the shard's lease and stops the scraper once the run is stopped or has its leads
+    while not await scraper.stop_signal.sleep(HEARTBEAT_INTERVAL):
+        try:
+            status = await asyncio.to_thread(coordinator.heartbeat, shard_id, worker_id)
+        except Exception as e:
+            log(f"Heartbeat failed: {e}")
+            continue
+        if status != "running":
+            log(f"Run is {status}, stopping shard {shard_id}.")
+            scraper.stop()
+            return
+
+async def run_worker(coordinator, run_id: str, worker_id: str, log=print) -> int:
+    """Works through shards until the run has none left; returns how many this worker finished."""
+    # One warm browser for all of this worker's shards
+    browser_pool = BrowserPool(size=1)
+    await browser_pool.start()
+    finished = 0
+    try:
+        while True:
+            shard = await asyncio.to_thread(coordinator.claim, run_id, worker_id)
+            if not shard:
+                break
+            shard_id = shard["shardId"]
+            shard_log = lambda msg, shard_id=shard_id: log(f"[{worker_id} shard {shard_id}] {msg}")
+            shard_log(f"Claimed {len(shard['queries'])} queries (attempt {shard['attempt']}, "
+                      f"{shard['remaining']} leads left in the run).")
+
+            def lead_sink(lead, shard_id=shard_id):
+                result = coordinator.add_lead(shard_id, lead)
+                if result == "limit":
+                    scraper.stop()
+                return result == "added"
+
+            scraper = GMBScraper.from_params(
+                shard["params"], limit=shard["remaining"], queries=shard["queries"], resume=False, checkpoints=False,
+                lead_sink=lead_sink, browser_pool=browser_pool, log=shard_log
+            )
+            heartbeat = asyncio.create_task(keep_alive(coordinator, shard_id, worker_id, scraper, shard_log))
+            error = ""
+            try:
+                await scraper.run_async()
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                shard_log(f"❌ Shard failed: {error}")
+            finally:
+                heartbeat.cancel()
+            await asyncio.to_thread(coordinator.complete, shard_id, worker_id, error)
+            finished += 0 if error else 1
+    finally:
+        await browser_pool.stop()
+    log(f"[{worker_id}] No shards left, finished {finished}.")
+    return finished
+
+def local_worker(run_id: str, worker_id: str) -> int:
+    """Process pool entry point on the coordinator's host."""
+    return asyncio.run(run_worker(shard_queue, run_id, worker_id))
+
+def remote_worker(base_url: str, run_id: str, worker_id: str) -> int:
+    return asyncio.run(run_worker(HttpCoordinator(base_url), run_id, worker_id))
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape shards of a distributed run for a remote coordinator")
+    parser.add_argument("--coordinator", required=True, help="base URL of the LeadNEST API, e.g. http://10.0.0.5:8000")
+    parser.add_argument("--run", required=True, help="run id returned by POST /api/scrape/distributed")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes on this host")
+    args = parser.parse_args()
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    if args.processes <= 1:
+        remote_worker(args.coordinator, args.run, prefix)
+        return
+    with ProcessPoolExecutor(max_workers=args.processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(remote_worker, args.coordinator, args.run, f"{prefix}-{i + 1}") for i in range(args.processes)]
+        print(f"Shards finished: {sum(future.result() for future in futures)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from app.services.lead_store import lead_store, normalize_name, BUSY_TIMEOUT
+from app.services.phones import phone_key
+from app.services.scraper.checkpoints import CHECKPOINT_PATH
+
+# A worker that stops heartbeating for this long loses its shard to the next claim
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shard_runs (
+    run_id TEXT PRIMARY KEY,
+    params TEXT NOT NULL,
+    sheet_id TEXT NOT NULL,
+    lead_limit INTEGER NOT NULL,
+    leads_added INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'running',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS shards (
+    shard_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    queries TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT NOT NULL DEFAULT '',
+    leased_until REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    leads_added INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_shards_run ON shards(run_id, status);
+
+-- Slots of the run's lead limit, taken before the lead store insert
+CREATE TABLE IF NOT EXISTS shard_leads (
+    run_id TEXT NOT NULL,
+    lead_key TEXT NOT NULL,
+    shard_id INTEGER NOT NULL,
+    PRIMARY KEY (run_id, lead_key)
+);
+"""
+
+def lead_key(lead: dict) -> str:
+    # What the lead store dedups on: the phone, or the name for leads without one
+    phone = phone_key(str(lead.get("phone", "")).strip())
+    if phone:
+        return "phone:" + phone
+    name = normalize_name(str(lead.get("name", "")))
+    return "name:" + name if name else "lead:" + uuid.uuid4().hex
+
+def split_queries(queries: list, shard_size: int) -> list:
+    shard_size = max(1, shard_size)
+    return [queries[i:i + shard_size] for i in range(0, len(queries), shard_size)]
+
+class ShardQueue:
+    """Shards of a distributed scrape run, shared by every worker process on this host.
+
+    Workers claim a shard with a lease, renew it with heartbeats and complete
+    it. Leads go through add_lead, which checks the run's lead limit and
+    reserves a slot for the lead in one transaction here, then inserts it
+    into the lead store, a separate database that commits on its own. A
+    crash in between leaves the slot to the shard's retry, which inserts the
+    lead against it, so the limit is never overshot. The store's atomic
+    insert is the shared dedup set, so two workers can never add the same
+    lead. Remote workers reach the same queue through the shard endpoints.
+    """
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def create_run(self, params: dict, sheet_id: str, queries: list, shard_size: int) -> str:
+        run_id = uuid.uuid4().hex[:8]
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO shard_runs (run_id, params, sheet_id, lead_limit, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (run_id, json.dumps(params), sheet_id, params["limit"], now, now)
+            )
+            self.conn.executemany(
+                "INSERT INTO shards (run_id, queries, updated_at) VALUES (?, ?, ?)",
+                [(run_id, json.dumps(shard), now) for shard in split_queries(queries, shard_size)]
+            )
+        return run_id
+
+    def claim(self, run_id: str, worker: str, lease_seconds: float = LEASE_SECONDS):
+        """Leases the next pending (or abandoned) shard to worker; None when the run has no work left."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                run = self.conn.execute("SELECT * FROM shard_runs WHERE run_id = ?", (run_id,)).fetchone()
+                if run is None or run["status"] != "running":
+                    self.conn.commit()
+                    return None
+                # Abandoned on its last attempt, nobody will pick it up again
+                self.conn.execute(
+                    """UPDATE shards SET status = 'failed', error = 'lease expired', updated_at = ?
+                       WHERE run_id = ? AND status = 'leased' AND leased_until < ? AND attempts >= ?""",
+                    (now, run_id, now, MAX_ATTEMPTS)
+                )
+                if run["leads_added"] >= run["lead_limit"]:
+                    self._finish(run_id, "completed", now)
+                    self.conn.commit()
+                    return None
+                row = self.conn.execute(
+                    """SELECT * FROM shards WHERE run_id = ? AND attempts < ?
+                         AND (status = 'pending' OR (status = 'leased' AND leased_until < ?))
+                       ORDER BY shard_id LIMIT 1""",
+                    (run_id, MAX_ATTEMPTS, now)
+                ).fetchone()
+                if row is None:
+                    counts = dict(self.conn.execute(
+                        "SELECT status, COUNT(*) FROM shards WHERE run_id = ? GROUP BY status", (run_id,)
+                    ).fetchall())
+                    if not counts.get("leased") and not counts.get("pending"):
+                        self._finish(run_id, "failed" if counts.get("failed") and not counts.get("done") else "completed", now)
+                    self.conn.commit()
+                    return None
+                self.conn.execute(
+                    """UPDATE shards SET status = 'leased', worker = ?, leased_until = ?, attempts = attempts + 1,
+                       updated_at = ? WHERE shard_id = ?""",
+                    (worker, now + lease_seconds, now, row["shard_id"])
+                )
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        return {
+            "shardId": row["shard_id"],
+            "runId": run_id,
+            "queries": json.loads(row["queries"]),
+            "params": json.loads(run["params"]),
+            "remaining": run["lead_limit"] - run["leads_added"],
+            "attempt": row["attempts"] + 1,
+        }
+
+    def _finish(self, run_id: str, status: str, now: float):
+        self.conn.execute(
+            "UPDATE shard_runs SET status = ?, updated_at = ? WHERE run_id = ? AND status = 'running'", (status, now, run_id)
+        )
+
+    def heartbeat(self, shard_id: int, worker: str, lease_seconds: float = LEASE_SECONDS) -> str:
+        """Renews the lease; returns the run status, anything but 'running' means stop."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE shards SET leased_until = ?, updated_at = ? WHERE shard_id = ? AND worker = ? AND status = 'leased'",
+                (now + lease_seconds, now, shard_id, worker)
+            )
+            row = self.conn.execute(
+                "SELECT r.status FROM shards s JOIN shard_runs r ON r.run_id = s.run_id WHERE s.shard_id = ?", (shard_id,)
+            ).fetchone()
+        return row["status"] if row else "unknown"
+
+    def add_lead(self, shard_id: int, lead: dict) -> str:
+        """Returns 'added', 'duplicate', or 'limit' once the run has all the leads it asked for."""
+        key = lead_key(lead)
+        with self.lock:
+            # The write lock spans the limit check and the reservation, across processes too
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                run = self.conn.execute(
+                    "SELECT r.* FROM shards s JOIN shard_runs r ON r.run_id = s.run_id WHERE s.shard_id = ?", (shard_id,)
+                ).fetchone()
+                slot = self.conn.execute(
+                    "SELECT shard_id FROM shard_leads WHERE run_id = ? AND lead_key = ?", (run["run_id"], key)
+                ).fetchone() if run else None
+                if slot is not None:
+                    # Reserved by an earlier attempt of this shard, or by another shard that adds it itself
+                    reserved = slot["shard_id"] == shard_id
+                elif run is None or run["status"] != "running" or run["leads_added"] >= run["lead_limit"]:
+                    self.conn.commit()
+                    return "limit"
+                else:
+                    reserved = True
+                    self._count_lead(run["run_id"], shard_id, key, 1)
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+        if not reserved:
+            return "duplicate"
+        if lead_store.add_lead(run["sheet_id"], {**lead, "status": "New"}):
+            return "added"
+        if slot is None:
+            # Already in the store from elsewhere, give the slot back
+            with self.lock, self.conn:
+                self._count_lead(run["run_id"], shard_id, key, -1)
+        return "duplicate"
+
+    def _count_lead(self, run_id: str, shard_id: int, key: str, delta: int):
+        now = time.time()
+        if delta > 0:
+            self.conn.execute("INSERT INTO shard_leads (run_id, lead_key, shard_id) VALUES (?, ?, ?)", (run_id, key, shard_id))
+        else:
+            self.conn.execute("DELETE FROM shard_leads WHERE run_id = ? AND lead_key = ?", (run_id, key))
+        self.conn.execute(
+            "UPDATE shard_runs SET leads_added = leads_added + ?, updated_at = ? WHERE run_id = ?", (delta, now, run_id)
+        )
+        self.conn.execute(
+            "UPDATE shards SET leads_added = leads_added + ?, updated_at = ? WHERE shard_id = ?", (delta, now, shard_id)
+        )
+
+    def complete(self, shard_id: int, worker: str, error: str = ""):
+        # A failed shard goes back to the queue until it has used up its attempts
+        now = time.time()
+        with self.lock, self.conn:
+            if error:
+                self.conn.execute(
+                    """UPDATE shards SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END,
+                       error = ?, updated_at = ? WHERE shard_id = ? AND worker = ?""",
+                    (MAX_ATTEMPTS, error, now, shard_id, worker)
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE shards SET status = 'done', error = '', updated_at = ? WHERE shard_id = ? AND worker = ?",
+                    (now, shard_id, worker)
+                )
+
+    def stop_run(self, run_id: str) -> bool:
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE shard_runs SET status = 'stopped', updated_at = ? WHERE run_id = ? AND status = 'running'",
+                (time.time(), run_id)
+            )
+        return cur.rowcount == 1
+
+    def run_status(self, run_id: str):
+        with self.lock:
+            run = self.conn.execute("SELECT * FROM shard_runs WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None:
+                return None
+            shards = self.conn.execute("SELECT * FROM shards WHERE run_id = ? ORDER BY shard_id", (run_id,)).fetchall()
+        counts = {}
+        for shard in shards:
+            counts[shard["status"]] = counts.get(shard["status"], 0) + 1
+        return {
+            "runId": run_id,
+            "status": run["status"],
+            "params": json.loads(run["params"]),
+            "leadsAdded": run["leads_added"],
+            "limit": run["lead_limit"],
+            "shardCounts": counts,
+            "shards": [
+                {
+                    "shardId": shard["shard_id"],
+                    "queries": json.loads(shard["queries"]),
+                    "status": shard["status"],
+                    "worker": shard["worker"],
+                    "attempts": shard["attempts"],
+                    "leadsAdded": shard["leads_added"],
+                    "error": shard["error"],
+                }
+                for shard in shards
+            ],
+            "createdAt": run["created_at"],
+            "updatedAt": run["updated_at"],
+        }
+
+    def list_runs(self, limit: int = 50) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT run_id, status, leads_added, lead_limit, created_at FROM shard_runs ORDER BY created_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            {"runId": row["run_id"], "status": row["status"], "leadsAdded": row["leads_added"],
+             "limit": row["lead_limit"], "createdAt": row["created_at"]}
+            for row in rows
+        ]
+
+shard_queue = ShardQueue()
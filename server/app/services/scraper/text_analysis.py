@@ -0,0 +1,63 @@
+import re
+
+# Lines longer than this are page copy, not a name/title line
+MAX_DECISION_MAKER_LINE = 100
+
+class TextAnalyzer:
+    """Relevance keywords and decision-maker titles compiled once per scraper.
+
+    The page text is lowercased once per call. Relevance is a single scan
+    with one combined \\b(?:k1|k2|...)\\b pattern. Titles are located with
+    str.find on that lowercased copy, which in CPython beats both a regex
+    alternation and the old per-line, per-title lower() calls.
+    """
+    def __init__(self, relevance_keywords: list, titles: list):
+        keywords = sorted({k.strip().lower() for k in relevance_keywords if k.strip()}, key=len, reverse=True)
+        # Longest first so "art school" wins over "art" at the same position
+        self.keywords_re = re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b") if keywords else None
+        self.titles = sorted({t.strip().lower() for t in titles if t.strip()})
+
+    def is_relevant(self, text: str) -> bool:
+        if self.keywords_re is None:
+            return True
+        return self.keywords_re.search((text or "").lower()) is not None
+
+    def matched_keywords(self, text: str) -> set:
+        # Matches don't overlap, so a keyword only found inside a longer matched keyword is not reported
+        if self.keywords_re is None:
+            return set()
+        return set(self.keywords_re.findall((text or "").lower()))
+
+    def find_decision_makers(self, text: str) -> dict:
+        """Short lines mentioning a title, mapped to the titles found on them."""
+        found = {}
+        if not self.titles or not text:
+            return found
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Rare characters change length when lowercased, offsets no longer line up
+            return self._find_by_line(text)
+        for title in self.titles:
+            pos = lowered.find(title)
+            while pos != -1:
+                line_start = text.rfind("\n", 0, pos) + 1
+                line_end = text.find("\n", pos)
+                if line_end == -1:
+                    line_end = len(text)
+                line = text[line_start:line_end].strip()
+                if len(line) < MAX_DECISION_MAKER_LINE:
+                    found.setdefault(line, set()).add(title)
+                pos = lowered.find(title, line_end)
+        return found
+
+    def _find_by_line(self, text: str) -> dict:
+        found = {}
+        for line in text.split("\n"):
+            line = line.strip()
+            if len(line) >= MAX_DECISION_MAKER_LINE:
+                continue
+            line_lower = line.lower()
+            titles = {title for title in self.titles if title in line_lower}
+            if titles:
+                found.setdefault(line, set()).update(titles)
+        return found
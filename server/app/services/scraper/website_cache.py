@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import urllib.parse
+
+from app.services.lead_store import BUSY_TIMEOUT
+
+CACHE_PATH = os.getenv("LEADNEST_CACHE_DB", "website_cache.db")
+MAX_ENTRIES = int(os.getenv("LEADNEST_CACHE_MAX_ENTRIES", "5000"))
+# Page text kept for relevance checks; enough for keyword matching without bloating the file
+MAX_TEXT_CHARS = 200_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS websites (
+    domain TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    emails TEXT NOT NULL,
+    phones TEXT NOT NULL,
+    decision_makers TEXT NOT NULL,
+    text TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_websites_last_used ON websites(last_used_at);
+"""
+
+# Profiles on these hosts belong to unrelated businesses and are never cached
+SOCIAL_HOSTS = {
+    "facebook.com", "m.facebook.com", "fb.com", "instagram.com", "twitter.com", "x.com", "linkedin.com",
+    "tiktok.com", "youtube.com", "linktr.ee", "wa.me", "api.whatsapp.com", "business.site", "g.page",
+}
+# Site builders host many businesses on one domain, told apart by the first path segment
+SHARED_HOSTS = {
+    "sites.google.com", "wixsite.com", "wordpress.com", "blogspot.com", "weebly.com", "squarespace.com",
+    "godaddysites.com", "webflow.io", "carrd.co", "github.io", "yolasite.com", "jimdosite.com",
+}
+SHARED_PATH_PREFIXES = {"view", "site", "a"}
+
+def _on(host: str, domains: set) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+def cache_key(url: str) -> str:
+    # Keyed by domain so chain locations sharing a site reuse one scrape
+    url = (url or "").strip().lower()
+    parsed = urllib.parse.urlparse(url if "://" in url else "http://" + url)
+    host = parsed.hostname or ""
+    host = host[4:] if host.startswith("www.") else host
+    if _on(host, SOCIAL_HOSTS):
+        return ""
+    if _on(host, SHARED_HOSTS):
+        segments = [segment for segment in parsed.path.split("/") if segment]
+        # sites.google.com/view/<site> and /site/<site>
+        if segments and segments[0] in SHARED_PATH_PREFIXES:
+            segments = segments[:2] if len(segments) > 1 else []
+        else:
+            segments = segments[:1]
+        if not segments:
+            return "" if host in SHARED_HOSTS else host
+        return host + "/" + "/".join(segments)
+    return host
+
+class WebsiteCache:
+    """Cross-run cache of deep-scrape results with a TTL and LRU eviction."""
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def get(self, url: str, ttl_seconds: float):
+        key = cache_key(url)
+        if not key:
+            return None
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT * FROM websites WHERE domain = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row["scraped_at"] > ttl_seconds:
+                self.conn.execute("DELETE FROM websites WHERE domain = ?", (key,))
+                return None
+            self.conn.execute("UPDATE websites SET last_used_at = ? WHERE domain = ?", (now, key))
+        return {
+            "emails": json.loads(row["emails"]),
+            "phones": json.loads(row["phones"]),
+            "decision_makers": json.loads(row["decision_makers"]),
+            "text": row["text"],
+        }
+
+    def put(self, url: str, meta: dict, text: str):
+        key = cache_key(url)
+        if not key:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO websites (domain, url, emails, phones, decision_makers, text, scraped_at, last_used_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, url, json.dumps(meta["emails"]), json.dumps(meta["phones"]),
+                 json.dumps(meta["decision_makers"]), text[:MAX_TEXT_CHARS], now, now)
+            )
+            # Evict the least recently used entries beyond the size bound
+            self.conn.execute(
+                """DELETE FROM websites WHERE domain IN (
+                       SELECT domain FROM websites ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)""",
+                (self.max_entries,)
+            )
+
+website_cache = WebsiteCache()
@@ -1,66 +1,101 @@
 import os
 import time
-import random
 import urllib.parse
 from playwright.sync_api import sync_playwright
 import threading
 
+from app.core.log_buffer import LogBuffer
+from app.core.pacing import ThroughputPolicy
+from app.core.metrics import registry, StageTimer
 from app.services.google_sheets import sheets_service
+from app.services.lead_store import lead_store
+from app.services.phones import DEFAULT_REGION, normalize_phone, prepare_send_list
 
-whatsapp_logs = []
+whatsapp_logs = LogBuffer()
+
+SEND_SECONDS = registry.histogram(
+    "leadnest_whatsapp_send_seconds", "Time from opening a chat to the outcome of the send.", labels=("result",)
+)
+
+# Written to the local store right before Enter is pressed. A lead still in this
+# status on the next run may have been messaged, so it is never retried.
+SENDING = "Sending"
+UNCONFIRMED = "Unconfirmed"
+
+COMPOSER_SELECTOR = '#main footer div[contenteditable="true"][role="textbox"]'
+# The same popup container also shows a transient "Starting chat" notice, only its invalid-number text counts
+INVALID_MODAL_SELECTOR = 'div[data-animate-modal-popup="true"]:has-text("invalid")'
+OUTGOING_SELECTOR = '#main div.message-out'
+# Status icon of the newest outgoing bubble once there are more than before Enter was pressed
+LAST_TICK_JS = '''([selector, before]) => {
+    const bubbles = document.querySelectorAll(selector);
+    if (bubbles.length <= before) return null;
+    const icon = bubbles[bubbles.length - 1].querySelector('span[data-icon^="msg-"]');
+    return icon ? icon.getAttribute('data-icon') : null;
+}'''
 
 def log_wa(msg: str):
     print(msg)
     whatsapp_logs.append(msg)
 
 class WhatsAppService:
-    def __init__(self, message_template: str, limit: int = None):
+    def __init__(self, message_template: str, limit: int = None, messages_per_minute: float = 4,
+                 default_region: str = DEFAULT_REGION):
         self.message_template = message_template
         self.limit = limit
+        # Region assumed for numbers written without a country code
+        self.default_region = (default_region or DEFAULT_REGION).upper()
+        self.throughput = ThroughputPolicy(messages_per_minute)
+        self.send_timings = StageTimer(SEND_SECONDS, label="result")
         self.user_data_dir = os.path.join(os.getcwd(), "whatsapp_session_api")
         self.is_running = False
 
-    def clean_phone(self, s: str) -> str:
-        s = str(s or "").strip()
-        out = "".join(ch for ch in s if ch.isdigit() or ch == "+")
-        if out.count("+") > 1:
-            out = out.replace("+", "")
-        if not out.startswith("+") and out:
-             out = "+91" + out # default IN, configurable later
-        return out
+    def prepare(self, rows: list) -> list:
+        """Normalizes every number up front and writes invalid/duplicate statuses in one batch each."""
+        contacted = lead_store.leads_with_status(sheets_service.sheet_id, ["Sent", SENDING, UNCONFIRMED])
+        contacted = {normalize_phone(lead["phone"], self.default_region) for lead in contacted} - {""}
+        send_list, invalid, duplicates = prepare_send_list(rows, self.default_region, contacted)
+        sheets_service.update_statuses([lead["id"] for lead in invalid], "Invalid Phone")
+        sheets_service.update_statuses([lead["id"] for lead in duplicates], "Duplicate Phone")
+        log_wa(f"📋 {len(send_list)} numbers to message, {len(invalid)} invalid, {len(duplicates)} duplicates "
+               f"(default region {self.default_region}).")
+        return send_list
 
     def run_automation(self):
         if not sheets_service.client or not sheets_service.sheet_id:
              log_wa("❌ Google Sheets not connected! Cannot read leads.")
              return
 
+        # Pick up edits made in the sheet (e.g. Do Not Contact) before choosing who to message
+        try:
+            sheets_service.create_or_get_sheet()
+        except Exception as e:
+            log_wa(f"❌ Could not sync the sheet: {e}")
+            return
+
         self.is_running = True
         log_wa("🚀 Starting WhatsApp Automation...")
         log_wa(f"ℹ️  Session directory: {self.user_data_dir}")
         log_wa("⚠️ A browser window will open. Scan the QR code if you aren't logged in.")
 
-        sh = sheets_service.client.open_by_key(sheets_service.sheet_id)
-        worksheet = sh.sheet1
-        all_values = worksheet.get_all_values()
-        
-        if not all_values or len(all_values) < 2:
-            log_wa("Sheet is empty or missing data.")
+        # A previous run died between pressing Enter and recording the result
+        interrupted = lead_store.leads_with_status(sheets_service.sheet_id, [SENDING])
+        if interrupted:
+            sheets_service.update_statuses([lead["id"] for lead in interrupted], UNCONFIRMED)
+            log_wa(f"⚠️ {len(interrupted)} leads were mid-send when the last run stopped, marked {UNCONFIRMED} instead of messaging them again.")
+
+        # Leads are read from the local store, synced with the sheet above
+        rows = lead_store.leads_with_status(sheets_service.sheet_id, ["new", ""])
+        send_list = self.prepare(rows) if rows else []
+
+        if not send_list:
+            log_wa("No new leads to message.")
             self.is_running = False
             return
-            
-        headers = [h.strip().lower() for h in all_values[0]]
-        rows = all_values[1:]
-        
-        try:
-             idx_phone = next(i for i, h in enumerate(headers) if "phone" in h or "contact" in h)
-             idx_status = next(i for i, h in enumerate(headers) if "status" in h)
-        except StopIteration:
-             log_wa("Could not find 'Phone' or 'Status' columns in sheet.")
-             self.is_running = False
-             return
 
         sent_count = 0
         
+        # Not from the scraper's browser pool: WhatsApp needs a visible Chrome on its own saved profile
         with sync_playwright() as p:
             browser = p.chromium.launch_persistent_context(
                 self.user_data_dir,
@@ -84,58 +119,58 @@ class WhatsAppService:
                 self.is_running = False
                 return
 
-            for i, row in enumerate(rows, start=2): # +1 for 0-index, +1 for header
+            for lead, phone in send_list:
                 if self.limit and sent_count >= self.limit:
                     log_wa(f"🛑 Reached user-defined limit of {self.limit}.")
                     break
 
-                phone_raw = row[idx_phone] if len(row) > idx_phone else ""
-                status = row[idx_status] if len(row) > idx_status else ""
-                
-                if status.strip().lower() not in ["new", ""]:
-                    continue
-                    
-                phone_clean = self.clean_phone(phone_raw).lstrip('0')
-                if len(phone_clean) < 10:
-                    worksheet.update_cell(i, idx_status + 1, "Invalid Phone")
-                    continue
-                    
-                log_wa(f"Sending to {phone_clean}...")
-                
+                # Human-like spacing between messages, counted from the previous send
+                self.throughput.wait()
+                log_wa(f"Sending to {phone}...")
+                started = time.perf_counter()
+
                 try:
-                     encoded_msg = urllib.parse.quote(self.message_template)
-                     url = f"https://web.whatsapp.com/send?phone={phone_clean}&text={encoded_msg}"
-                     
-                     page.goto(url, wait_until='domcontentloaded', timeout=20000)
-                     time.sleep(5)
-                     
-                     input_box_selector = '#main footer div[contenteditable="true"][role="textbox"]'
-                     
-                     try:
-                         page.wait_for_selector(input_box_selector, timeout=15000)
-                         page.locator(input_box_selector).press("Enter")
-                         time.sleep(2)
-                         log_wa("   ✅ Sent!")
-                         worksheet.update_cell(i, idx_status + 1, "Sent")
-                         sent_count += 1
-                     except Exception as e:
-                         # Handle invalid number popups
-                         if page.query_selector('div[data-animate-modal-popup="true"]'):
-                              log_wa("   ⚠️ Invalid WhatsApp Number.")
-                              worksheet.update_cell(i, idx_status + 1, "Invalid WA Number")
-                         else:
-                              log_wa(f"   ❌ Send error: {e}")
-                              worksheet.update_cell(i, idx_status + 1, "Send Error")
+                    encoded_msg = urllib.parse.quote(self.message_template)
+                    url = f"https://web.whatsapp.com/send?phone={phone.lstrip('+')}&text={encoded_msg}"
+                    page.goto(url, wait_until='domcontentloaded', timeout=20000)
                 except Exception as e:
-                     log_wa(f"   ❌ Network/Navigation Error: {e}")
-                     worksheet.update_cell(i, idx_status + 1, "Nav Error")
+                    log_wa(f"   ❌ Network/Navigation Error: {e}")
+                    sheets_service.update_status(lead["id"], "Nav Error")
+                    self.send_timings.observe("nav_error", time.perf_counter() - started)
+                    continue
 
-                time.sleep(random.randint(4, 8))
+                try:
+                    # Whichever shows up first: the chat is ready or WhatsApp rejects the number
+                    page.wait_for_selector(f"{COMPOSER_SELECTOR}, {INVALID_MODAL_SELECTOR}", timeout=30000)
+                    if page.query_selector(INVALID_MODAL_SELECTOR):
+                        log_wa("   ⚠️ Invalid WhatsApp Number.")
+                        sheets_service.update_status(lead["id"], "Invalid WA Number")
+                        self.send_timings.observe("invalid", time.perf_counter() - started)
+                        continue
+
+                    outgoing = page.eval_on_selector_all(OUTGOING_SELECTOR, "els => els.length")
+                    # Journal the attempt first so a crash right after Enter can't lead to a second message
+                    sheets_service.update_status(lead["id"], SENDING)
+                    page.locator(COMPOSER_SELECTOR).press("Enter")
+                    # The new bubble gets a clock icon while pending and a tick once WhatsApp accepted it
+                    tick = page.wait_for_function(LAST_TICK_JS, arg=[OUTGOING_SELECTOR, outgoing], timeout=20000).json_value()
+                    log_wa("   ✅ Sent!" if tick != "msg-time" else "   ✅ Sent (pending delivery).")
+                    sheets_service.update_status(lead["id"], "Sent")
+                    self.send_timings.observe("sent", time.perf_counter() - started)
+                    sent_count += 1
+                except Exception as e:
+                    log_wa(f"   ❌ Send error: {e}")
+                    sheets_service.update_status(lead["id"], "Send Error")
+                    self.send_timings.observe("send_error", time.perf_counter() - started)
 
             log_wa(f"🎉 Complete. Sent {sent_count} messages.")
-            time.sleep(3)
+            if self.send_timings.totals:
+                log_wa(f"Send timings: {self.send_timings.summary()}")
             browser.close()
             
+        if sheets_service.lead_syncer.pending() and not sheets_service.flush_leads():
+            log_wa("⚠ Could not write statuses to the sheet yet, they will be retried.")
+
         self.is_running = False
 
     def start_in_background(self):
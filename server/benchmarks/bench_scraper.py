@@ -0,0 +1,98 @@
+"""End-to-end scraper benchmark against the local fixture server, no network needed.
+
+Runs GMBScraper against benchmarks.fixture_server with the Sheets client
+replaced by benchmarks.stub_sheets, then reports leads/minute, per-stage
+latency and peak memory. Needs Chromium for Playwright (playwright install chromium).
+
+Run from the server folder:
+    python -m benchmarks.bench_scraper --queries 4 --results 60 --limit 200
+    python -m benchmarks.bench_scraper --feed-harvest --lean --latency-ms 50 --error-rate 0.1
+"""
+import os
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+
+# The lead store, website cache and checkpoint store open their databases at import time
+_workdir = tempfile.mkdtemp(prefix="leadnest-bench-")
+os.environ.setdefault("LEADNEST_DB", os.path.join(_workdir, "leads.db"))
+os.environ.setdefault("LEADNEST_CACHE_DB", os.path.join(_workdir, "website_cache.db"))
+os.environ.setdefault("LEADNEST_CHECKPOINT_DB", os.path.join(_workdir, "checkpoints.db"))
+
+from app.services.scraper import GMBScraper
+from app.services.google_sheets import sheets_service
+from benchmarks import stub_sheets
+from benchmarks.fixture_server import FixtureConfig, start_in_background
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark")
+    parser.add_argument("--queries", type=int, default=4, help="number of search keywords")
+    parser.add_argument("--results", type=int, default=60, help="results per search feed")
+    parser.add_argument("--limit", type=int, default=200, help="lead limit for the run")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every fixture response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of website pages that fail")
+    parser.add_argument("--page-kb", type=int, default=20, help="filler text per website page")
+    parser.add_argument("--sheets-latency-ms", type=float, default=100, help="simulated Sheets API round-trip")
+    parser.add_argument("--deep-concurrency", type=int, default=3)
+    parser.add_argument("--query-concurrency", type=int, default=2)
+    parser.add_argument("--lean", action="store_true", help="lean mode")
+    parser.add_argument("--feed-harvest", action="store_true", help="feed harvest mode")
+    parser.add_argument("--no-http-first", action="store_true", help="deep scrape in the browser only")
+    parser.add_argument("--pacing", action="store_true", help="keep production request pacing on")
+    return parser.parse_args()
+
+def report(scraper, elapsed, python_peak, stub_client):
+    stats = scraper.stats
+    minutes = elapsed / 60
+    print(f"\nElapsed: {elapsed:.1f} s")
+    print(f"Leads added: {stats['leads_added']} ({stats['leads_added'] / minutes:.1f}/min)")
+    print(f"Places inspected: {stats['places_inspected']} ({stats['places_inspected'] / minutes:.1f}/min), "
+          f"{stats['places_harvested']} from the feed alone")
+    print(f"Deep scrapes: {stats['http_scrapes']} HTTP, {stats['browser_scrapes']} browser, {stats['http_fallbacks']} fallbacks")
+
+    print(f"\n  {'stage':<22}{'count':>8}{'total s':>10}{'avg ms':>10}{'max ms':>10}")
+    stages = sorted(scraper.timings.to_dict().items(), key=lambda item: item[1]["totalMs"], reverse=True)
+    for stage, timing in stages:
+        print(f"  {stage:<22}{timing['count']:>8}{timing['totalMs'] / 1000:>10.2f}{timing['avgMs']:>10}{timing['maxMs']:>10}")
+
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    # The browser counts once it has exited, which it has by the time the run returns
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"\nPeak memory: Python heap {python_peak / 1_000_000:.1f} MB, server process RSS {own:.0f} MB, "
+          f"largest browser process RSS {children:.0f} MB")
+    sheet = next(iter(stub_client.sheets.values()), None)
+    if sheet:
+        print(f"Stub sheet: {len(sheet.sheet1.rows) - 1} rows written in {sheet.sheet1.calls} API calls")
+
+def main():
+    args = parse_args()
+    server, maps_base_url = start_in_background(FixtureConfig(
+        results_per_query=args.results, latency_ms=args.latency_ms, error_rate=args.error_rate, page_kb=args.page_kb
+    ))
+    stub_client = stub_sheets.install(sheets_service, latency_ms=args.sheets_latency_ms)
+    keywords = ",".join(f"dance {i}" for i in range(args.queries))
+
+    scraper = GMBScraper(
+        keywords, "dance", "Bench City", "India", args.limit,
+        deep_scrape_concurrency=args.deep_concurrency, query_concurrency=args.query_concurrency,
+        website_cache_ttl_hours=0, lean_mode=args.lean, http_first=not args.no_http_first,
+        feed_harvest=args.feed_harvest, log=lambda msg: None,
+        maps_base_url=maps_base_url, pacing=args.pacing,
+    )
+    print(f"Fixture server at {maps_base_url}, data in {_workdir}")
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        asyncio.run(scraper.run_async())
+    finally:
+        elapsed = time.perf_counter() - started
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        server.shutdown()
+    report(scraper, elapsed, python_peak, stub_client)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Micro-benchmark: compiled TextAnalyzer vs the per-keyword scans it replaced.
+
+Run from the server folder:
+    python -m benchmarks.bench_text_analysis
+"""
+import re
+import random
+import string
+import timeit
+
+from app.services.scraper.text_analysis import TextAnalyzer
+
+RELEVANCE_KEYWORDS = [
+    "dance", "music", "yoga", "fitness", "academy", "school", "studio", "classes", "tuition", "coaching",
+    "ballet", "salsa", "hip hop", "zumba", "pilates", "karate", "taekwondo", "swimming", "gymnastics", "drama",
+]
+TITLES = ["Advisor", "Coordinator", "Lead", "President", "Secretary", "Head", "Director", "Principal"]
+
+def legacy_is_relevant(text, keywords):
+    text_lower = text.lower()
+    for k in keywords:
+        pattern = r'\b' + re.escape(k.lower()) + r'\b'
+        if re.search(pattern, text_lower):
+            return True
+    return False
+
+def legacy_find_decision_makers(text, titles):
+    found = []
+    for line in text.split('\n'):
+        for title in titles:
+            if title.lower() in line.lower() and len(line.strip()) < 100:
+                found.append(line.strip())
+    return list(set(found))
+
+def synthetic_page(size_chars, seed=7):
+    # Mostly filler words with short title lines sprinkled in, like a real about/team page
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    while total < size_chars:
+        if rng.random() < 0.02:
+            line = f"{rng.choice(['Jane Doe', 'Raj Kumar', 'Ana Silva'])} - {rng.choice(TITLES)}"
+        else:
+            words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(5, 25))]
+            line = " ".join(words)
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines)
+
+def bench(label, fn, number):
+    seconds = min(timeit.repeat(fn, number=number, repeat=3)) / number
+    print(f"  {label:<32} {seconds * 1000:9.2f} ms")
+    return seconds
+
+def main():
+    analyzer = TextAnalyzer(RELEVANCE_KEYWORDS, TITLES)
+    for size in (50_000, 500_000, 5_000_000):
+        text = synthetic_page(size)
+        # Worst case for relevance: no keyword on the page, every pattern scans everything
+        assert legacy_is_relevant(text, RELEVANCE_KEYWORDS) == analyzer.is_relevant(text)
+        assert set(legacy_find_decision_makers(text, TITLES)) == set(analyzer.find_decision_makers(text))
+
+        number = max(1, 2_000_000 // size)
+        print(f"\n{size:,} chars:")
+        old = bench("legacy is_relevant", lambda: legacy_is_relevant(text, RELEVANCE_KEYWORDS), number)
+        new = bench("TextAnalyzer.is_relevant", lambda: analyzer.is_relevant(text), number)
+        print(f"  {'speedup':<32} {old / new:9.1f}x")
+        old = bench("legacy find_decision_makers", lambda: legacy_find_decision_makers(text, TITLES), number)
+        new = bench("TextAnalyzer.find_decision_makers", lambda: analyzer.find_decision_makers(text), number)
+        print(f"  {'speedup':<32} {old / new:9.1f}x")
+
+if __name__ == "__main__":
+    main()
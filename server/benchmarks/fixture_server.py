@@ -0,0 +1,219 @@
+"""Local stand-in for Google Maps and business websites, for offline benchmarks.
+
+Serves a Maps-like search feed that loads more cards as it is scrolled,
+place pages with the selectors the scraper reads, and small business
+websites with about/contact pages. Every site is served on one of
+SITE_HOSTS loopback addresses (127.0.0.2, 127.0.0.3, ...) so per-host
+limits and the website cache behave like they do against real sites.
+Linux routes all of 127.0.0.0/8 to the loopback interface; nothing is
+reachable from other machines.
+
+Run it on its own to poke at the pages in a browser:
+    python -m benchmarks.fixture_server --port 8765
+"""
+import html
+import time
+import zlib
+import random
+import argparse
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PLACE_PATH = "/google.com/maps/place/" # The scraper selects anchors by this substring
+FEED_BATCH = 20
+# Loopback addresses the business sites are spread over, each with its own listener
+SITE_HOSTS = 32
+# Maps closes a finished results list with this marker
+END_OF_LIST = '<div><p class="fontBodyMedium"><span><span class="HlvSq">You\'ve reached the end of the list.</span></span></p></div>'
+
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+         "et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris").split()
+TITLES = ("Director", "Head Coach", "Principal", "Secretary", "Coordinator")
+
+class FixtureConfig:
+    def __init__(self, results_per_query: int = 60, latency_ms: float = 0, error_rate: float = 0.0,
+                 page_kb: int = 20, relevant_ratio: float = 0.8, website_ratio: float = 0.9,
+                 keyword: str = "dance", seed: int = 7):
+        self.results_per_query = results_per_query
+        self.latency_ms = latency_ms
+        # Share of website requests answered with a 429/500/503
+        self.error_rate = error_rate
+        self.page_kb = page_kb
+        self.relevant_ratio = relevant_ratio
+        self.website_ratio = website_ratio
+        self.keyword = keyword
+        self.seed = seed
+
+def place_id(query: str, index: int) -> str:
+    return f"{zlib.crc32(query.encode('utf-8')) % 100000:05d}-{index}"
+
+def site_host(pid: str, port: int) -> str:
+    # Spread sites over 127.0.0.2 - 127.0.0.(SITE_HOSTS + 1)
+    number = sum(ord(ch) * (i + 1) for i, ch in enumerate(pid))
+    return f"127.0.0.{2 + number % SITE_HOSTS}:{port}"
+
+class FixtureData:
+    """Deterministic fake places, derived from the place id so any request can be answered statelessly."""
+    def __init__(self, config: FixtureConfig, port: int):
+        self.config = config
+        self.port = port
+
+    def rng(self, pid: str) -> random.Random:
+        return random.Random(f"{self.config.seed}:{pid}")
+
+    def place(self, pid: str) -> dict:
+        rng = self.rng(pid)
+        has_website = rng.random() < self.config.website_ratio
+        return {
+            "id": pid,
+            "name": f"Fixture Studio {pid}",
+            "phone": f"+91 9{rng.randint(100000000, 999999999)}",
+            "rating": f"{rng.uniform(3.0, 5.0):.1f} stars",
+            "website": f"http://{site_host(pid, self.port)}/site/{pid}/" if has_website else "",
+            "relevant": rng.random() < self.config.relevant_ratio,
+        }
+
+    def filler(self, rng: random.Random, size_bytes: int) -> str:
+        lines = []
+        total = 0
+        while total < size_bytes:
+            line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20)))
+            lines.append(f"<p>{line}</p>")
+            total += len(line) + 7
+        return "\n".join(lines)
+
+def page(title: str, body: str) -> str:
+    return f"<!doctype html><html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head><body>{body}</body></html>"
+
+def feed_card(place: dict, origin: str) -> str:
+    website = f'<a data-value="Website" href="{place["website"]}">Website</a>' if place["website"] else ""
+    return (
+        f'<div role="article" class="card">'
+        f'<a href="{origin}{PLACE_PATH}{place["id"]}" aria-label="{html.escape(place["name"])}">{html.escape(place["name"])}</a>'
+        f'<span role="img" aria-label="{place["rating"]}">★</span>'
+        f'<div><span>Dance school</span> · <span>{place["phone"]}</span></div>{website}</div>'
+    )
+
+FEED_SCRIPT = """
+<script>
+const feed = document.querySelector('div[role="feed"]');
+let loading = false;
+feed.addEventListener('scroll', () => {
+  if (loading || feed.scrollTop + feed.clientHeight < feed.scrollHeight - 50) return;
+  loading = true;
+  fetch(feed.dataset.more + '&offset=' + feed.querySelectorAll('div[role="article"]').length)
+    .then(r => r.text()).then(text => { feed.insertAdjacentHTML('beforeend', text); loading = false; });
+});
+</script>
+"""
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    data = None # FixtureData, set by FixtureServer
+
+    def log_message(self, *args):
+        pass
+
+    def send_html(self, body: str, status: int = 200):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        config = self.data.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000)
+        url = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(url.query)
+        origin = f"http://127.0.0.1:{self.data.port}"
+
+        if url.path.startswith("/google.com/maps/search"):
+            query = params.get("q", [""])[0]
+            offset = int(params.get("offset", ["0"])[0])
+            end = min(offset + FEED_BATCH, config.results_per_query)
+            cards = "".join(feed_card(self.data.place(place_id(query, i)), origin) for i in range(offset, end))
+            if end >= config.results_per_query and offset < end:
+                cards += END_OF_LIST
+            if "offset" in params:
+                return self.send_html(cards) # Next batch for the scroll script
+            more = f"/google.com/maps/search/?q={urllib.parse.quote_plus(query)}"
+            body = (f'<h1>Results for {html.escape(query)}</h1>'
+                    f'<div role="feed" data-more="{more}" style="height:600px;overflow-y:scroll">{cards}'
+                    f'<div style="height:2000px"></div></div>{FEED_SCRIPT}')
+            return self.send_html(page(query, body))
+
+        if url.path.startswith(PLACE_PATH):
+            place = self.data.place(url.path[len(PLACE_PATH):])
+            website = f'<a data-item-id="authority" href="{place["website"]}">Website</a>' if place["website"] else ""
+            body = (f'<h1>{html.escape(place["name"])}</h1>'
+                    f'<span role="img" aria-label="{place["rating"]}">★</span>'
+                    f'<button data-item-id="phone:tel:{place["phone"].replace(" ", "")}" aria-label="Phone: {place["phone"]}">Call</button>'
+                    f'{website}')
+            return self.send_html(page(place["name"], body))
+
+        if url.path.startswith("/site/"):
+            parts = url.path.strip("/").split("/")
+            pid, sub = parts[1], (parts[2] if len(parts) > 2 else "")
+            rng = self.data.rng(pid + sub)
+            if config.error_rate and rng.random() < config.error_rate:
+                return self.send_html(page("Error", "<p>Try again later</p>"), status=rng.choice((429, 500, 503)))
+            place = self.data.place(pid)
+            topic = config.keyword if place["relevant"] else "plumbing"
+            body = (f'<h1>{html.escape(place["name"])}</h1><p>We teach {topic} classes for all ages.</p>'
+                    f'<p>Write to info@studio{pid}.example.com or call {place["phone"]}</p>'
+                    f'<p>Jane Doe - {rng.choice(TITLES)}</p>'
+                    f'<a href="/site/{pid}/about">About us</a> <a href="/site/{pid}/contact">Contact</a>'
+                    f'{self.data.filler(rng, config.page_kb * 1024)}')
+            return self.send_html(page(place["name"], body))
+
+        self.send_html(page("Not found", "<p>Not found</p>"), status=404)
+
+class FixtureServer:
+    """The Maps pages on 127.0.0.1 plus a listener per site address, all on one port."""
+    def __init__(self, config: FixtureConfig, port: int = 0):
+        self.servers = [ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)]
+        port = self.servers[0].server_address[1]
+        self.servers += [ThreadingHTTPServer((f"127.0.0.{2 + i}", port), FixtureHandler) for i in range(SITE_HOSTS)]
+        handler = type("BoundFixtureHandler", (FixtureHandler,), {"data": FixtureData(config, port)})
+        for server in self.servers:
+            server.daemon_threads = True
+            server.RequestHandlerClass = handler
+        self.server_address = self.servers[0].server_address
+
+    def serve_forever(self):
+        for server in self.servers[1:]:
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.servers[0].serve_forever()
+
+    def shutdown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+def make_server(config: FixtureConfig, port: int = 0) -> FixtureServer:
+    return FixtureServer(config, port)
+
+def start_in_background(config: FixtureConfig, port: int = 0):
+    """Starts the server on a daemon thread; returns (server, maps_base_url)."""
+    server = make_server(config, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/google.com/maps"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--results", type=int, default=60)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-kb", type=int, default=20)
+    args = parser.parse_args()
+    config = FixtureConfig(args.results, args.latency_ms, args.error_rate, args.page_kb)
+    server = make_server(config, args.port)
+    print(f"Serving fixtures, Maps base URL: http://127.0.0.1:{args.port}/google.com/maps")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
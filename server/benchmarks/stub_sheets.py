@@ -0,0 +1,114 @@
+"""In-memory stand-in for the gspread client, for offline benchmarks.
+
+Install it with install(sheets_service) and the real GoogleSheetsService,
+LeadSyncer and Sheets gateway run unchanged against it, so their cost is
+part of what gets measured. latency_ms simulates the API round-trip.
+"""
+import time
+import uuid
+import threading
+
+class StubWorksheet:
+    def __init__(self, spreadsheet, latency_ms: float):
+        self.spreadsheet = spreadsheet
+        self.latency_ms = latency_ms
+        self.rows = []
+        self.col_count = 26
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _round_trip(self):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def get_all_values(self):
+        self._round_trip()
+        with self.lock:
+            return [list(row) for row in self.rows]
+
+    def col_values(self, col: int):
+        self._round_trip()
+        with self.lock:
+            values = [row[col - 1] if col - 1 < len(row) else "" for row in self.rows]
+        # Like the API, trailing empty cells are left out
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def get(self, range_name: str):
+        # Only the "A<row>:<col>" form the incremental sync uses
+        self._round_trip()
+        start = int("".join(ch for ch in range_name.split(":")[0] if ch.isdigit()) or 1)
+        with self.lock:
+            return [list(row) for row in self.rows[start - 1:]]
+
+    def update(self, range_name: str, values: list):
+        self._round_trip()
+        with self.lock:
+            if range_name.startswith("A1"):
+                self.rows[:1] = [list(values[0])]
+            self.spreadsheet.touch()
+
+    def append_rows(self, rows: list):
+        self._round_trip()
+        with self.lock:
+            first = len(self.rows) + 1
+            self.rows.extend(list(row) for row in rows)
+            last = len(self.rows)
+            self.spreadsheet.touch()
+        return {"updates": {"updatedRange": f"Sheet1!A{first}:I{last}"}}
+
+    def batch_update(self, updates: list):
+        self._round_trip()
+        with self.lock:
+            for update in updates:
+                cell = update["range"]
+                col = ord(cell[0]) - ord("A")
+                row = int(cell[1:]) - 1
+                if row < len(self.rows):
+                    values = self.rows[row]
+                    values.extend([""] * (col + 1 - len(values)))
+                    values[col] = update["values"][0][0]
+            self.spreadsheet.touch()
+
+class StubSpreadsheet:
+    def __init__(self, title: str, latency_ms: float):
+        self.id = f"stub-{uuid.uuid4().hex[:8]}"
+        self.title = title
+        self.url = f"https://example.invalid/{self.id}"
+        self.revision = 0
+        self.sheet1 = StubWorksheet(self, latency_ms)
+
+    def touch(self):
+        self.revision += 1
+
+    def get_lastUpdateTime(self):
+        # Drive's modifiedTime, moved by every write
+        self.sheet1._round_trip()
+        return f"2026-01-01T00:00:00.{self.revision:06d}Z"
+
+class StubClient:
+    def __init__(self, latency_ms: float = 0):
+        self.latency_ms = latency_ms
+        self.sheets = {}
+
+    def open(self, title: str):
+        if title not in self.sheets:
+            import gspread
+            raise gspread.exceptions.SpreadsheetNotFound(title)
+        return self.sheets[title]
+
+    def open_by_key(self, key: str):
+        return next(sheet for sheet in self.sheets.values() if sheet.id == key)
+
+    def create(self, title: str):
+        self.sheets[title] = StubSpreadsheet(title, self.latency_ms)
+        return self.sheets[title]
+
+def install(sheets_service, latency_ms: float = 0) -> StubClient:
+    client = StubClient(latency_ms)
+    sheets_service.client = client
+    sheets_service.sheet_id = None
+    sheets_service.worksheet = None
+    return client
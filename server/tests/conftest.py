@@ -0,0 +1,93 @@
+import os
+import tempfile
+
+# The stores open their databases at import time, keep them out of the working directory
+_workdir = tempfile.mkdtemp(prefix="leadnest-tests-")
+os.environ.setdefault("LEADNEST_DB", os.path.join(_workdir, "leads.db"))
+os.environ.setdefault("LEADNEST_CACHE_DB", os.path.join(_workdir, "website_cache.db"))
+os.environ.setdefault("LEADNEST_CHECKPOINT_DB", os.path.join(_workdir, "checkpoints.db"))
+
+import re
+
+import pytest
+from gspread.utils import a1_to_rowcol
+
+from app.services.lead_store import LeadStore
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.id = "sheet-1"
+        self.url = "https://docs.google.com/spreadsheets/d/sheet-1"
+        self.revision = 0
+        self.drive_available = True
+
+    def get_lastUpdateTime(self):
+        if not self.drive_available:
+            raise RuntimeError("Drive API unavailable")
+        return f"2026-10-01T00:00:{self.revision:02d}Z"
+
+
+class FakeWorksheet:
+    """In-memory sheet1 with the gspread calls the sheets service makes."""
+    col_count = 10
+
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+        self.spreadsheet = FakeSpreadsheet()
+        self.calls = []
+
+    def edit(self, row: int, col: int, value: str):
+        # A change made by hand in the sheet, or by one of our writes
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        cells += [""] * (col - len(cells))
+        cells[col - 1] = value
+        self.spreadsheet.revision += 1
+
+    def get_all_values(self):
+        self.calls.append("get_all_values")
+        return [list(row) for row in self.rows]
+
+    def get(self, range_name):
+        self.calls.append("get")
+        first = int(re.match(r"A(\d+)", range_name).group(1))
+        return [list(row) for row in self.rows[first - 1:]]
+
+    def col_values(self, col):
+        self.calls.append("col_values")
+        values = [row[col - 1] if col - 1 < len(row) else "" for row in self.rows]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def update(self, range_name, values):
+        self.calls.append("update")
+        row, col = a1_to_rowcol(range_name.split(":")[0])
+        for r, cells in enumerate(values):
+            for c, value in enumerate(cells):
+                self.edit(row + r, col + c, value)
+
+    def append_rows(self, rows):
+        self.calls.append("append_rows")
+        first = len(self.rows) + 1
+        self.rows += [list(row) for row in rows]
+        self.spreadsheet.revision += 1
+        return {"updates": {"updatedRange": f"Sheet1!A{first}:J{len(self.rows)}"}}
+
+    def batch_update(self, updates):
+        self.calls.append("batch_update")
+        for update in updates:
+            row, col = a1_to_rowcol(update["range"])
+            self.edit(row, col, update["values"][0][0])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LeadStore(str(tmp_path / "leads.db"))
+
+
+@pytest.fixture
+def fake_worksheet():
+    return FakeWorksheet
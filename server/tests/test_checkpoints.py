@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.services.scraper import GMBScraper
+from app.services.scraper.checkpoints import CheckpointStore
+from app.services.scraper.http_fetcher import FetchedPage
+from app.services.scraper.website_cache import website_cache
+
+PARAMS = {"keywords": ["plumber"], "locations": ["Pune, India"], "relevance_keywords": []}
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    return CheckpointStore(str(tmp_path / "checkpoints.db"))
+
+
+def test_running_runs_are_never_resumed(checkpoints):
+    checkpoints.start_run(PARAMS, ["q1", "q2"])
+
+    assert checkpoints.claim_resumable(PARAMS) is None
+
+
+def test_stopped_run_is_claimed_once_with_its_progress(checkpoints):
+    run_id = checkpoints.start_run(PARAMS, ["q1", "q2"])
+    checkpoints.record_query(run_id, "q1")
+    checkpoints.record_place(run_id, "https://www.google.com/maps/place/a?hl=en", "added", 1)
+    checkpoints.finish_run(run_id, "stopped")
+
+    run = checkpoints.claim_resumable(PARAMS)
+
+    assert run["runId"] == run_id
+    assert run["status"] == "running"
+    assert run["queriesDone"] == ["q1"]
+    assert run["leadsUsed"] == 1
+    assert checkpoints.place_outcomes(run_id) == {"https://www.google.com/maps/place/a": "added"}
+    assert checkpoints.claim_resumable(PARAMS) is None
+
+
+def test_other_settings_do_not_resume_the_run(checkpoints):
+    run_id = checkpoints.start_run(PARAMS, ["q1"])
+    checkpoints.finish_run(run_id, "stopped")
+
+    assert checkpoints.claim_resumable(dict(PARAMS, keywords=["electrician"])) is None
+
+
+def test_runs_cut_off_by_a_shutdown_become_resumable(checkpoints):
+    run_id = checkpoints.start_run(PARAMS, ["q1"])
+
+    assert checkpoints.mark_interrupted() == 1
+    assert checkpoints.get_run(run_id)["status"] == "interrupted"
+    assert checkpoints.claim_resumable(PARAMS)["runId"] == run_id
+
+
+def test_prune_drops_only_old_completed_runs(checkpoints):
+    old = checkpoints.start_run(PARAMS, ["q1"])
+    checkpoints.record_query(old, "q1")
+    checkpoints.finish_run(old, "completed")
+    recent = checkpoints.start_run(PARAMS, ["q1"])
+    checkpoints.finish_run(recent, "completed")
+    stopped = checkpoints.start_run(PARAMS, ["q1"])
+    checkpoints.finish_run(stopped, "stopped")
+    with checkpoints.conn:
+        checkpoints.conn.execute("UPDATE runs SET updated_at = 0 WHERE run_id IN (?, ?)", (old, stopped))
+
+    assert checkpoints.prune(retention_days=7) == 1
+    assert checkpoints.get_run(old) is None
+    assert checkpoints.conn.execute("SELECT COUNT(*) FROM run_queries WHERE run_id = ?", (old,)).fetchone()[0] == 0
+    assert checkpoints.get_run(recent) and checkpoints.get_run(stopped)
+
+
+class StoppingFetcher:
+    """Returns a relevant page, but the run is stopped while it loads."""
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    async def fetch(self, url):
+        self.scraper.stop()
+        html = "<html><body><p>" + "plumbing repairs " * 40 + "mail@example.com</p></body></html>"
+        return FetchedPage(url, 200, html, "text/html")
+
+
+def make_scraper(checkpoints, monkeypatch):
+    import app.services.scraper as scraper_module
+    monkeypatch.setattr(scraper_module, "checkpoint_store", checkpoints)
+    scraper = GMBScraper("plumber", "plumbing", "Pune", "India", 5, pacing=False)
+    scraper.run_id = checkpoints.start_run(scraper.checkpoint_params(), ["plumber in Pune, India"])
+    return scraper
+
+
+def test_stop_does_not_settle_places_as_low_relevance(checkpoints, monkeypatch):
+    scraper = make_scraper(checkpoints, monkeypatch)
+    scraper.stop()
+    lead = {"name": "Alpha", "phone": "", "email": "", "website": "https://alpha.example", "maps_url": "https://www.google.com/maps/place/alpha"}
+
+    assert not asyncio.run(scraper.save_lead(lead, scraper.empty_deep_scrape_result()))
+
+    assert checkpoints.place_outcomes(scraper.run_id) == {}
+    assert scraper.stats["low_relevance"] == 0
+
+
+def test_deep_scrape_cut_short_by_a_stop_is_not_cached(checkpoints, monkeypatch):
+    scraper = make_scraper(checkpoints, monkeypatch)
+    scraper.http_fetcher = StoppingFetcher(scraper)
+    url = "https://stopped-mid-scrape.example/"
+
+    asyncio.run(scraper.deep_scrape_website(None, url))
+
+    assert website_cache.get(url, 3600) is None
+    assert checkpoints.site_result(scraper.run_id, url) is None
@@ -0,0 +1,62 @@
+import io
+import csv
+import json
+
+import pytest
+
+import app.services.lead_export as lead_export
+from app.services.lead_export import EXPORT_FIELDS, export_leads
+
+
+@pytest.fixture
+def leads(store, monkeypatch):
+    monkeypatch.setattr(lead_export, "lead_store", store)
+    monkeypatch.setattr(lead_export, "BATCH_SIZE", 3)
+    for i in range(7):
+        store.add_lead("sheet-1", {
+            "name": f"Studio {i}", "phone": f"98765432{i:02d}", "status": "Sent" if i % 2 else "New",
+            "query": "dance 100% fun" if i < 2 else "yoga in Pune", "scraped_at": f"2026-01-0{i + 1}T00:00:00+00:00",
+        })
+    store.add_lead("sheet-2", {"name": "Elsewhere", "phone": "9000000001"})
+    return store
+
+
+def test_csv_streams_one_chunk_per_batch(leads):
+    chunks = list(export_leads("sheet-1", "csv"))
+
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert list(rows[0]) == EXPORT_FIELDS
+    assert [row["name"] for row in rows] == [f"Studio {i}" for i in range(7)]
+    assert rows[0]["scraped_at"] == "2026-01-01T00:00:00+00:00"
+
+
+def test_jsonl_filters_on_status_query_and_scrape_time(leads):
+    records = [json.loads(line) for chunk in export_leads(
+        "sheet-1", "jsonl", query="Pune", statuses=[" sent "], since=1767225600 + 86400, until=1767225600 + 5 * 86400
+    ) for line in chunk.decode("utf-8").splitlines()]
+
+    # 2026-01-02 .. 2026-01-05, odd ones were Sent, and the first two were other queries
+    assert [record["name"] for record in records] == ["Studio 3"]
+
+
+def test_query_is_matched_literally(leads):
+    records = b"".join(export_leads("sheet-1", "jsonl", query="100%")).decode("utf-8").splitlines()
+
+    assert [json.loads(line)["name"] for line in records] == ["Studio 0", "Studio 1"]
+
+
+def test_parquet_round_trips_in_row_groups(leads):
+    parquet = pytest.importorskip("pyarrow.parquet")
+
+    data = b"".join(export_leads("sheet-1", "parquet"))
+
+    table = parquet.ParquetFile(io.BytesIO(data))
+    assert table.metadata.num_row_groups == 3
+    assert table.schema_arrow.names == EXPORT_FIELDS
+    assert table.read().column("name").to_pylist() == [f"Studio {i}" for i in range(7)]
+
+
+def test_unknown_format_is_rejected(leads):
+    with pytest.raises(ValueError):
+        export_leads("sheet-1", "xlsx")
@@ -0,0 +1,112 @@
+def lead(name, phone, status="New", **extra):
+    return {"name": name, "phone": phone, "status": status, **extra}
+
+
+def leads_by_name(store, sheet_id="sheet-1"):
+    return {row["name"]: row for row in store.conn.execute("SELECT * FROM leads WHERE sheet_id = ?", (sheet_id,))}
+
+
+def test_import_keeps_ids_and_deletes_rows_gone_from_the_sheet(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210")), (3, lead("Beta", "9123456780"))])
+    before = leads_by_name(store)
+
+    # Beta moved up, Alpha was deleted, Gamma was added by hand
+    store.import_sheet("sheet-1", [(2, lead("Beta", "9123456780", "Replied")), (3, lead("Gamma", "9988776655"))])
+    after = leads_by_name(store)
+
+    assert set(after) == {"Beta", "Gamma"}
+    assert after["Beta"]["id"] == before["Beta"]["id"]
+    assert after["Beta"]["sheet_row"] == 2
+    assert after["Beta"]["status"] == "Replied"
+    assert after["Gamma"]["sheet_row"] == 3
+
+
+def test_import_matches_on_phone_and_takes_edits_from_the_sheet(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210"))])
+    original = leads_by_name(store)["Alpha"]
+
+    store.import_sheet("sheet-1", [(2, lead("Alpha Plumbing", "+91 98765 43210"))])
+    renamed = leads_by_name(store)["Alpha Plumbing"]
+
+    assert renamed["id"] == original["id"]
+    assert renamed["phone"] == "+91 98765 43210"
+
+
+def test_import_keeps_unsynced_status_but_refreshes_its_row(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210")), (3, lead("Beta", "9123456780"))])
+    beta = leads_by_name(store)["Beta"]
+    store.update_status(beta["id"], "Sent")
+
+    store.import_sheet("sheet-1", [(2, lead("Beta", "9123456780", "New"))])
+    after = leads_by_name(store)["Beta"]
+
+    assert after["id"] == beta["id"]
+    assert after["status"] == "Sent"
+    assert after["sheet_row"] == 2
+    assert after["version"] > after["synced_version"]
+
+
+def test_import_keeps_leads_waiting_to_be_appended(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210"))])
+    assert store.add_lead("sheet-1", lead("Beta", "9123456780"))
+
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210"))])
+
+    assert [row["name"] for row in store.unappended_leads("sheet-1")] == ["Beta"]
+
+
+def test_import_adopts_a_lead_that_was_appended_but_never_marked(store):
+    # e.g. the process died between append_rows and mark_appended
+    assert store.add_lead("sheet-1", lead("Alpha", "9876543210"))
+
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210"))])
+
+    assert store.unappended_leads("sheet-1") == []
+    assert store.count_leads("sheet-1") == 1
+
+
+def test_duplicate_rows_in_the_sheet_map_to_one_lead(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210")), (3, lead("Alpha", "9876543210"))])
+
+    assert store.count_leads("sheet-1") == 1
+    assert leads_by_name(store)["Alpha"]["sheet_row"] == 2
+
+
+def test_append_sheet_rows_upserts_and_records_the_tail(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210"))], row_count=2, tail_hash="a")
+    alpha = leads_by_name(store)["Alpha"]
+
+    store.append_sheet_rows("sheet-1", [(3, lead("Beta", "9123456780")), (4, lead("Alpha", "9876543210"))], 4, "b")
+
+    assert leads_by_name(store)["Alpha"]["id"] == alpha["id"]
+    assert store.count_leads("sheet-1") == 2
+    state = store.sheet_state("sheet-1")
+    assert (state["row_count"], state["tail_hash"]) == (4, "b")
+
+
+def test_add_lead_dedups_on_the_normalized_phone(store):
+    assert store.add_lead("sheet-1", lead("Alpha", "9876543210"))
+    assert not store.add_lead("sheet-1", lead("Alpha Again", "+91 98765-43210"))
+    assert store.add_lead("sheet-2", lead("Alpha", "9876543210"))
+
+
+def test_refresh_statuses_skips_rows_with_unsynced_changes(store):
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210")), (3, lead("Beta", "9123456780"))])
+    store.update_status(leads_by_name(store)["Beta"]["id"], "Sent")
+
+    refreshed = store.refresh_statuses("sheet-1", {2: "Do Not Contact", 3: "New"})
+
+    after = leads_by_name(store)
+    assert refreshed == 1
+    assert after["Alpha"]["status"] == "Do Not Contact"
+    assert after["Beta"]["status"] == "Sent"
+
+
+def test_export_window_uses_the_scrape_time_from_the_sheet(store):
+    # 2026-01-02T03:04:05Z, long before the import itself
+    store.import_sheet("sheet-1", [(2, lead("Alpha", "9876543210", scraped_at="2026-01-02T03:04:05+00:00"))])
+
+    [batch] = list(store.iter_leads("sheet-1", since=1767323000, until=1767324000))
+
+    assert [row["name"] for row in batch] == ["Alpha"]
+    assert list(store.iter_leads("sheet-1", since=1767324000)) == []
@@ -0,0 +1,133 @@
+import pytest
+
+import app.services.google_sheets as google_sheets
+from app.services.google_sheets import GoogleSheetsService, HEADERS
+from app.services.google_sheets.gateway import SheetsGateway
+
+
+@pytest.fixture
+def sheets(store, fake_worksheet, monkeypatch):
+    """A sheets service on a fresh store, connected to a fake sheet with two leads."""
+    monkeypatch.setattr(google_sheets, "lead_store", store)
+    monkeypatch.setattr(google_sheets, "sheets_gateway", SheetsGateway(per_minute=100_000))
+    worksheet = fake_worksheet([HEADERS, ["Alpha", "9876543210", "", "New"], ["Beta", "9123456780", "", "New"]])
+    service = GoogleSheetsService()
+    service.client = object()
+    service.sheet_id = worksheet.spreadsheet.id
+    service.worksheet = worksheet
+    service.import_sheet(service.sheet_id, worksheet)
+    worksheet.calls.clear()
+    return service, worksheet, store
+
+
+def statuses(store):
+    return {row["name"]: row["status"] for row in store.conn.execute("SELECT name, status FROM leads")}
+
+
+def test_unchanged_sheet_is_not_read(sheets):
+    service, worksheet, _ = sheets
+
+    assert service.sync_new_rows(service.sheet_id, worksheet)
+    assert worksheet.calls == []
+
+
+def test_flush_appends_new_leads_and_pushes_statuses(sheets):
+    service, worksheet, store = sheets
+    assert service.append_lead({"name": "Gamma", "phone": "9988776655"})
+    alpha = store.conn.execute("SELECT id FROM leads WHERE name = 'Alpha'").fetchone()["id"]
+    service.update_status(alpha, "Sent")
+
+    assert service.flush_leads() == 2
+
+    assert worksheet.calls.count("append_rows") == 1
+    assert worksheet.calls.count("batch_update") == 1
+    assert worksheet.rows[1][3] == "Sent"
+    assert worksheet.rows[3][:2] == ["Gamma", "9988776655"]
+    assert store.pending_count(service.sheet_id) == 0
+
+
+def test_status_of_a_lead_appended_at_an_unknown_row_is_not_lost(sheets, monkeypatch):
+    service, worksheet, store = sheets
+    append_rows = worksheet.append_rows
+    monkeypatch.setattr(worksheet, "append_rows", lambda rows: append_rows(rows) and {})
+    service.append_lead({"name": "Gamma", "phone": "9988776655"})
+    service.flush_leads()
+    gamma = store.conn.execute("SELECT id FROM leads WHERE name = 'Gamma'").fetchone()["id"]
+    service.update_status(gamma, "Sent")
+
+    service.flush_leads()
+
+    assert worksheet.rows[3][:4] == ["Gamma", "9988776655", "", "Sent"]
+    assert store.pending_count(service.sheet_id) == 0
+
+
+def test_our_own_writes_do_not_force_a_reimport(sheets):
+    service, worksheet, _ = sheets
+    service.append_lead({"name": "Gamma", "phone": "9988776655"})
+    service.flush_leads()
+    worksheet.calls.clear()
+
+    assert service.sync_new_rows(service.sheet_id, worksheet)
+    assert worksheet.calls == []
+
+
+def test_edit_in_the_middle_of_the_sheet_forces_a_reimport(sheets):
+    service, worksheet, store = sheets
+    worksheet.edit(2, 4, "Do Not Contact")
+    worksheet.edit(3, 1, "Beta Plumbing")
+
+    assert not service.sync_new_rows(service.sheet_id, worksheet)
+    service.import_sheet(service.sheet_id, worksheet)
+
+    assert statuses(store) == {"Alpha": "Do Not Contact", "Beta Plumbing": "New"}
+
+
+def test_status_edited_by_hand_is_taken_without_a_full_read(sheets):
+    service, worksheet, store = sheets
+    worksheet.edit(2, 4, "Do Not Contact")
+
+    assert service.sync_new_rows(service.sheet_id, worksheet)
+    assert "get_all_values" not in worksheet.calls
+    assert statuses(store) == {"Alpha": "Do Not Contact", "Beta": "New"}
+
+    worksheet.calls.clear()
+    assert service.sync_new_rows(service.sheet_id, worksheet)
+    assert worksheet.calls == []
+
+
+def test_without_drive_metadata_new_rows_and_status_edits_are_read(sheets):
+    service, worksheet, store = sheets
+    worksheet.spreadsheet.drive_available = False
+    worksheet.edit(2, 4, "Do Not Contact")
+    worksheet.rows.append(["Gamma", "9988776655", "", "New"])
+
+    assert service.sync_new_rows(service.sheet_id, worksheet)
+
+    assert "get_all_values" not in worksheet.calls
+    assert statuses(store) == {"Alpha": "Do Not Contact", "Beta": "New", "Gamma": "New"}
+
+
+def test_lead_count_counts_sheet_rows_and_unappended_leads(sheets):
+    service, worksheet, _ = sheets
+    worksheet.rows.append(["Added By Hand", "9000000001"])
+    service.append_lead({"name": "Gamma", "phone": "9988776655"})
+
+    # Seeded from the local store without waiting on the sheet
+    assert service.get_lead_count() == 3
+    service.count_thread.join()
+
+    assert service.get_lead_count() == 4
+    assert "get_all_values" not in worksheet.calls
+
+
+def test_lead_count_before_a_sheet_is_opened_does_not_adopt_it(sheets):
+    service, worksheet, _ = sheets
+    worksheet.spreadsheet.sheet1 = worksheet
+    service.client = type("Client", (), {"open": lambda self, name: worksheet.spreadsheet})()
+    service.sheet_id = None
+
+    assert service.get_lead_count() == 0
+    service.count_thread.join()
+
+    assert service.get_lead_count() == 2
+    assert service.sheet_id is None
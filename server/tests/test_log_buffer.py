@@ -0,0 +1,72 @@
+import asyncio
+
+from app.core.log_buffer import LogBuffer, log_payload, sse_events
+
+
+def filled(count, maxlen=2000):
+    buffer = LogBuffer(maxlen)
+    for i in range(1, count + 1):
+        buffer.append(f"line {i}")
+    return buffer
+
+
+def test_since_returns_only_newer_lines():
+    buffer = filled(3)
+
+    assert buffer.since(1) == [(2, "line 2"), (3, "line 3")]
+    assert buffer.since(3) == []
+
+
+def test_clear_keeps_cursors_valid():
+    buffer = filled(3)
+    buffer.clear()
+
+    assert buffer.append("line 4") == 4
+    assert log_payload(buffer, since=3) == {"logs": ["line 4"], "seq": 4, "truncated": False}
+
+
+def test_payload_without_a_cursor_returns_every_line():
+    assert log_payload(filled(2)) == {"logs": ["line 1", "line 2"], "seq": 2}
+
+
+def test_payload_flags_lines_evicted_from_the_ring():
+    buffer = filled(5, maxlen=3)
+
+    assert log_payload(buffer, since=1) == {"logs": ["line 3", "line 4", "line 5"], "seq": 5, "truncated": True}
+    assert log_payload(buffer, since=2)["truncated"] is False
+
+
+def test_cursor_from_before_a_restart_starts_over():
+    payload = log_payload(filled(2), since=10)
+
+    assert payload["logs"] == ["line 1", "line 2"]
+    assert payload["seq"] == 2
+
+
+def test_sse_events_carry_the_sequence_as_id():
+    buffer = filled(2)
+
+    async def first_event():
+        events = sse_events(buffer, since=1)
+        try:
+            return await events.__anext__()
+        finally:
+            await events.aclose()
+
+    assert asyncio.run(first_event()) == "id: 2\ndata: line 2\n\n"
+
+
+def test_stream_wakes_up_on_a_line_appended_from_another_thread():
+    buffer = LogBuffer()
+
+    async def next_line():
+        stream = buffer.stream(since=0, keepalive=5)
+        try:
+            pending = asyncio.ensure_future(stream.__anext__())
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(buffer.append, "hello")
+            return await asyncio.wait_for(pending, timeout=2)
+        finally:
+            await stream.aclose()
+
+    assert asyncio.run(next_line()) == (1, "hello")
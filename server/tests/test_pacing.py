@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+from app.core.pacing import (
+    HostPacer, StopSignal, TokenBucket, HostPolicy, GOOGLE_POLICY, SITE_POLICY, SPEEDUP_AFTER, host_key
+)
+
+POLICY = HostPolicy(rate=2.0, burst=2, min_rate=0.1, max_rate=3.0)
+
+
+def test_google_hosts_share_one_bucket():
+    assert host_key("https://www.google.com/maps/search/x") == "google"
+    assert host_key("https://maps.google.co.in/place/y") == "google"
+    assert host_key("https://www.Example.com/contact") == "example.com"
+
+
+def test_burst_is_free_then_requests_wait_for_the_rate():
+    bucket = TokenBucket(POLICY)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert 0.45 < bucket.reserve() <= 0.5
+
+
+def test_backoff_halves_the_rate_and_drops_the_burst():
+    bucket = TokenBucket(POLICY)
+
+    bucket.backoff()
+
+    assert bucket.rate == 1.0
+    assert bucket.backoffs == 1
+    assert 0.95 < bucket.reserve() <= 1.0
+
+
+def test_backoff_never_goes_below_the_minimum_rate():
+    bucket = TokenBucket(POLICY)
+    for _ in range(20):
+        bucket.backoff()
+
+    assert bucket.rate == POLICY.min_rate
+
+
+def test_clean_streak_raises_the_rate_up_to_the_maximum():
+    bucket = TokenBucket(POLICY)
+    for _ in range(SPEEDUP_AFTER - 1):
+        bucket.success()
+    assert bucket.rate == POLICY.rate
+
+    bucket.success()
+    assert bucket.rate == POLICY.rate * 1.1
+
+    for _ in range(SPEEDUP_AFTER * 20):
+        bucket.success()
+    assert bucket.rate == POLICY.max_rate
+
+
+def test_a_failure_resets_the_clean_streak():
+    bucket = TokenBucket(POLICY)
+    for _ in range(SPEEDUP_AFTER - 1):
+        bucket.success()
+    bucket.backoff()
+    bucket.success()
+
+    assert bucket.rate == POLICY.rate / 2
+
+
+def test_pacer_backs_off_per_host():
+    pacer = HostPacer(StopSignal())
+
+    pacer.report("https://www.google.com/maps", ok=False)
+    pacer.report("https://example.com/", ok=True)
+
+    assert pacer.bucket("https://maps.google.com/").rate == GOOGLE_POLICY.rate / 2
+    assert pacer.bucket("https://example.com/about").rate == SITE_POLICY.rate
+    assert pacer.backoffs == 1
+
+
+def test_stop_interrupts_a_paced_wait():
+    stop = StopSignal()
+    pacer = HostPacer(stop)
+    bucket = pacer.bucket("https://example.com/")
+    bucket.backoff()
+    bucket.tokens = -10 # Several seconds until the next slot
+
+    async def wait_and_stop():
+        waiting = asyncio.ensure_future(pacer.wait("https://example.com/"))
+        await asyncio.sleep(0.05)
+        stop.set()
+        return await waiting
+
+    started = time.monotonic()
+    assert asyncio.run(wait_and_stop()) is False
+    assert time.monotonic() - started < 1
+
+
+def test_disabled_pacer_never_waits():
+    pacer = HostPacer(StopSignal(), enabled=False)
+
+    assert asyncio.run(pacer.wait("https://www.google.com/maps"))
+    assert pacer.spacing("https://www.google.com/maps") == (0.0, 0.0)
+    assert pacer.buckets == {}
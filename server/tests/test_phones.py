@@ -0,0 +1,57 @@
+import pytest
+
+import app.services.phones as phones
+from app.services.phones import normalize_phone, phone_key, prepare_send_list
+
+
+@pytest.fixture
+def fallback(monkeypatch):
+    # The built-in table, as used when phonenumbers isn't installed
+    monkeypatch.setattr(phones, "phonenumbers", None)
+
+
+@pytest.mark.parametrize("raw", ["9876543210", "098765 43210", "+91 98765-43210", "919876543210", "0091 9876543210"])
+def test_written_forms_of_one_indian_number_agree(raw):
+    assert normalize_phone(raw, "IN") == "+919876543210"
+
+
+@pytest.mark.parametrize("raw, region, expected", [
+    ("(415) 555-2671", "US", "+14155552671"),
+    ("020 7946 0958", "GB", "+442079460958"),
+    ("0412 345 678", "AU", "+61412345678"),
+    ("+65 6123 4567", "IN", "+6561234567"),
+])
+def test_fallback_uses_the_region_for_national_numbers(fallback, raw, region, expected):
+    assert normalize_phone(raw, region) == expected
+
+
+@pytest.mark.parametrize("raw, region", [
+    ("", "IN"),
+    ("N/A", "IN"),
+    ("98765", "IN"),
+    ("98765432101", "IN"),
+    ("12345678", "XX"),
+])
+def test_fallback_rejects_what_it_cannot_place(fallback, raw, region):
+    assert normalize_phone(raw, region) == ""
+
+
+def test_phone_key_keeps_the_digits_of_numbers_it_cannot_validate(fallback):
+    assert phone_key("+91 98765 43210") == phone_key("098765-43210") == "+919876543210"
+    assert phone_key("ext. 12-34") == "1234"
+
+
+def test_prepare_send_list_splits_invalid_duplicate_and_contacted(fallback):
+    leads = [
+        {"id": 1, "phone": "9876543210"},
+        {"id": 2, "phone": "+91 98765 43210"},
+        {"id": 3, "phone": "123"},
+        {"id": 4, "phone": "9123456780"},
+        {"id": 5, "phone": "9988776655"},
+    ]
+
+    send, invalid, duplicates = prepare_send_list(leads, "IN", contacted={"+919988776655"})
+
+    assert [(lead["id"], e164) for lead, e164 in send] == [(1, "+919876543210"), (4, "+919123456780")]
+    assert [lead["id"] for lead in invalid] == [3]
+    assert [lead["id"] for lead in duplicates] == [2, 5]
@@ -0,0 +1,130 @@
+import pytest
+
+import app.services.scraper.shards as shards
+from app.services.scraper.shards import ShardQueue, MAX_ATTEMPTS, split_queries
+
+PARAMS = {"keywords": "plumber", "relevanceKeywords": "", "city": "Pune", "country": "India", "limit": 2}
+
+
+@pytest.fixture
+def queue(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(shards, "lead_store", store)
+    return ShardQueue(str(tmp_path / "checkpoints.db"))
+
+
+def test_split_queries():
+    assert split_queries(["a", "b", "c"], 2) == [["a", "b"], ["c"]]
+    assert split_queries(["a"], 0) == [["a"]]
+
+
+def test_claims_each_shard_once_and_completes_the_run(queue):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1", "q2", "q3"], shard_size=2)
+
+    first = queue.claim(run_id, "w1")
+    second = queue.claim(run_id, "w2")
+    assert first["queries"] == ["q1", "q2"]
+    assert second["queries"] == ["q3"]
+    assert queue.claim(run_id, "w3") is None
+
+    queue.complete(first["shardId"], "w1")
+    queue.complete(second["shardId"], "w2")
+    assert queue.claim(run_id, "w1") is None
+    assert queue.run_status(run_id)["status"] == "completed"
+
+
+def test_failed_shard_is_retried_until_it_runs_out_of_attempts(queue):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1"], shard_size=1)
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        shard = queue.claim(run_id, "w1")
+        assert shard["attempt"] == attempt
+        queue.complete(shard["shardId"], "w1", error="browser crashed")
+
+    assert queue.claim(run_id, "w1") is None
+    status = queue.run_status(run_id)
+    assert status["status"] == "failed"
+    assert status["shardCounts"] == {"failed": 1}
+
+
+def test_expired_lease_goes_to_the_next_worker(queue):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1"], shard_size=1)
+    abandoned = queue.claim(run_id, "w1", lease_seconds=-1)
+
+    taken_over = queue.claim(run_id, "w2")
+
+    assert taken_over["shardId"] == abandoned["shardId"]
+    assert taken_over["attempt"] == 2
+    # The first worker's late completion no longer counts
+    queue.complete(abandoned["shardId"], "w1")
+    assert queue.run_status(run_id)["shards"][0]["status"] == "leased"
+
+
+def test_heartbeat_renews_the_lease_and_reports_a_stop(queue):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1", "q2"], shard_size=1)
+    shard = queue.claim(run_id, "w1", lease_seconds=-1)
+
+    assert queue.heartbeat(shard["shardId"], "w1") == "running"
+    assert queue.claim(run_id, "w2")["shardId"] != shard["shardId"]
+
+    assert queue.stop_run(run_id)
+    assert queue.heartbeat(shard["shardId"], "w1") == "stopped"
+    assert queue.claim(run_id, "w3") is None
+
+
+def test_add_lead_dedups_across_workers_and_stops_at_the_limit(queue, store):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1", "q2"], shard_size=1)
+    first = queue.claim(run_id, "w1")
+    second = queue.claim(run_id, "w2")
+
+    assert queue.add_lead(first["shardId"], {"name": "Alpha", "phone": "9876543210"}) == "added"
+    assert queue.add_lead(second["shardId"], {"name": "Alpha", "phone": "+91 98765 43210"}) == "duplicate"
+    assert queue.add_lead(second["shardId"], {"name": "Beta", "phone": "9123456780"}) == "added"
+    assert queue.add_lead(first["shardId"], {"name": "Gamma", "phone": "9988776655"}) == "limit"
+
+    assert store.count_leads("sheet-1") == 2
+    assert queue.run_status(run_id)["leadsAdded"] == 2
+    assert queue.claim(run_id, "w1") is None
+    assert queue.run_status(run_id)["status"] == "completed"
+
+
+def test_two_queues_on_one_file_never_lease_the_same_shard(queue, tmp_path):
+    other = ShardQueue(str(tmp_path / "checkpoints.db"))
+    run_id = queue.create_run(PARAMS, "sheet-1", [f"q{i}" for i in range(6)], shard_size=1)
+
+    claimed = []
+    for worker in range(6):
+        shard = (queue if worker % 2 else other).claim(run_id, f"w{worker}")
+        claimed.append(shard["shardId"])
+
+    assert len(set(claimed)) == 6
+    assert queue.claim(run_id, "w9") is None
+
+
+def test_retry_after_a_crash_before_the_insert_stays_within_the_limit(queue, store, monkeypatch):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1", "q2"], shard_size=1)
+    shard = queue.claim(run_id, "w1")
+
+    def crash(*args):
+        raise RuntimeError("worker died")
+    with monkeypatch.context() as patch, pytest.raises(RuntimeError):
+        patch.setattr(store, "add_lead", crash)
+        queue.add_lead(shard["shardId"], {"name": "Alpha", "phone": "9876543210"})
+
+    # The same shard meets the lead again on its retry
+    assert queue.add_lead(shard["shardId"], {"name": "Alpha", "phone": "9876543210"}) == "added"
+    assert queue.add_lead(shard["shardId"], {"name": "Alpha", "phone": "9876543210"}) == "duplicate"
+    assert queue.add_lead(shard["shardId"], {"name": "Beta", "phone": "9123456780"}) == "added"
+    assert queue.add_lead(shard["shardId"], {"name": "Gamma", "phone": "9988776655"}) == "limit"
+
+    assert store.count_leads("sheet-1") == 2
+    assert queue.run_status(run_id)["leadsAdded"] == 2
+
+
+def test_lead_already_in_the_store_does_not_use_up_the_limit(queue, store):
+    run_id = queue.create_run(PARAMS, "sheet-1", ["q1"], shard_size=1)
+    shard = queue.claim(run_id, "w1")
+    store.add_lead("sheet-1", {"name": "Alpha", "phone": "9876543210"})
+
+    assert queue.add_lead(shard["shardId"], {"name": "Alpha", "phone": "9876543210"}) == "duplicate"
+
+    assert queue.run_status(run_id)["leadsAdded"] == 0
@@ -0,0 +1,100 @@
+import json
+import threading
+
+import gspread
+import pytest
+import requests
+
+import app.services.google_sheets.gateway as gateway
+from app.services.google_sheets.gateway import SheetsGateway, INTERACTIVE, BULK, MAX_BACKOFF
+
+
+def api_error(status: int) -> gspread.exceptions.APIError:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": "x", "status": "x"}}).encode()
+    return gspread.exceptions.APIError(response)
+
+
+class Flaky:
+    """Raises the given errors in turn, then returns 'ok'."""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(gateway.time, "sleep", delays.append)
+    return delays
+
+
+def test_rate_limits_and_server_errors_are_retried(sleeps):
+    sheets = SheetsGateway(per_minute=100_000)
+    fn = Flaky(api_error(429), api_error(503), requests.exceptions.ConnectionError())
+
+    assert sheets.call("get", fn, priority=INTERACTIVE) == "ok"
+
+    assert fn.calls == 4
+    stats = sheets.stats["get"]
+    assert (stats.retries, stats.rate_limited, stats.errors) == (3, 1, 0)
+    # Exponential backoff with up to a second of jitter
+    assert [int(delay) for delay in sleeps] == [1, 2, 4]
+
+
+def test_client_errors_are_not_retried(sleeps):
+    sheets = SheetsGateway(per_minute=100_000)
+    fn = Flaky(api_error(400))
+
+    with pytest.raises(gspread.exceptions.APIError):
+        sheets.call("update", fn)
+
+    assert fn.calls == 1
+    assert sleeps == []
+    assert sheets.stats["update"].errors == 1
+
+
+def test_gives_up_after_max_retries_with_capped_backoff(sleeps):
+    sheets = SheetsGateway(per_minute=100_000, max_retries=7)
+    fn = Flaky(*[api_error(500) for _ in range(8)])
+
+    with pytest.raises(gspread.exceptions.APIError):
+        sheets.call("append_rows", fn)
+
+    assert fn.calls == 8
+    assert max(sleeps) <= MAX_BACKOFF + 1
+    assert int(sleeps[-1]) == MAX_BACKOFF
+
+
+def test_rate_limit_empties_the_bucket_for_everyone(sleeps):
+    sheets = SheetsGateway(per_minute=100_000)
+
+    sheets.call("get", Flaky(api_error(429)), priority=INTERACTIVE)
+
+    # Only what refilled while the retry waited is left
+    assert sheets.snapshot()["tokens"] < 100
+
+
+def test_bulk_calls_leave_the_reserve_to_interactive_ones():
+    sheets = SheetsGateway(per_minute=60)
+    sheets.tokens = 5 # Below the bulk floor of 20% of 60
+    done = []
+    bulk = threading.Thread(target=lambda: done.append(sheets.call("get_all_values", lambda: "bulk", priority=BULK)))
+    bulk.start()
+
+    bulk.join(timeout=0.2)
+    assert bulk.is_alive()
+    assert sheets.call("open", lambda: "interactive", priority=INTERACTIVE) == "interactive"
+
+    with sheets.cond:
+        sheets.tokens = 60
+        sheets.cond.notify_all()
+    bulk.join(timeout=2)
+    assert done == ["bulk"]
@@ -0,0 +1,50 @@
+from app.services.scraper.text_analysis import TextAnalyzer, MAX_DECISION_MAKER_LINE
+
+
+def test_relevance_matches_whole_words_case_insensitively():
+    analyzer = TextAnalyzer(["Dance", " yoga "], [])
+
+    assert analyzer.is_relevant("Ballet and DANCE classes")
+    assert analyzer.is_relevant("Morning yoga.")
+    assert not analyzer.is_relevant("Guidance counselling")
+    assert not analyzer.is_relevant("")
+
+
+def test_without_keywords_everything_is_relevant():
+    analyzer = TextAnalyzer(["", "  "], [])
+
+    assert analyzer.is_relevant("anything")
+    assert analyzer.matched_keywords("anything") == set()
+
+
+def test_longer_keyword_wins_at_the_same_position():
+    analyzer = TextAnalyzer(["art", "art school"], [])
+
+    assert analyzer.matched_keywords("The Art School and art classes") == {"art school", "art"}
+    assert analyzer.matched_keywords("Visit our art school") == {"art school"}
+
+
+def test_keywords_are_regex_escaped():
+    analyzer = TextAnalyzer(["st. john"], [])
+
+    assert analyzer.is_relevant("St. John Dance Academy")
+    assert not analyzer.is_relevant("Stx John Dance Academy")
+
+
+def test_decision_makers_are_short_lines_with_a_title():
+    analyzer = TextAnalyzer([], ["Director", "Principal"])
+    text = "About us\nJane Doe, Director\n" + "Our director " + "x" * MAX_DECISION_MAKER_LINE + "\nJohn Roe - Principal & Director"
+
+    assert analyzer.find_decision_makers(text) == {
+        "Jane Doe, Director": {"director"},
+        "John Roe - Principal & Director": {"director", "principal"},
+    }
+
+
+def test_text_whose_length_changes_when_lowercased_is_read_line_by_line():
+    analyzer = TextAnalyzer([], ["director"])
+    # "İ" lowercases to two characters, so offsets into the lowered copy drift
+    text = "İstanbul office\nAyşe Demir, Director"
+
+    assert analyzer.find_decision_makers(text) == {"Ayşe Demir, Director": {"director"}}
+    assert analyzer.find_decision_makers("") == {}
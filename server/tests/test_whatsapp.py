@@ -0,0 +1,42 @@
+import pytest
+
+import app.services.google_sheets as google_sheets
+import app.services.whatsapp as whatsapp
+from app.services.google_sheets import GoogleSheetsService, HEADERS
+from app.services.google_sheets.gateway import SheetsGateway
+from app.services.whatsapp import WhatsAppService
+
+
+class FakeClient:
+    def __init__(self, worksheet):
+        worksheet.spreadsheet.sheet1 = worksheet
+        self.spreadsheet = worksheet.spreadsheet
+
+    def open(self, name):
+        return self.spreadsheet
+
+
+@pytest.fixture
+def sheets(store, fake_worksheet, monkeypatch):
+    monkeypatch.setattr(google_sheets, "lead_store", store)
+    monkeypatch.setattr(google_sheets, "sheets_gateway", SheetsGateway(per_minute=100_000))
+    monkeypatch.setattr(whatsapp, "lead_store", store)
+    worksheet = fake_worksheet([HEADERS, ["Alpha", "9876543210", "", "New"]])
+    service = GoogleSheetsService()
+    service.client = FakeClient(worksheet)
+    service.create_or_get_sheet()
+    monkeypatch.setattr(whatsapp, "sheets_service", service)
+
+    def no_browser():
+        raise AssertionError("nothing should be messaged")
+    monkeypatch.setattr(whatsapp, "sync_playwright", no_browser)
+    return service, worksheet
+
+
+def test_sheet_edits_are_read_before_choosing_who_to_message(sheets):
+    service, worksheet = sheets
+    worksheet.edit(2, 4, "Do Not Contact")
+
+    WhatsAppService("Hi {name}").run_automation()
+
+    assert "No new leads to message." in whatsapp.whatsapp_logs.lines()